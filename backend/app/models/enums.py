@@ -24,3 +24,8 @@ class LeaveType(str, Enum):
     MATERNITY_LEAVE = "Maternity Leave"
     EMERGENCY_LEAVE = "Emergency Leave"
     VACATION_LEAVE = "Vacation Leave"
+
+class LeaveStatus(str, Enum):
+    PENDING = "Pending"
+    APPROVED = "Approved"
+    REJECTED = "Rejected"
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from typing import List
 from datetime import date, datetime
+from bson import ObjectId
+from bson.errors import InvalidId
 from pydantic import BaseModel
-from backend.core.database import get_db
+from core.database import get_async_db
+from core.response_cache import cached_json, query_tags, response_cache, write_tags
 
 router = APIRouter()
 
@@ -15,6 +18,12 @@ class Event(BaseModel):
     organizer: str
     event_type: str = "College Event"
 
+def _object_id(event_id: str) -> ObjectId:
+    try:
+        return ObjectId(event_id)
+    except InvalidId:
+        raise HTTPException(status_code=404, detail="Event not found")
+
 class EventResponse(BaseModel):
     id: str
     title: str
@@ -28,50 +37,60 @@ class EventResponse(BaseModel):
 
 @router.post("/", response_model=EventResponse)
 async def create_event(event: Event):
-    db = get_db()
+    db = await get_async_db()
     event_data = event.dict()
+    event_data["event_date"] = str(event.event_date)
     event_data["created_at"] = datetime.now()
     
-    result = db.get_collection("events").insert_one(event_data)
+    result = await db.get_collection("events").insert_one(event_data)
     event_data["id"] = str(result.inserted_id)
+    del event_data["_id"]
     
+    await response_cache.invalidate(write_tags("events", event_type=event.event_type))
     return event_data
 
 @router.get("/", response_model=List[EventResponse])
-async def get_events(event_type: str = None):
-    db = get_db()
+async def get_events(request: Request, event_type: str = None):
     query = {}
     
     if event_type:
         query["event_type"] = event_type
     
-    events = list(db.get_collection("events").find(query).sort("event_date", 1))
-    
-    for event in events:
-        event["id"] = str(event["_id"])
-        del event["_id"]
+    async def load():
+        db = await get_async_db()
+        events = await db.get_collection("events").find(query).sort("event_date", 1).to_list(length=None)
+        
+        for event in events:
+            event["id"] = str(event["_id"])
+            del event["_id"]
+        
+        return [EventResponse(**event) for event in events]
     
-    return events
+    return await cached_json(request, query_tags("events", event_type=event_type), load)
 
 @router.get("/{event_id}", response_model=EventResponse)
-async def get_event(event_id: str):
-    db = get_db()
-    event = db.get_collection("events").find_one({"_id": event_id})
-    
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-    
-    event["id"] = str(event["_id"])
-    del event["_id"]
+async def get_event(request: Request, event_id: str):
+    async def load():
+        db = await get_async_db()
+        event = await db.get_collection("events").find_one({"_id": _object_id(event_id)})
+        
+        if not event:
+            raise HTTPException(status_code=404, detail="Event not found")
+        
+        event["id"] = str(event["_id"])
+        del event["_id"]
+        
+        return EventResponse(**event)
     
-    return event
+    return await cached_json(request, ["events", f"events:id={event_id}"], load)
 
 @router.delete("/{event_id}")
 async def delete_event(event_id: str):
-    db = get_db()
-    result = db.get_collection("events").delete_one({"_id": event_id})
+    db = await get_async_db()
+    result = await db.get_collection("events").delete_one({"_id": _object_id(event_id)})
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Event not found")
     
+    await response_cache.invalidate(["events"])
     return {"message": "Event deleted successfully"}
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import List, Optional
 from datetime import date
+from bson import ObjectId
+from bson.errors import InvalidId
 from pydantic import BaseModel
-from backend.core.database import get_db
+from core.database import get_async_db, get_async_database
+from core.response_cache import cached_json, query_tags, response_cache, write_tags
+from app.services.holiday_calendar import get_holiday_calendar, invalidate_holiday_calendar
 
 router = APIRouter()
 
@@ -13,6 +17,12 @@ class Holiday(BaseModel):
     state: str = "All"
     type: str = "Government"
 
+def _object_id(holiday_id: str) -> ObjectId:
+    try:
+        return ObjectId(holiday_id)
+    except InvalidId:
+        raise HTTPException(status_code=404, detail="Holiday not found")
+
 class HolidayResponse(BaseModel):
     id: str
     date: date
@@ -21,53 +31,122 @@ class HolidayResponse(BaseModel):
     state: str
     type: str
 
+class HolidayCheck(BaseModel):
+    date: date
+    state: str
+    is_holiday: bool
+    is_working_day: bool
+    holidays: List[str]
+
+class WorkingDays(BaseModel):
+    start_date: date
+    end_date: date
+    state: str
+    working_days: int
+    holidays: List[date]
+
+class NextWorkingDay(BaseModel):
+    date: date
+    state: str
+    next_working_day: date
+
 @router.post("/", response_model=HolidayResponse)
 async def add_holiday(holiday: Holiday):
-    db = get_db()
+    db = await get_async_db()
     holiday_data = holiday.dict()
+    holiday_data["date"] = str(holiday.date)
     
-    result = db.get_collection("holidays").insert_one(holiday_data)
+    result = await db.get_collection("holidays").insert_one(holiday_data)
     holiday_data["id"] = str(result.inserted_id)
+    del holiday_data["_id"]
     
+    invalidate_holiday_calendar()
+    await response_cache.invalidate(write_tags("holidays", state=holiday.state, type=holiday.type))
     return holiday_data
 
 @router.get("/", response_model=List[HolidayResponse])
-async def get_holidays(state: str = None, holiday_type: str = None):
-    db = get_db()
+async def get_holidays(request: Request, state: str = None, holiday_type: str = None,
+                       start_date: Optional[date] = None, end_date: Optional[date] = None):
     query = {}
     
     if state:
         query["state"] = state
     if holiday_type:
         query["type"] = holiday_type
+    # ISO date strings sort like dates, so the range is served by the date index
+    if start_date or end_date:
+        query["date"] = {}
+        if start_date:
+            query["date"]["$gte"] = str(start_date)
+        if end_date:
+            query["date"]["$lte"] = str(end_date)
     
-    holidays = list(db.get_collection("holidays").find(query))
+    async def load():
+        db = await get_async_db()
+        holidays = await db.get_collection("holidays").find(query).sort("date", 1).to_list(length=None)
+        
+        for holiday in holidays:
+            holiday["id"] = str(holiday["_id"])
+            del holiday["_id"]
+        
+        return [HolidayResponse(**holiday) for holiday in holidays]
     
-    for holiday in holidays:
-        holiday["id"] = str(holiday["_id"])
-        del holiday["_id"]
+    return await cached_json(request, query_tags("holidays", state=state, type=holiday_type), load)
+
+@router.get("/calendar/check", response_model=HolidayCheck)
+async def check_holiday(day: date, state: str = "All", db = Depends(get_async_database)):
+    calendar = await get_holiday_calendar(db)
+    return HolidayCheck(
+        date=day,
+        state=state,
+        is_holiday=calendar.is_holiday(day, state),
+        is_working_day=calendar.is_working_day(day, state),
+        holidays=calendar.holiday_names(day, state)
+    )
+
+@router.get("/calendar/working-days", response_model=WorkingDays)
+async def count_working_days(start_date: date, end_date: date, state: str = "All", db = Depends(get_async_database)):
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
     
-    return holidays
+    calendar = await get_holiday_calendar(db)
+    return WorkingDays(
+        start_date=start_date,
+        end_date=end_date,
+        state=state,
+        working_days=calendar.working_days_between(start_date, end_date, state),
+        holidays=calendar.holidays_between(start_date, end_date, state)
+    )
+
+@router.get("/calendar/next-working-day", response_model=NextWorkingDay)
+async def next_working_day(day: date, state: str = "All", db = Depends(get_async_database)):
+    calendar = await get_holiday_calendar(db)
+    return NextWorkingDay(date=day, state=state, next_working_day=calendar.next_working_day(day, state))
 
 @router.get("/{holiday_id}", response_model=HolidayResponse)
-async def get_holiday(holiday_id: str):
-    db = get_db()
-    holiday = db.get_collection("holidays").find_one({"_id": holiday_id})
-    
-    if not holiday:
-        raise HTTPException(status_code=404, detail="Holiday not found")
-    
-    holiday["id"] = str(holiday["_id"])
-    del holiday["_id"]
+async def get_holiday(request: Request, holiday_id: str):
+    async def load():
+        db = await get_async_db()
+        holiday = await db.get_collection("holidays").find_one({"_id": _object_id(holiday_id)})
+        
+        if not holiday:
+            raise HTTPException(status_code=404, detail="Holiday not found")
+        
+        holiday["id"] = str(holiday["_id"])
+        del holiday["_id"]
+        
+        return HolidayResponse(**holiday)
     
-    return holiday
+    return await cached_json(request, ["holidays", f"holidays:id={holiday_id}"], load)
 
 @router.delete("/{holiday_id}")
 async def delete_holiday(holiday_id: str):
-    db = get_db()
-    result = db.get_collection("holidays").delete_one({"_id": holiday_id})
+    db = await get_async_db()
+    result = await db.get_collection("holidays").delete_one({"_id": _object_id(holiday_id)})
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Holiday not found")
     
+    invalidate_holiday_calendar()
+    await response_cache.invalidate(["holidays"])
     return {"message": "Holiday deleted successfully"}
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import List, Optional
 from datetime import date
+from bson import ObjectId
+from bson.errors import InvalidId
 from pydantic import BaseModel
-from backend.core.database import get_db
-from backend.app.models.enums import LeaveType
+from core.database import get_async_db, get_async_database
+from routers.auth import get_current_user
+from app.models.enums import LeaveStatus, LeaveType
+from app.services.leave_index import get_leave_index, invalidate_leave_index
 
 router = APIRouter()
 
@@ -13,7 +17,6 @@ class LeaveApplication(BaseModel):
     reason: str
     start_date: date
     end_date: date
-    status: str = "Pending"
 
 class LeaveResponse(BaseModel):
     id: str
@@ -22,24 +25,57 @@ class LeaveResponse(BaseModel):
     reason: str
     start_date: date
     end_date: date
-    status: str
+    status: LeaveStatus
     applied_date: date
 
+class StudentOnLeave(BaseModel):
+    id: str
+    student_id: str
+    usn: str
+    leave_type: LeaveType
+    start_date: date
+    end_date: date
+
 @router.post("/", response_model=LeaveResponse)
 async def apply_leave(leave: LeaveApplication):
-    db = get_db()
+    if leave.end_date < leave.start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    
+    db = await get_async_db()
     leave_data = leave.dict()
-    leave_data["applied_date"] = date.today()
+    # Dates are stored as ISO strings, which sort and range-query like dates
+    leave_data["start_date"] = str(leave.start_date)
+    leave_data["end_date"] = str(leave.end_date)
+    leave_data["status"] = LeaveStatus.PENDING.value
+    leave_data["applied_date"] = str(date.today())
     
-    result = db.get_collection("leaves").insert_one(leave_data)
+    result = await db.get_collection("leaves").insert_one(leave_data)
     leave_data["id"] = str(result.inserted_id)
+    del leave_data["_id"]
     
     return leave_data
 
+@router.get("/on-leave", response_model=List[StudentOnLeave])
+async def get_students_on_leave(
+    start_date: date,
+    end_date: date,
+    student_id: Optional[List[str]] = Query(None),
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_async_database)
+):
+    """Approved leaves overlapping [start_date, end_date]"""
+    if current_user["role"] not in ["faculty", "admin"]:
+        raise HTTPException(status_code=403, detail="Only faculty can view leave schedules")
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    
+    index = await get_leave_index(db)
+    return index.on_leave_during(start_date, end_date, student_id)
+
 @router.get("/{usn}", response_model=List[LeaveResponse])
 async def get_leaves(usn: str):
-    db = get_db()
-    leaves = list(db.get_collection("leaves").find({"usn": usn}))
+    db = await get_async_db()
+    leaves = await db.get_collection("leaves").find({"usn": usn}).to_list(length=None)
     
     for leave in leaves:
         leave["id"] = str(leave["_id"])
@@ -49,8 +85,8 @@ async def get_leaves(usn: str):
 
 @router.get("/", response_model=List[LeaveResponse])
 async def get_all_leaves():
-    db = get_db()
-    leaves = list(db.get_collection("leaves").find())
+    db = await get_async_db()
+    leaves = await db.get_collection("leaves").find().to_list(length=None)
     
     for leave in leaves:
         leave["id"] = str(leave["_id"])
@@ -59,14 +95,23 @@ async def get_all_leaves():
     return leaves
 
 @router.put("/{leave_id}/{status}")
-async def update_leave_status(leave_id: str, status: str):
-    db = get_db()
-    result = db.get_collection("leaves").update_one(
-        {"_id": leave_id},
-        {"$set": {"status": status}}
+async def update_leave_status(leave_id: str, status: LeaveStatus, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] not in ["faculty", "admin"]:
+        raise HTTPException(status_code=403, detail="Only faculty can approve or reject leave")
+    
+    try:
+        object_id = ObjectId(leave_id)
+    except InvalidId:
+        raise HTTPException(status_code=404, detail="Leave not found")
+    
+    db = await get_async_db()
+    result = await db.get_collection("leaves").update_one(
+        {"_id": object_id},
+        {"$set": {"status": status.value}}
     )
     
-    if result.modified_count == 0:
+    if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Leave not found")
     
+    invalidate_leave_index()
     return {"message": "Leave status updated successfully"}
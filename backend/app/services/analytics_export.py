@@ -0,0 +1,252 @@
+"""Columnar Parquet snapshots of attendance, results and students for analytics.
+
+Each collection is written as a hive-partitioned dataset under
+ANALYTICS_EXPORT_DIR (attendance by month=, results by semester=, students by
+year=), one data.parquet per partition with low-cardinality text columns
+dictionary-encoded. Runs are incremental: only documents whose updated_at moved
+past the stored watermark are read, and they are merged into the partitions
+they touch (newest version of an id wins); a document whose partition key
+changed is then removed from its old partition. A full run rebuilds everything
+and is the way to drop deleted documents; it streams each partition to disk in
+record batches, so memory does not grow with partition size.
+"""
+from datetime import date, datetime, timedelta
+from itertools import groupby, islice
+from typing import Callable, Dict, Iterable, List, Optional
+import json
+import logging
+import os
+import shutil
+from core.config import settings
+from app.services.job_runs import run_once_daily
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # analytics export is optional for the API process
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+WATERMARKS_FILE = "_watermarks.json"
+# Re-read a little before the watermark so writes committed during the last run are not missed
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+def _to_date(value) -> Optional[date]:
+    if value is None or (isinstance(value, date) and not isinstance(value, datetime)):
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    return date.fromisoformat(str(value)[:10])
+
+def _month(doc: Dict) -> str:
+    return str(doc.get("date", ""))[:7]
+
+class SnapshotSpec:
+    """How one collection maps to a partitioned Parquet dataset"""
+    def __init__(self, collection: str, partition: str, partition_of: Callable[[Dict], object],
+                 sort_field: str, columns: Dict[str, Callable[[Dict], object]], schema_fields: List):
+        self.collection = collection
+        self.partition = partition
+        self.partition_of = partition_of
+        self.sort_field = sort_field
+        self.columns = columns
+        self.schema_fields = schema_fields
+
+    @property
+    def schema(self):
+        return pa.schema(self.schema_fields)
+
+def _specs() -> List[SnapshotSpec]:
+    text = pa.string()
+    category = pa.dictionary(pa.int32(), pa.string())
+    stamp = pa.timestamp("ms")
+    return [
+        SnapshotSpec(
+            "attendance", "month", _month, "date",
+            {
+                "id": lambda d: d.get("id"),
+                "student_id": lambda d: d.get("student_id"),
+                "faculty_id": lambda d: d.get("faculty_id"),
+                "date": lambda d: _to_date(d.get("date")),
+                "period": lambda d: d.get("period"),
+                "subject": lambda d: d.get("subject"),
+                "status": lambda d: d.get("status"),
+                "section": lambda d: d.get("section"),
+                "semester": lambda d: d.get("semester"),
+                "updated_at": lambda d: d.get("updated_at")
+            },
+            [("id", text), ("student_id", text), ("faculty_id", text), ("date", pa.date32()),
+             ("period", pa.int32()), ("subject", category), ("status", category), ("section", category),
+             ("semester", pa.int32()), ("updated_at", stamp)]
+        ),
+        SnapshotSpec(
+            "results", "semester", lambda d: d.get("semester"), "semester",
+            {
+                "id": lambda d: d.get("id"),
+                "student_id": lambda d: d.get("student_id"),
+                "subject": lambda d: d.get("subject"),
+                "test_type": lambda d: d.get("test_type"),
+                "test_date": lambda d: _to_date(d.get("test_date")),
+                "marks_obtained": lambda d: d.get("marks_obtained"),
+                "total_marks": lambda d: d.get("total_marks"),
+                "percentage": lambda d: d.get("percentage"),
+                "grade": lambda d: d.get("grade"),
+                "section": lambda d: d.get("section"),
+                "updated_at": lambda d: d.get("updated_at")
+            },
+            [("id", text), ("student_id", text), ("subject", category), ("test_type", category),
+             ("test_date", pa.date32()), ("marks_obtained", pa.float64()), ("total_marks", pa.float64()),
+             ("percentage", pa.float64()), ("grade", category), ("section", category), ("updated_at", stamp)]
+        ),
+        SnapshotSpec(
+            "students", "year", lambda d: d.get("year"), "year",
+            {
+                "id": lambda d: d.get("id"),
+                "usn": lambda d: d.get("usn"),
+                "name": lambda d: d.get("name"),
+                "degree": lambda d: d.get("degree"),
+                "college": lambda d: d.get("college"),
+                "stream": lambda d: d.get("stream"),
+                "total_cgpa": lambda d: d.get("total_cgpa"),
+                "total_classes": lambda d: d.get("overall_attendance", {}).get("total_classes"),
+                "attended_classes": lambda d: d.get("overall_attendance", {}).get("attended_classes"),
+                "average_percentage": lambda d: d.get("overall_attendance", {}).get("average_percentage"),
+                "updated_at": lambda d: d.get("updated_at")
+            },
+            [("id", text), ("usn", text), ("name", text), ("degree", category), ("college", category),
+             ("stream", category), ("total_cgpa", pa.float64()), ("total_classes", pa.int64()),
+             ("attended_classes", pa.int64()), ("average_percentage", pa.float64()), ("updated_at", stamp)]
+        )
+    ]
+
+def _to_table(spec: SnapshotSpec, docs: List[Dict]):
+    columns = {name: [extract(doc) for doc in docs] for name, extract in spec.columns.items()}
+    return pa.Table.from_pydict(columns, schema=spec.schema)
+
+def _latest_per_id(table):
+    """Keep only the last row of each id; later rows are newer"""
+    table = table.append_column("_row", pa.array(range(table.num_rows), pa.int64()))
+    keep = table.group_by("id").aggregate([("_row", "max")]).column("_row_max")
+    return table.take(keep.take(pc.sort_indices(keep))).drop_columns(["_row"])
+
+def _partition_name(spec: SnapshotSpec, value) -> str:
+    return f"{spec.partition}={value}"
+
+def _partition_path(base_dir: str, spec: SnapshotSpec, value) -> str:
+    directory = os.path.join(base_dir, spec.collection, _partition_name(spec, value))
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, "data.parquet")
+
+def _dictionary_columns(spec: SnapshotSpec) -> List[str]:
+    return [name for name, kind in spec.schema_fields if pa.types.is_dictionary(kind)]
+
+def _replace_table(path: str, spec: SnapshotSpec, table):
+    temporary = path + ".tmp"
+    pq.write_table(table, temporary, use_dictionary=_dictionary_columns(spec), compression="zstd")
+    os.replace(temporary, path)
+
+def _write_partition(base_dir: str, spec: SnapshotSpec, value, docs: Iterable[Dict], batch_size: int) -> int:
+    """Write a partition from scratch, converting `batch_size` documents at a time"""
+    path = _partition_path(base_dir, spec, value)
+    temporary = path + ".tmp"
+    rows = 0
+    with pq.ParquetWriter(temporary, spec.schema, use_dictionary=_dictionary_columns(spec), compression="zstd") as writer:
+        while batch := list(islice(docs, batch_size)):
+            writer.write_table(_to_table(spec, batch))
+            rows += len(batch)
+    os.replace(temporary, path)
+    return rows
+
+def _merge_partition(base_dir: str, spec: SnapshotSpec, value, docs: List[Dict]) -> int:
+    """Merge changed documents into an existing partition; the newest version of an id wins"""
+    path = _partition_path(base_dir, spec, value)
+    table = _to_table(spec, docs)
+    if os.path.exists(path):
+        existing = pq.read_table(path, schema=spec.schema)
+        table = _latest_per_id(pa.concat_tables([existing, table]).unify_dictionaries())
+    _replace_table(path, spec, table)
+    return len(docs)
+
+def _drop_moved(base_dir: str, spec: SnapshotSpec, homes: Dict[str, str]) -> int:
+    """Remove changed ids from every partition other than the one now holding them"""
+    collection_dir = os.path.join(base_dir, spec.collection)
+    changed = pa.array(list(homes), pa.string())
+    dropped = 0
+    for name in os.listdir(collection_dir):
+        path = os.path.join(collection_dir, name, "data.parquet")
+        if not name.startswith(f"{spec.partition}=") or not os.path.exists(path):
+            continue
+        # Only the id column is read unless a moved document is found
+        ids = pq.read_table(path, columns=["id"]).column("id")
+        found = pc.filter(ids, pc.is_in(ids, value_set=changed)).to_pylist()
+        moved = [row_id for row_id in found if homes[row_id] != name]
+        if not moved:
+            continue
+        table = pq.read_table(path, schema=spec.schema)
+        stale = pc.is_in(table.column("id"), value_set=pa.array(moved, pa.string()))
+        _replace_table(path, spec, table.filter(pc.invert(stale)))
+        dropped += len(moved)
+    return dropped
+
+def _export_collection(db, base_dir: str, spec: SnapshotSpec, since: Optional[datetime], batch_size: int) -> int:
+    """Stream documents sorted by partition key and write one partition at a time"""
+    query = {"updated_at": {"$gte": since - WATERMARK_OVERLAP}} if since else {}
+    cursor = db[spec.collection].find(query, {"_id": 0}).sort(spec.sort_field, 1).batch_size(batch_size)
+    exported = 0
+    homes: Dict[str, str] = {}  # changed id -> the partition now holding it
+    for value, docs in groupby(cursor, key=spec.partition_of):
+        if since is None:
+            exported += _write_partition(base_dir, spec, value, docs, batch_size)
+        else:
+            # Incremental runs only hold the changed documents of one partition
+            docs = list(docs)
+            exported += _merge_partition(base_dir, spec, value, docs)
+            homes.update((doc["id"], _partition_name(spec, value)) for doc in docs if doc.get("id"))
+    if homes:
+        # A document whose partition key changed still has its old row elsewhere
+        moved = _drop_moved(base_dir, spec, homes)
+        if moved:
+            logger.info(f"Analytics export moved {moved} {spec.collection} rows to new partitions")
+    return exported
+
+def _load_watermarks(base_dir: str) -> Dict[str, str]:
+    path = os.path.join(base_dir, WATERMARKS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def _save_watermarks(base_dir: str, watermarks: Dict[str, str]):
+    path = os.path.join(base_dir, WATERMARKS_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(watermarks, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+def export_analytics_snapshot(db, base_dir: Optional[str] = None, full: bool = False,
+                              collections: Optional[Iterable[str]] = None, batch_size: int = 5000) -> Dict[str, int]:
+    """Export changed documents (or everything when full) and advance the watermarks"""
+    if pa is None:
+        logger.warning("pyarrow is not installed; skipping analytics export")
+        return {}
+    base_dir = base_dir or settings.ANALYTICS_EXPORT_DIR
+    os.makedirs(base_dir, exist_ok=True)
+    watermarks = _load_watermarks(base_dir)
+    exported = {}
+    for spec in _specs():
+        if collections and spec.collection not in collections:
+            continue
+        started = datetime.now()
+        since = None if full or spec.collection not in watermarks else datetime.fromisoformat(watermarks[spec.collection])
+        if since is None:
+            shutil.rmtree(os.path.join(base_dir, spec.collection), ignore_errors=True)
+        exported[spec.collection] = _export_collection(db, base_dir, spec, since, batch_size)
+        watermarks[spec.collection] = started.isoformat()
+        _save_watermarks(base_dir, watermarks)
+    logger.info(f"Analytics export wrote {exported} rows to {base_dir}")
+    return exported
+
+def run_analytics_export(db) -> Optional[Dict[str, int]]:
+    """The nightly export; only the worker holding today's lease writes the datasets"""
+    return run_once_daily(db, "analytics_export", lambda run_id: export_analytics_snapshot(db))
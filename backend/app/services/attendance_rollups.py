@@ -0,0 +1,170 @@
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from pymongo import UpdateOne
+from core.config import ATTENDANCE_BUCKETS_COLLECTION
+from models.attendance import AttendanceStatus
+from models.student import SubjectAttendance
+from app.services.attendance_windows import WINDOW_FIELDS, bucket_operations, window_deltas
+
+# (student_id, date, old_subject, old_status, new_subject, new_status); the
+# old pair is None for a freshly inserted row.
+AttendanceChange = Tuple[str, str, Optional[str], Optional[str], str, str]
+
+def counts_toward_total(status: Optional[str]) -> bool:
+    """Holidays are recorded but never count as a class held"""
+    return status is not None and status != AttendanceStatus.HOLIDAY.value
+
+def is_attended(status: Optional[str]) -> bool:
+    return status == AttendanceStatus.PRESENT.value
+
+def _deltas(changes: Iterable[AttendanceChange], today: date) -> Tuple[Dict[str, Dict[str, List[int]]], List[Tuple]]:
+    """Fold attendance changes into per-student counter deltas and day-bucket deltas.
+
+    Counter deltas are {student_id: {subject: [total, attended, daily, weekly, monthly]}}.
+    """
+    deltas: Dict[str, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(lambda: [0, 0, 0, 0, 0]))
+    buckets = []
+
+    def fold(student_id, day, subject, status, sign):
+        total = sign * counts_toward_total(status)
+        attended = sign * is_attended(status)
+        delta = deltas[student_id][subject]
+        for index, value in enumerate((total, attended) + window_deltas(day, attended, today)):
+            delta[index] += value
+        buckets.append((student_id, subject, day, total, attended))
+
+    for student_id, day, old_subject, old_status, new_subject, new_status in changes:
+        if old_status is not None:
+            fold(student_id, day, old_subject, old_status, -1)
+        fold(student_id, day, new_subject, new_status, 1)
+    return deltas, buckets
+
+def _percentage_expr(attended: str, total: str) -> Dict:
+    return {"$cond": [
+        {"$gt": [total, 0]},
+        {"$multiply": [{"$divide": [attended, total]}, 100]},
+        0.0
+    ]}
+
+COUNTER_FIELDS = ("total_classes", "attended_classes") + WINDOW_FIELDS
+
+# Percentages cannot be $inc'ed, so they are re-derived from the counters in
+# a pipeline update that runs in the same bulk_write.
+REFRESH_PERCENTAGES = [{"$set": {
+    "subject_attendance": {"$map": {
+        "input": "$subject_attendance",
+        "as": "s",
+        "in": {"$mergeObjects": ["$$s", {
+            "percentage": _percentage_expr("$$s.attended_classes", "$$s.total_classes")
+        }]}
+    }},
+    "overall_attendance.average_percentage": _percentage_expr(
+        "$overall_attendance.attended_classes", "$overall_attendance.total_classes"
+    )
+}}]
+
+def rollup_operations(changes: Iterable[AttendanceChange], now: Optional[datetime] = None) -> Tuple[List[UpdateOne], List[UpdateOne]]:
+    """Build the ordered student updates and the day-bucket upserts for a set of changes"""
+    now = now or datetime.now()
+    deltas, buckets = _deltas(changes, now.date())
+    ops = []
+    for student_id, subjects in deltas.items():
+        overall = [0, 0, 0, 0, 0]
+        touched = False
+        for subject, delta in subjects.items():
+            if not any(delta):
+                continue
+            touched = True
+            overall = [a + b for a, b in zip(overall, delta)]
+            ops.append(UpdateOne(
+                {"id": student_id, "subject_attendance.subject": {"$ne": subject}},
+                {"$push": {"subject_attendance": SubjectAttendance(subject=subject).dict()}}
+            ))
+            ops.append(UpdateOne(
+                {"id": student_id, "subject_attendance.subject": subject},
+                {"$inc": {
+                    f"subject_attendance.$.{field}": value
+                    for field, value in zip(COUNTER_FIELDS, delta)
+                }}
+            ))
+        if not touched:
+            continue
+        ops.append(UpdateOne(
+            {"id": student_id},
+            {
+                "$inc": {
+                    f"overall_attendance.{field}": value
+                    for field, value in zip(COUNTER_FIELDS, overall)
+                },
+                "$set": {"updated_at": now}
+            }
+        ))
+        ops.append(UpdateOne({"id": student_id}, REFRESH_PERCENTAGES))
+    return ops, bucket_operations(buckets)
+
+async def apply_rollups(db, changes: Iterable[AttendanceChange]) -> None:
+    """Apply attendance changes to the per-student counters and window buckets"""
+    student_ops, bucket_ops = rollup_operations(changes)
+    if student_ops:
+        await db.students.bulk_write(student_ops, ordered=True)
+    if bucket_ops:
+        await db[ATTENDANCE_BUCKETS_COLLECTION].bulk_write(bucket_ops, ordered=False)
+
+def rebuild_rollups(db, student_ids: Optional[List[str]] = None, batch_size: int = 1000) -> int:
+    """Recompute per-student attendance counters from the raw attendance rows.
+
+    Maintenance path: takes the synchronous database, not the async one.
+    """
+    match = {"student_id": {"$in": student_ids}} if student_ids else {}
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {"student_id": "$student_id", "subject": "$subject"},
+            "total_classes": {"$sum": {"$cond": [{"$ne": ["$status", AttendanceStatus.HOLIDAY.value]}, 1, 0]}},
+            "attended_classes": {"$sum": {"$cond": [{"$eq": ["$status", AttendanceStatus.PRESENT.value]}, 1, 0]}}
+        }},
+        {"$group": {
+            "_id": "$_id.student_id",
+            "subjects": {"$push": {
+                "subject": "$_id.subject",
+                "total_classes": "$total_classes",
+                "attended_classes": "$attended_classes"
+            }}
+        }}
+    ]
+
+    empty = {
+        "subject_attendance": [],
+        "overall_attendance.total_classes": 0,
+        "overall_attendance.attended_classes": 0,
+        "overall_attendance.average_percentage": 0.0
+    }
+    db.students.update_many({"id": {"$in": student_ids}} if student_ids else {}, {"$set": empty})
+
+    now = datetime.now()
+    ops = []
+    rebuilt = 0
+    for doc in db.attendance.aggregate(pipeline, allowDiskUse=True):
+        subject_attendance = []
+        for subject in doc["subjects"]:
+            stats = SubjectAttendance(**subject)
+            if stats.total_classes:
+                stats.percentage = stats.attended_classes / stats.total_classes * 100
+            subject_attendance.append(stats.dict())
+        total = sum(subject["total_classes"] for subject in subject_attendance)
+        attended = sum(subject["attended_classes"] for subject in subject_attendance)
+        ops.append(UpdateOne({"id": doc["_id"]}, {"$set": {
+            "subject_attendance": subject_attendance,
+            "overall_attendance.total_classes": total,
+            "overall_attendance.attended_classes": attended,
+            "overall_attendance.average_percentage": attended / total * 100 if total else 0.0,
+            "updated_at": now
+        }}))
+        rebuilt += 1
+        if len(ops) >= batch_size:
+            db.students.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        db.students.bulk_write(ops, ordered=False)
+    return rebuilt
@@ -1,17 +1,210 @@
-from ..db.mongo import get_db
-from ..models.schemas import AttendanceCreate, AttendanceResponse
-
-async def mark_attendance(attendance: AttendanceCreate):
-    db = get_db()
-    # Logic to save attendance to the database
-    pass
-
-async def get_attendance(usn: str):
-    db = get_db()
-    # Logic to retrieve attendance records for a student
-    pass
-
-async def get_attendance_report(usn: str):
-    db = get_db()
-    # Logic to generate attendance report
-    pass
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+import uuid
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from models.attendance import AttendanceRosterCreate, AttendanceStatus, AttendanceWriteMode
+from app.services.attendance_rollups import AttendanceChange, apply_rollups
+from app.services.leave_index import get_leave_index
+
+DUPLICATE_KEY_ERROR = 11000
+
+ROSTER_RESULT_COUNTS = {
+    "inserted": "inserted",
+    "duplicate": "duplicates",
+    "created": "created",
+    "unchanged": "unchanged",
+    "updated": "updated",
+    "conflict": "conflicts",
+    "failed": "failed"
+}
+
+def build_attendance_row(student_id: str, status: str, roster: AttendanceRosterCreate, faculty_id: str, now: datetime, idempotency_key: Optional[str] = None) -> Dict:
+    """Build an attendance document in the same shape enroll_attendance stores"""
+    return {
+        "id": str(uuid.uuid4()),
+        "student_id": student_id,
+        "faculty_id": faculty_id,
+        "date": str(roster.date),
+        "period": roster.period,
+        "subject": roster.subject,
+        "status": status,
+        "section": roster.section,
+        "semester": roster.semester,
+        "idempotency_key": idempotency_key,
+        "created_at": now,
+        "updated_at": now
+    }
+
+ON_LEAVE_DETAIL = "Absence recorded as leave: approved leave on file"
+
+def _row(student_id: str, result: str, detail: Optional[str] = None) -> Dict:
+    row = {"student_id": student_id, "result": result}
+    if detail:
+        row["detail"] = detail
+    return row
+
+def _split_repeats(roster: AttendanceRosterCreate, rows: List[Dict]) -> List[int]:
+    """Fail every repeat of a student within the roster, return positions to write"""
+    positions = []
+    seen = set()
+    for position, entry in enumerate(roster.entries):
+        if entry.student_id in seen:
+            rows[position] = _row(entry.student_id, "failed", "Student listed more than once in roster")
+            continue
+        seen.add(entry.student_id)
+        positions.append(position)
+    return positions
+
+async def _run_bulk(db, ops: List) -> Tuple[Set[int], Dict[int, Dict]]:
+    """Run an unordered bulk_write, returning upserted op indexes and write errors by op index"""
+    if not ops:
+        return set(), {}
+    try:
+        result = await db.attendance.bulk_write(ops, ordered=False)
+        return set(result.upserted_ids), {}
+    except BulkWriteError as e:
+        upserted = {upsert["index"] for upsert in e.details.get("upserted", [])}
+        return upserted, {error["index"]: error for error in e.details.get("writeErrors", [])}
+
+def _summarise(rows: List[Dict]) -> Dict:
+    summary = {field: 0 for field in ROSTER_RESULT_COUNTS.values()}
+    for row in rows:
+        summary[ROSTER_RESULT_COUNTS[row["result"]]] += 1
+    summary["rows"] = rows
+    return summary
+
+async def resolve_leaves(db, roster: AttendanceRosterCreate) -> Tuple[AttendanceRosterCreate, Set[int]]:
+    """Turn absences of students on approved leave into leave, returning the changed positions"""
+    absent = [entry.student_id for entry in roster.entries if entry.status == AttendanceStatus.ABSENT]
+    if not absent:
+        return roster, set()
+    on_leave = (await get_leave_index(db)).students_on_leave(absent, roster.date)
+    if not on_leave:
+        return roster, set()
+
+    entries = []
+    positions = set()
+    for position, entry in enumerate(roster.entries):
+        if entry.status == AttendanceStatus.ABSENT and entry.student_id in on_leave:
+            entry = entry.copy(update={"status": AttendanceStatus.LEAVE})
+            positions.add(position)
+        entries.append(entry)
+    return roster.copy(update={"entries": entries}), positions
+
+async def enroll_roster(db, roster: AttendanceRosterCreate, faculty_id: str) -> Dict:
+    """Write a whole period's roster with one unordered bulk_write.
+
+    In insert mode rows that collide with the unique (student_id, date, period)
+    index are reported as duplicates. In upsert mode the same index is the
+    upsert key, so a retried submission is a no-op instead of an error.
+    Every row that was written is then folded into the students' attendance
+    counters. Absent students with approved leave that day are stored as leave.
+    """
+    roster, on_leave = await resolve_leaves(db, roster)
+    changes: List[AttendanceChange] = []
+    if roster.mode == AttendanceWriteMode.UPSERT:
+        summary = await _upsert_roster(db, roster, faculty_id, changes)
+    else:
+        summary = await _insert_roster(db, roster, faculty_id, changes)
+    await apply_rollups(db, changes)
+
+    summary["on_leave"] = 0
+    for position in on_leave:
+        row = summary["rows"][position]
+        if row["result"] in ("inserted", "created", "updated", "unchanged"):
+            row["detail"] = ON_LEAVE_DETAIL
+            summary["on_leave"] += 1
+    return summary
+
+async def _insert_roster(db, roster: AttendanceRosterCreate, faculty_id: str, changes: List[AttendanceChange]) -> Dict:
+    now = datetime.now()
+    rows: List[Dict] = [None] * len(roster.entries)
+    positions = _split_repeats(roster, rows)
+
+    ops = []
+    for position in positions:
+        entry = roster.entries[position]
+        ops.append(InsertOne(build_attendance_row(entry.student_id, entry.status.value, roster, faculty_id, now, entry.idempotency_key)))
+
+    _, errors = await _run_bulk(db, ops)
+    for op_index, position in enumerate(positions):
+        student_id = roster.entries[position].student_id
+        error = errors.get(op_index)
+        if error is None:
+            rows[position] = _row(student_id, "inserted")
+            changes.append((student_id, str(roster.date), None, None, roster.subject, roster.entries[position].status.value))
+        elif error.get("code") == DUPLICATE_KEY_ERROR:
+            rows[position] = _row(student_id, "duplicate", "Attendance already marked for this period")
+        else:
+            rows[position] = _row(student_id, "failed", error.get("errmsg"))
+
+    return _summarise(rows)
+
+async def _upsert_roster(db, roster: AttendanceRosterCreate, faculty_id: str, changes: List[AttendanceChange]) -> Dict:
+    now = datetime.now()
+    rows: List[Dict] = [None] * len(roster.entries)
+    positions = _split_repeats(roster, rows)
+    attendance_date = str(roster.date)
+
+    # One indexed read tells us which rows already exist, so unchanged rows
+    # and replayed idempotency keys never reach the write path.
+    student_ids = [roster.entries[position].student_id for position in positions]
+    existing = {
+        doc["student_id"]: doc
+        async for doc in db.attendance.find(
+            {"student_id": {"$in": student_ids}, "date": attendance_date, "period": roster.period},
+            {"_id": 0, "student_id": 1, "subject": 1, "status": 1, "idempotency_key": 1}
+        )
+    }
+
+    ops = []
+    op_positions = []
+    for position in positions:
+        entry = roster.entries[position]
+        status = entry.status.value
+        key = {"student_id": entry.student_id, "date": attendance_date, "period": roster.period}
+        current = existing.get(entry.student_id)
+
+        if current is None:
+            new_row = build_attendance_row(entry.student_id, status, roster, faculty_id, now, entry.idempotency_key)
+            ops.append(UpdateOne(key, {"$setOnInsert": new_row}, upsert=True))
+            op_positions.append(position)
+            continue
+
+        same_payload = current.get("status") == status and current.get("subject") == roster.subject
+        same_key = entry.idempotency_key is not None and current.get("idempotency_key") == entry.idempotency_key
+        if same_payload:
+            rows[position] = _row(entry.student_id, "unchanged")
+        elif same_key:
+            rows[position] = _row(entry.student_id, "conflict", "Idempotency key was already used with a different payload")
+        else:
+            ops.append(UpdateOne(key, {"$set": {
+                "status": status,
+                "subject": roster.subject,
+                "faculty_id": faculty_id,
+                "idempotency_key": entry.idempotency_key,
+                "updated_at": now
+            }}))
+            op_positions.append(position)
+            rows[position] = _row(entry.student_id, "updated")
+
+    upserted, errors = await _run_bulk(db, ops)
+    for op_index, position in enumerate(op_positions):
+        entry = roster.entries[position]
+        error = errors.get(op_index)
+        if error is not None:
+            rows[position] = _row(entry.student_id, "failed", error.get("errmsg"))
+        elif rows[position] is None:
+            # A concurrent writer may have created the row between our read
+            # and the upsert; $setOnInsert then leaves it untouched.
+            if op_index in upserted:
+                rows[position] = _row(entry.student_id, "created")
+                changes.append((entry.student_id, attendance_date, None, None, roster.subject, entry.status.value))
+            else:
+                rows[position] = _row(entry.student_id, "unchanged")
+        else:
+            current = existing[entry.student_id]
+            changes.append((entry.student_id, attendance_date, current.get("subject"), current.get("status"), roster.subject, entry.status.value))
+
+    return _summarise(rows)
@@ -0,0 +1,165 @@
+"""Nightly attendance shortage detection.
+
+One aggregation pass over the students collection derives overall and
+per-subject percentages from the materialized attendance counters and
+returns only students under the threshold. Flagged students are processed
+in batches: one read of their alert state, then in-app notifications,
+outbox emails and the new alert state are each written with a single
+bulk call. A student is notified again only when another subject falls
+short or ATTENDANCE_SHORTAGE_REPEAT_DAYS have passed; recovered students'
+alert state is cleared so a later shortage alerts again. Alert state rows
+carry the id of the run that wrote them, and the scheduled job runs once
+a day across workers (see job_runs).
+
+Maintenance path: takes the synchronous database, not the async one.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+import logging
+import time
+import uuid
+from pymongo import UpdateOne
+from core.config import settings, ATTENDANCE_ALERTS_COLLECTION, NOTIFICATIONS_COLLECTION, EMAIL_OUTBOX_COLLECTION
+from app.services.job_runs import run_once_daily
+from app.services.mail_outbox import outbox_message
+
+logger = logging.getLogger(__name__)
+
+OVERALL = "overall"
+
+def _percentage(attended: str, total: str) -> Dict:
+    # No classes held yet is never a shortage
+    return {"$cond": [{"$gt": [total, 0]}, {"$multiply": [{"$divide": [attended, total]}, 100]}, 100.0]}
+
+def _short(entry: str, threshold: float, min_classes: int) -> Dict:
+    return {"$and": [{"$gte": [f"{entry}.total", min_classes]}, {"$lt": [f"{entry}.percentage", threshold]}]}
+
+def shortage_pipeline(threshold: float, min_classes: int) -> List[Dict]:
+    return [
+        {"$project": {
+            "_id": 0, "id": 1, "user_id": 1, "name": 1, "email": 1,
+            "overall": {
+                "total": {"$ifNull": ["$overall_attendance.total_classes", 0]},
+                "attended": {"$ifNull": ["$overall_attendance.attended_classes", 0]},
+                "percentage": _percentage("$overall_attendance.attended_classes", "$overall_attendance.total_classes")
+            },
+            "subjects": {"$map": {
+                "input": {"$ifNull": ["$subject_attendance", []]},
+                "in": {
+                    "subject": "$$this.subject",
+                    "total": "$$this.total_classes",
+                    "attended": "$$this.attended_classes",
+                    "percentage": _percentage("$$this.attended_classes", "$$this.total_classes")
+                }
+            }}
+        }},
+        {"$set": {
+            "subjects": {"$filter": {"input": "$subjects", "cond": _short("$$this", threshold, min_classes)}},
+            "overall_short": _short("$overall", threshold, min_classes)
+        }},
+        {"$match": {"$or": [{"overall_short": True}, {"subjects.0": {"$exists": True}}]}}
+    ]
+
+def shortage_keys(student: Dict) -> List[str]:
+    keys = [OVERALL] if student["overall_short"] else []
+    return keys + sorted(subject["subject"] for subject in student["subjects"])
+
+def shortage_message(student: Dict, threshold: float):
+    lines = [f"Dear {student.get('name', 'student')},", "", f"Your attendance is below the required {threshold:g}%:"]
+    if student["overall_short"]:
+        overall = student["overall"]
+        lines.append(f"- Overall: {overall['percentage']:.1f}% ({overall['attended']}/{overall['total']} classes)")
+    for subject in student["subjects"]:
+        lines.append(f"- {subject['subject']}: {subject['percentage']:.1f}% ({subject['attended']}/{subject['total']} classes)")
+    lines += ["", "Please attend upcoming classes regularly to avoid being detained."]
+    return "Attendance shortage alert", "\n".join(lines)
+
+def _needs_alert(keys: List[str], state: Optional[Dict], repeat_after: datetime) -> bool:
+    if state is None or state.get("alerted_at") is None:
+        return True
+    return bool(set(keys) - set(state.get("keys", []))) or state["alerted_at"] <= repeat_after
+
+def _process_batch(db, students: List[Dict], now: datetime, run_id: str, threshold: float, channels: Iterable[str], metrics: Dict):
+    states = {
+        state["student_id"]: state
+        for state in db[ATTENDANCE_ALERTS_COLLECTION].find({"student_id": {"$in": [s["id"] for s in students]}}, {"_id": 0})
+    }
+    repeat_after = now - timedelta(days=settings.ATTENDANCE_SHORTAGE_REPEAT_DAYS)
+
+    state_ops, notifications, emails = [], [], []
+    for student in students:
+        keys = shortage_keys(student)
+        update = {"keys": keys, "run_id": run_id, "run_at": now}
+        if _needs_alert(keys, states.get(student["id"]), repeat_after):
+            update["alerted_at"] = now
+            title, body = shortage_message(student, threshold)
+            if "in_app" in channels and student.get("user_id"):
+                notifications.append({
+                    "id": str(uuid.uuid4()),
+                    "user_id": student["user_id"],
+                    "student_id": student["id"],
+                    "type": "attendance_shortage",
+                    "title": title,
+                    "message": body,
+                    "read": False,
+                    "created_at": now
+                })
+            if "email" in channels and student.get("email"):
+                emails.append(outbox_message(student["email"], title, body, "attendance_shortage", now))
+            metrics["alerted"] += 1
+        state_ops.append(UpdateOne({"student_id": student["id"]}, {"$set": update}, upsert=True))
+
+    if notifications:
+        db[NOTIFICATIONS_COLLECTION].insert_many(notifications, ordered=False)
+    if emails:
+        db[EMAIL_OUTBOX_COLLECTION].insert_many(emails, ordered=False)
+    db[ATTENDANCE_ALERTS_COLLECTION].bulk_write(state_ops, ordered=False)
+    metrics["in_app"] += len(notifications)
+    metrics["emails"] += len(emails)
+
+def detect_attendance_shortage(db, threshold: Optional[float] = None, min_classes: Optional[int] = None,
+                               channels: Optional[Iterable[str]] = None, batch_size: Optional[int] = None,
+                               run_id: Optional[str] = None) -> Dict:
+    """Flag students under the threshold and queue deduplicated alerts; returns counts and timings"""
+    threshold = settings.ATTENDANCE_SHORTAGE_THRESHOLD if threshold is None else threshold
+    min_classes = settings.ATTENDANCE_SHORTAGE_MIN_CLASSES if min_classes is None else min_classes
+    channels = set(channels or settings.ATTENDANCE_SHORTAGE_CHANNELS.split(","))
+    batch_size = batch_size or settings.ATTENDANCE_SHORTAGE_BATCH_SIZE
+    run_id = run_id or str(uuid.uuid4())
+    now = datetime.now()
+    metrics = {"flagged": 0, "alerted": 0, "in_app": 0, "emails": 0, "cleared": 0}
+    started = time.perf_counter()
+    aggregate_seconds = 0.0
+
+    cursor = db.students.aggregate(shortage_pipeline(threshold, min_classes), allowDiskUse=True, batchSize=batch_size)
+    batch: List[Dict] = []
+    mark = time.perf_counter()
+    for student in cursor:
+        batch.append(student)
+        if len(batch) == batch_size:
+            aggregate_seconds += time.perf_counter() - mark
+            _process_batch(db, batch, now, run_id, threshold, channels, metrics)
+            metrics["flagged"] += len(batch)
+            batch = []
+            mark = time.perf_counter()
+    aggregate_seconds += time.perf_counter() - mark
+    if batch:
+        _process_batch(db, batch, now, run_id, threshold, channels, metrics)
+        metrics["flagged"] += len(batch)
+
+    # Students not flagged in this run have recovered
+    metrics["cleared"] = db[ATTENDANCE_ALERTS_COLLECTION].delete_many({"run_id": {"$ne": run_id}}).deleted_count
+
+    total_seconds = time.perf_counter() - started
+    metrics.update({
+        "students": db.students.estimated_document_count(),
+        "aggregate_seconds": round(aggregate_seconds, 3),
+        "write_seconds": round(total_seconds - aggregate_seconds, 3),
+        "total_seconds": round(total_seconds, 3)
+    })
+    logger.info(f"Attendance shortage run: {metrics}")
+    return metrics
+
+def run_attendance_shortage(db) -> Optional[Dict]:
+    """The nightly run; only the worker holding today's lease detects and alerts"""
+    return run_once_daily(db, "attendance_shortage", lambda run_id: detect_attendance_shortage(db, run_id=run_id))
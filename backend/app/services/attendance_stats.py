@@ -0,0 +1,115 @@
+from datetime import date
+from typing import Dict, List
+from models.attendance import (
+    AttendanceStatus, AttendanceStatsResponse, FacultyAttendanceStats,
+    FacultySubjectAttendanceStats, OverallAttendanceStats, SubjectAttendanceStats
+)
+from app.services.attendance_windows import window_starts
+
+PRESENT = AttendanceStatus.PRESENT.value
+HOLIDAY = AttendanceStatus.HOLIDAY.value
+
+def _count_if(*conditions) -> Dict:
+    condition = conditions[0] if len(conditions) == 1 else {"$and": list(conditions)}
+    return {"$sum": {"$cond": [condition, 1, 0]}}
+
+def _window_conditions(today: date, date_field: str) -> Dict[str, Dict]:
+    today_start, week_start, month_start = window_starts(today)
+    return {
+        "daily": {"$eq": [date_field, today_start]},
+        "weekly": {"$and": [{"$gte": [date_field, week_start]}, {"$lte": [date_field, today_start]}]},
+        "monthly": {"$and": [{"$gte": [date_field, month_start]}, {"$lte": [date_field, today_start]}]}
+    }
+
+def _percentage(part: str, whole: str) -> Dict:
+    return {"$cond": [{"$gt": [whole, 0]}, {"$multiply": [{"$divide": [part, whole]}, 100]}, 0.0]}
+
+def student_stats_pipeline(student_id: str, today: date) -> List[Dict]:
+    """One round trip: every window plus the per-subject breakdown for a student"""
+    windows = _window_conditions(today, "$date")
+    present = {"$eq": ["$status", PRESENT]}
+    counters = {
+        "daily_count": _count_if(present, windows["daily"]),
+        "weekly_count": _count_if(present, windows["weekly"]),
+        "monthly_count": _count_if(present, windows["monthly"]),
+        "total_classes": {"$sum": 1},
+        "attended_classes": _count_if(present)
+    }
+    return [
+        {"$match": {"student_id": student_id, "status": {"$ne": HOLIDAY}}},
+        {"$project": {"_id": 0, "subject": 1, "date": 1, "status": 1}},
+        {"$facet": {
+            "overall": [
+                {"$group": {"_id": None, **counters}},
+                {"$set": {"average_percentage": _percentage("$attended_classes", "$total_classes")}}
+            ],
+            "by_subject": [
+                {"$group": {"_id": "$subject", **counters}},
+                {"$set": {"subject": "$_id", "percentage": _percentage("$attended_classes", "$total_classes")}},
+                {"$sort": {"subject": 1}}
+            ]
+        }}
+    ]
+
+def faculty_stats_pipeline(faculty_id: str, today: date) -> List[Dict]:
+    """One round trip: classes held per window plus per-subject attendance for a faculty"""
+    windows = _window_conditions(today, "$_id.date")
+    return [
+        {"$match": {"faculty_id": faculty_id, "status": {"$ne": HOLIDAY}}},
+        # A class is one (subject, date, period); collapse the roster rows first
+        {"$group": {
+            "_id": {"subject": "$subject", "date": "$date", "period": "$period"},
+            "marked": {"$sum": 1},
+            "present": _count_if({"$eq": ["$status", PRESENT]})
+        }},
+        {"$facet": {
+            "overall": [{"$group": {
+                "_id": None,
+                "daily_classes": _count_if(windows["daily"]),
+                "weekly_classes": _count_if(windows["weekly"]),
+                "monthly_classes": _count_if(windows["monthly"]),
+                "total_classes": {"$sum": 1}
+            }}],
+            "by_subject": [
+                {"$group": {
+                    "_id": "$_id.subject",
+                    "daily_count": _count_if(windows["daily"]),
+                    "weekly_count": _count_if(windows["weekly"]),
+                    "monthly_count": _count_if(windows["monthly"]),
+                    "total_classes": {"$sum": 1},
+                    "marked": {"$sum": "$marked"},
+                    "present": {"$sum": "$present"}
+                }},
+                {"$set": {"average_attendance": _percentage("$present", "$marked")}}
+            ]
+        }}
+    ]
+
+async def student_attendance_stats(db, student_id: str, today: date = None) -> AttendanceStatsResponse:
+    facets = (await db.attendance.aggregate(student_stats_pipeline(student_id, today or date.today())).to_list(length=1))[0]
+    overall = facets["overall"][0] if facets["overall"] else {}
+    return AttendanceStatsResponse(
+        overall_attendance=OverallAttendanceStats(
+            daily_count=overall.get("daily_count", 0),
+            weekly_count=overall.get("weekly_count", 0),
+            monthly_count=overall.get("monthly_count", 0),
+            total_classes=overall.get("total_classes", 0),
+            attended_classes=overall.get("attended_classes", 0),
+            average_percentage=overall.get("average_percentage", 0.0)
+        ),
+        subject_wise_attendance=[SubjectAttendanceStats(**subject) for subject in facets["by_subject"]]
+    )
+
+async def faculty_attendance_stats(db, faculty_id: str, today: date = None) -> FacultyAttendanceStats:
+    facets = (await db.attendance.aggregate(faculty_stats_pipeline(faculty_id, today or date.today())).to_list(length=1))[0]
+    overall = facets["overall"][0] if facets["overall"] else {}
+    return FacultyAttendanceStats(
+        daily_classes=overall.get("daily_classes", 0),
+        weekly_classes=overall.get("weekly_classes", 0),
+        monthly_classes=overall.get("monthly_classes", 0),
+        total_classes=overall.get("total_classes", 0),
+        subject_wise_stats={
+            subject["_id"]: FacultySubjectAttendanceStats(**subject)
+            for subject in facets["by_subject"]
+        }
+    )
@@ -0,0 +1,204 @@
+"""Time-bucketed counters behind the daily/weekly/monthly attendance counts.
+
+Writes bump a day bucket per (student, subject, date); the midnight job folds
+finished days into week and month buckets, so a window is read from a few
+buckets instead of the attendance rows. Window counts are attended classes.
+Only one worker compacts per night (see job_runs), and a fold that is
+retried or overlaps another never adds a day bucket twice.
+These helpers run in the background job and scripts on the synchronous database.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+import uuid
+from pymongo import DeleteOne, UpdateOne
+from core.config import settings, ATTENDANCE_BUCKETS_COLLECTION
+from models.attendance import AttendanceStatus
+from app.services.job_runs import run_once_daily
+
+logger = logging.getLogger(__name__)
+
+DAY = "day"
+WEEK = "week"
+MONTH = "month"
+
+WINDOW_FIELDS = ("daily_count", "weekly_count", "monthly_count")
+
+def window_starts(today: date) -> Tuple[str, str, str]:
+    """Start dates of the current day, week (Monday) and month as stored strings"""
+    week_start = today - timedelta(days=today.weekday())
+    return str(today), str(week_start), str(today.replace(day=1))
+
+def week_of(day: str) -> str:
+    parsed = date.fromisoformat(day)
+    return str(parsed - timedelta(days=parsed.weekday()))
+
+def month_of(day: str) -> str:
+    return day[:8] + "01"
+
+def window_deltas(day: str, attended: int, today: date) -> Tuple[int, int, int]:
+    """How an attended-count change on `day` moves today's three windows"""
+    today_start, week_start, month_start = window_starts(today)
+    return (
+        attended if day == today_start else 0,
+        attended if day >= week_start and day <= today_start else 0,
+        attended if day >= month_start and day <= today_start else 0
+    )
+
+def bucket_operations(deltas: Iterable[Tuple[str, str, str, int, int]]) -> List[UpdateOne]:
+    """Build day-bucket $inc upserts from (student_id, subject, date, total, attended) deltas"""
+    folded: Dict[Tuple[str, str, str], List[int]] = defaultdict(lambda: [0, 0])
+    for student_id, subject, day, total, attended in deltas:
+        counts = folded[(student_id, subject, day)]
+        counts[0] += total
+        counts[1] += attended
+
+    ops = []
+    for (student_id, subject, day), (total, attended) in folded.items():
+        if not total and not attended:
+            continue
+        ops.append(UpdateOne(
+            {"student_id": student_id, "granularity": DAY, "start": day, "subject": subject},
+            {"$inc": {"total_classes": total, "attended_classes": attended}},
+            upsert=True
+        ))
+    return ops
+
+def compact_buckets(db, today: Optional[date] = None, batch_size: int = 1000, run_id: Optional[str] = None) -> int:
+    """Fold every day bucket before today into its week and month buckets"""
+    today_start = str(today or date.today())
+    run_id = run_id or str(uuid.uuid4())
+    now = datetime.now()
+    buckets = db[ATTENDANCE_BUCKETS_COLLECTION]
+    # Claim first, so two runs never fold the same day; claims of a run that died go stale
+    stale = now - timedelta(seconds=settings.JOB_LEASE_SECONDS)
+    buckets.update_many(
+        {"granularity": DAY, "start": {"$lt": today_start}, "$or": [{"compacting_by": None}, {"compacting_at": {"$lt": stale}}]},
+        {"$set": {"compacting_by": run_id, "compacting_at": now}}
+    )
+    # A fold token survives a takeover, so a fold a dead run started is finished, not repeated
+    buckets.update_many({"granularity": DAY, "compacting_by": run_id, "fold": None}, {"$set": {"fold": run_id}})
+    compacted = 0
+    ops = []
+    for bucket in buckets.find({"granularity": DAY, "compacting_by": run_id}):
+        counts = {"total_classes": bucket.get("total_classes", 0), "attended_classes": bucket.get("attended_classes", 0)}
+        marker = f"{bucket['_id']}:{bucket['fold']}"
+        for granularity, start in ((WEEK, week_of(bucket["start"])), (MONTH, month_of(bucket["start"]))):
+            key = {"student_id": bucket["student_id"], "granularity": granularity, "start": start, "subject": bucket["subject"]}
+            ops.append(UpdateOne(key, {"$setOnInsert": {"total_classes": 0, "attended_classes": 0, "folded": []}}, upsert=True))
+            # `folded` lists the folds already added, so a retried fold adds nothing twice
+            ops.append(UpdateOne({**key, "folded": {"$ne": marker}}, {"$inc": counts, "$push": {"folded": marker}}))
+        # Delete only what was folded; a late write to a past day keeps its difference for the next run
+        folded = {"_id": bucket["_id"], "fold": bucket["fold"]}
+        ops.append(DeleteOne({**folded, **counts}))
+        ops.append(UpdateOne(folded, {
+            "$inc": {field: -value for field, value in counts.items()},
+            "$unset": {"fold": "", "compacting_by": "", "compacting_at": ""}
+        }))
+        compacted += 1
+        if len(ops) >= batch_size:
+            buckets.bulk_write(ops, ordered=True)
+            ops = []
+    if ops:
+        buckets.bulk_write(ops, ordered=True)
+    return compacted
+
+def _window_query(today: date, student_ids: Optional[List[str]] = None) -> Dict:
+    today_start, week_start, month_start = window_starts(today)
+    query = {"$or": [
+        {"granularity": DAY, "start": {"$gte": min(week_start, month_start), "$lte": today_start}},
+        {"granularity": WEEK, "start": week_start},
+        {"granularity": MONTH, "start": month_start}
+    ]}
+    if student_ids is not None:
+        query["student_id"] = {"$in": student_ids}
+    return query
+
+def _fold_windows(buckets: Iterable[Dict], today: date) -> Dict[str, Dict[str, List[int]]]:
+    """Fold window buckets into {student_id: {subject: [daily, weekly, monthly]}}"""
+    today_start, week_start, month_start = window_starts(today)
+    windows: Dict[str, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(lambda: [0, 0, 0]))
+    for bucket in buckets:
+        counts = windows[bucket["student_id"]][bucket["subject"]]
+        attended = bucket.get("attended_classes", 0)
+        if bucket["granularity"] == DAY:
+            daily, weekly, monthly = window_deltas(bucket["start"], attended, today)
+            counts[0] += daily
+            counts[1] += weekly
+            counts[2] += monthly
+        elif bucket["granularity"] == WEEK:
+            counts[1] += attended
+        else:
+            counts[2] += attended
+    return windows
+
+def window_counts(db, student_id: str, today: Optional[date] = None) -> Dict[str, Dict[str, int]]:
+    """Current daily/weekly/monthly attended counts per subject for one student"""
+    today = today or date.today()
+    buckets = db[ATTENDANCE_BUCKETS_COLLECTION].find(_window_query(today, [student_id]))
+    subjects = _fold_windows(buckets, today).get(student_id, {})
+    return {subject: dict(zip(WINDOW_FIELDS, counts)) for subject, counts in subjects.items()}
+
+def refresh_student_windows(db, today: Optional[date] = None, batch_size: int = 1000) -> int:
+    """Reset the window counters on student documents and re-derive them from buckets"""
+    today = today or date.today()
+    reset = {f"overall_attendance.{field}": 0 for field in WINDOW_FIELDS}
+    reset.update({f"subject_attendance.$[].{field}": 0 for field in WINDOW_FIELDS})
+    db.students.update_many(
+        {"$or": [{f"overall_attendance.{field}": {"$gt": 0}} for field in WINDOW_FIELDS]},
+        {"$set": reset}
+    )
+
+    windows = _fold_windows(db[ATTENDANCE_BUCKETS_COLLECTION].find(_window_query(today)), today)
+    ops = []
+    for student_id, subjects in windows.items():
+        overall = [0, 0, 0]
+        for subject, counts in subjects.items():
+            overall = [a + b for a, b in zip(overall, counts)]
+            ops.append(UpdateOne(
+                {"id": student_id, "subject_attendance.subject": subject},
+                {"$set": {f"subject_attendance.$.{field}": value for field, value in zip(WINDOW_FIELDS, counts)}}
+            ))
+        ops.append(UpdateOne(
+            {"id": student_id},
+            {"$set": {f"overall_attendance.{field}": value for field, value in zip(WINDOW_FIELDS, overall)}}
+        ))
+        if len(ops) >= batch_size:
+            db.students.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        db.students.bulk_write(ops, ordered=False)
+    return len(windows)
+
+def rebuild_buckets(db, student_ids: Optional[List[str]] = None) -> int:
+    """Recreate day buckets from raw attendance rows, then compact them"""
+    match = {"student_id": {"$in": student_ids}} if student_ids else {}
+    db[ATTENDANCE_BUCKETS_COLLECTION].delete_many(match)
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {"student_id": "$student_id", "subject": "$subject", "date": "$date"},
+            "total_classes": {"$sum": {"$cond": [{"$ne": ["$status", AttendanceStatus.HOLIDAY.value]}, 1, 0]}},
+            "attended_classes": {"$sum": {"$cond": [{"$eq": ["$status", AttendanceStatus.PRESENT.value]}, 1, 0]}}
+        }}
+    ]
+    deltas = (
+        (doc["_id"]["student_id"], doc["_id"]["subject"], doc["_id"]["date"], doc["total_classes"], doc["attended_classes"])
+        for doc in db.attendance.aggregate(pipeline, allowDiskUse=True)
+    )
+    ops = bucket_operations(deltas)
+    for start in range(0, len(ops), 1000):
+        db[ATTENDANCE_BUCKETS_COLLECTION].bulk_write(ops[start:start + 1000], ordered=False)
+    return compact_buckets(db)
+
+def _compact_and_refresh(db, run_id: str):
+    started = datetime.now()
+    compacted = compact_buckets(db, run_id=run_id)
+    refreshed = refresh_student_windows(db)
+    logger.info(f"Compacted {compacted} day buckets and refreshed {refreshed} students in {datetime.now() - started}")
+
+def run_midnight_compaction(db) -> None:
+    """Roll finished day buckets over and re-derive every student's window counters, once a day across workers"""
+    run_once_daily(db, "attendance_compaction", partial(_compact_and_refresh, db))
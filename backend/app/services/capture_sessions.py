@@ -0,0 +1,191 @@
+"""Live capture sessions: a classroom camera's frames, one attendance write.
+
+Frames arrive in ordered batches. A cheap sampler decodes each frame to a
+32x32 grayscale thumbnail (JPEGs are decoded at reduced scale) and skips
+frames whose mean absolute difference from the last sampled frame is under
+STREAM_FRAME_DIFF_THRESHOLD, so a static room costs almost nothing.
+Sampled frames go through the photo pipeline, and every recognized face
+adds its score to the student's track. Nothing is written to attendance
+until the session ends; students whose summed confidence reached
+STREAM_PRESENCE_CONFIDENCE are then marked present in one enroll_roster call.
+
+Each session earns STREAM_CPU_SHARE cores of processor time per second it
+has been open, plus STREAM_CPU_BURST_SECONDS. Sampled frames beyond the
+remaining allowance are dropped evenly across the batch, so the number of
+rooms a server can follow is about its cores / STREAM_CPU_SHARE. Used
+processor time is reported with every status.
+
+Session state lives in ATTENDANCE_SESSIONS_COLLECTION, so any worker can
+take a session's next batch.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import io
+import time
+import uuid
+import numpy as np
+from pymongo import ReturnDocument
+from core.config import settings, ATTENDANCE_SESSIONS_COLLECTION
+from models.attendance import AttendanceRosterCreate, AttendanceStatus, RosterEntry
+from app.services.attendance_service import enroll_roster
+from app.services.face_gallery import get_gallery
+from app.services.photo_pipeline import Image, get_photo_pipeline
+
+THUMBNAIL_SIZE = 32
+
+FRAME_COUNTERS = ("received", "sampled", "similar", "over_budget", "invalid")
+
+def frame_thumbnail(data: bytes) -> np.ndarray:
+    with Image.open(io.BytesIO(data)) as frame:
+        # JPEG frames decode straight to a small grayscale image
+        frame.draft("L", (THUMBNAIL_SIZE * 4, THUMBNAIL_SIZE * 4))
+        return np.asarray(frame.convert("L").resize((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.BILINEAR), dtype=np.uint8)
+
+def frame_difference(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.abs(a.astype(np.int16) - b.astype(np.int16)).mean())
+
+def sample_frames(frames: List[bytes], previous: Optional[np.ndarray], threshold: float) -> Tuple[List[int], List[np.ndarray], Dict[str, int], float]:
+    """Positions of frames that differ from the last sampled one, their thumbnails, counts and thread CPU seconds"""
+    cpu_started = time.thread_time()
+    kept, thumbnails = [], []
+    counts = {"similar": 0, "invalid": 0}
+    for position, data in enumerate(frames):
+        try:
+            thumbnail = frame_thumbnail(data)
+        except Exception:
+            counts["invalid"] += 1
+            continue
+        if previous is not None and frame_difference(thumbnail, previous) < threshold:
+            counts["similar"] += 1
+            continue
+        kept.append(position)
+        thumbnails.append(thumbnail)
+        previous = thumbnail
+    return kept, thumbnails, counts, time.thread_time() - cpu_started
+
+def cpu_allowance(session: Dict, now: datetime) -> float:
+    elapsed = (now - session["started_at"]).total_seconds()
+    return settings.STREAM_CPU_SHARE * elapsed + settings.STREAM_CPU_BURST_SECONDS - session["cpu_seconds"]
+
+def within_budget(kept: List[int], session: Dict, now: datetime) -> List[int]:
+    """The sampled positions the session can still afford, spread evenly over the batch"""
+    allowance = cpu_allowance(session, now)
+    if allowance <= 0:
+        return []
+    sampled = session["frames"]["sampled"]
+    # Until a frame has been measured, assume one frame fits
+    cost = session["cpu_seconds"] / sampled if sampled else allowance
+    affordable = max(1, int(allowance / cost)) if cost > 0 else len(kept)
+    if affordable >= len(kept):
+        return kept
+    return [kept[i] for i in np.linspace(0, len(kept) - 1, affordable).round().astype(int)]
+
+def new_session(section: str, subject: str, period: int, attendance_date, semester: Optional[int],
+                mark_absent: bool, faculty_id: str) -> Dict:
+    now = datetime.now()
+    return {
+        "id": str(uuid.uuid4()),
+        "faculty_id": faculty_id,
+        "section": section,
+        "subject": subject,
+        "period": period,
+        "date": str(attendance_date),
+        "semester": semester,
+        "mark_absent": mark_absent,
+        "status": "open",
+        "frames": {counter: 0 for counter in FRAME_COUNTERS},
+        "faces": 0,
+        "cpu_seconds": 0.0,
+        "thumbnail": None,
+        "tracks": {},
+        "attendance": None,
+        "started_at": now,
+        "updated_at": now
+    }
+
+def present_students(session: Dict) -> List[str]:
+    return sorted(
+        student_id for student_id, track in session["tracks"].items()
+        if track["confidence"] >= settings.STREAM_PRESENCE_CONFIDENCE
+    )
+
+async def ingest_frames(db, session: Dict, frames: List[bytes]) -> Optional[Dict]:
+    """Sample a batch of frames, match the sampled ones and fold them into the tracks; None once the session ended"""
+    now = datetime.now()
+    previous = None
+    if session.get("thumbnail"):
+        previous = np.frombuffer(session["thumbnail"], dtype=np.uint8).reshape(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+    kept, thumbnails, counts, cpu_seconds = await asyncio.to_thread(
+        sample_frames, frames, previous, settings.STREAM_FRAME_DIFF_THRESHOLD
+    )
+    affordable = within_budget(kept, session, now)
+
+    increments = {
+        "frames.received": len(frames),
+        "frames.similar": counts["similar"],
+        "frames.invalid": counts["invalid"],
+        "frames.over_budget": len(kept) - len(affordable),
+        "frames.sampled": len(affordable)
+    }
+    maxima: Dict = {}
+    update = {"$set": {"updated_at": now}}
+    if affordable:
+        gallery = await get_gallery(db, session["section"])
+        result = await get_photo_pipeline().run(
+            [frames[position] for position in affordable], gallery, settings.FACE_MATCH_TOP_K, settings.FACE_MATCH_THRESHOLD
+        )
+        cpu_seconds += result["timings"].get("cpu", 0.0)
+        increments["faces"] = len(result["faces"])
+        for face in result["faces"]:
+            if face["student_id"] is None:
+                continue
+            track = f"tracks.{face['student_id']}"
+            increments[f"{track}.frames"] = increments.get(f"{track}.frames", 0) + 1
+            increments[f"{track}.confidence"] = increments.get(f"{track}.confidence", 0.0) + face["score"]
+            maxima[f"{track}.best"] = max(maxima.get(f"{track}.best", 0.0), face["score"])
+        # Compare the next batch with the last frame that was actually sampled
+        update["$set"]["thumbnail"] = thumbnails[kept.index(affordable[-1])].tobytes()
+    increments["cpu_seconds"] = cpu_seconds
+    update["$inc"] = increments
+    if maxima:
+        update["$max"] = maxima
+
+    return await db[ATTENDANCE_SESSIONS_COLLECTION].find_one_and_update(
+        {"id": session["id"], "status": "open"}, update, projection={"_id": 0}, return_document=ReturnDocument.AFTER
+    )
+
+async def end_session(db, session_id: str) -> Optional[Dict]:
+    """Write the session's attendance once; None when it is not open"""
+    sessions = db[ATTENDANCE_SESSIONS_COLLECTION]
+    # Claiming the session first means a repeated end request cannot write twice
+    session = await sessions.find_one_and_update(
+        {"id": session_id, "status": "open"},
+        {"$set": {"status": "committing", "updated_at": datetime.now()}},
+        projection={"_id": 0}, return_document=ReturnDocument.AFTER
+    )
+    if session is None:
+        return None
+
+    present = present_students(session)
+    absent = []
+    if session["mark_absent"]:
+        gallery = await get_gallery(db, session["section"])
+        absent = sorted(set(gallery.student_ids) - set(present))
+    entries = [RosterEntry(student_id=student_id, status=AttendanceStatus.PRESENT) for student_id in present]
+    entries += [RosterEntry(student_id=student_id, status=AttendanceStatus.ABSENT) for student_id in absent]
+    roster = AttendanceRosterCreate(
+        date=session["date"], period=session["period"], subject=session["subject"],
+        entries=entries, section=session["section"], semester=session["semester"]
+    )
+    try:
+        summary = await enroll_roster(db, roster, session["faculty_id"]) if entries else {"rows": []}
+    except Exception:
+        await sessions.update_one({"id": session_id}, {"$set": {"status": "open"}})
+        raise
+
+    return await sessions.find_one_and_update(
+        {"id": session_id},
+        {"$set": {"status": "committed", "attendance": summary, "ended_at": datetime.now(), "updated_at": datetime.now()}},
+        projection={"_id": 0}, return_document=ReturnDocument.AFTER
+    )
@@ -0,0 +1,130 @@
+"""Semester and cumulative CGPA materialized on the student document.
+
+A result write only touches one (student, semester): that semester's results
+are re-read through the student_id index, graded per subject (mean percentage,
+credit weighted) and swapped into ``semester_results`` by a single pipeline
+update that also re-derives ``total_cgpa`` from the stored semesters. Other
+semesters are never re-read. ``recompute_cgpa`` re-runs the same refresh over
+every (student, semester) pair for regrading or after credit changes.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from pymongo import UpdateOne
+from core.config import settings, SUBJECT_CREDITS_COLLECTION
+from app.services.grading import GradeBoundaries, grade_batch
+
+StudentSemester = Tuple[str, int]
+
+def parse_grade_points(table: str) -> Dict[str, float]:
+    """Parse "A+:10,A:9,..." into grade -> grade points"""
+    points = {}
+    for item in table.split(","):
+        grade, value = item.rsplit(":", 1)
+        points[grade.strip()] = float(value)
+    return points
+
+GRADE_POINTS = parse_grade_points(settings.GRADE_POINTS)
+
+def _exam_result(result: Dict) -> Dict:
+    return {
+        "subject": result["subject"],
+        "exam_type": result.get("test_type"),
+        "marks_obtained": result.get("marks_obtained"),
+        "total_marks": result.get("total_marks"),
+        "percentage": result.get("percentage", 0.0),
+        "grade": result.get("grade"),
+        "exam_date": str(result.get("test_date"))[:10]
+    }
+
+def semester_entry(semester: int, results: List[Dict], credits: Dict[str, float],
+                   boundaries: Optional[GradeBoundaries] = None) -> Dict:
+    """Grade each subject on its mean percentage and credit-weight the grade points"""
+    by_subject: Dict[str, List[float]] = defaultdict(list)
+    for result in results:
+        by_subject[result["subject"]].append(result.get("percentage", 0.0))
+
+    subjects = sorted(by_subject)
+    means = np.array([np.mean(by_subject[subject]) for subject in subjects])
+    weights = np.array([credits.get(subject, settings.DEFAULT_SUBJECT_CREDITS) for subject in subjects])
+    _, grades = grade_batch(means, np.full(len(means), 100.0), boundaries)
+    points = np.array([GRADE_POINTS.get(grade, 0.0) for grade in grades])
+    total_credits = float(weights.sum())
+    cgpa = round(float((points * weights).sum() / total_credits), 2) if total_credits > 0 else 0.0
+
+    entry = {"semester": semester, "cgpa": cgpa, "credits": total_credits, "subjects": [], "internal_results": [], "lab_results": []}
+    for result in sorted(results, key=lambda r: (r["subject"], str(r.get("test_date")))):
+        bucket = {"internal": "internal_results", "lab": "lab_results"}.get(result.get("test_type"), "subjects")
+        entry[bucket].append(_exam_result(result))
+    return entry
+
+# Cumulative CGPA is the credit-weighted mean of the stored semester CGPAs
+REFRESH_TOTAL_CGPA = {"$set": {"total_cgpa": {"$let": {
+    "vars": {
+        "credits": {"$sum": "$semester_results.credits"},
+        "points": {"$sum": {"$map": {
+            "input": "$semester_results",
+            "in": {"$multiply": ["$$this.cgpa", "$$this.credits"]}
+        }}}
+    },
+    "in": {"$cond": [{"$gt": ["$$credits", 0]}, {"$round": [{"$divide": ["$$points", "$$credits"]}, 2]}, 0.0]}
+}}}}
+
+def semester_update(semester: int, entry: Optional[Dict]) -> List[Dict]:
+    """Pipeline replacing one semester's entry (or dropping it) and refreshing total_cgpa"""
+    kept = {"$filter": {
+        "input": {"$ifNull": ["$semester_results", []]},
+        "cond": {"$ne": ["$$this.semester", semester]}
+    }}
+    semesters = {"$concatArrays": [kept, [{"$literal": entry}]]} if entry else kept
+    return [{"$set": {"semester_results": semesters, "updated_at": datetime.now()}}, REFRESH_TOTAL_CGPA]
+
+async def subject_credits(db, subjects: Iterable[str]) -> Dict[str, float]:
+    docs = db[SUBJECT_CREDITS_COLLECTION].find({"subject": {"$in": list(subjects)}}, {"_id": 0, "subject": 1, "credits": 1})
+    return {doc["subject"]: doc["credits"] async for doc in docs}
+
+async def refresh_semesters(db, pairs: Iterable[StudentSemester]) -> int:
+    """Recompute the given (student_id, semester) pairs with one read per semester and one bulk write"""
+    students_by_semester: Dict[int, Set[str]] = defaultdict(set)
+    for student_id, semester in pairs:
+        students_by_semester[semester].add(student_id)
+    if not students_by_semester:
+        return 0
+
+    results: Dict[StudentSemester, List[Dict]] = defaultdict(list)
+    for semester, student_ids in students_by_semester.items():
+        async for result in db.results.find({"student_id": {"$in": list(student_ids)}, "semester": semester}, {"_id": 0}):
+            results[(result["student_id"], semester)].append(result)
+    credits = await subject_credits(db, {result["subject"] for rows in results.values() for result in rows})
+
+    ops = []
+    for semester, student_ids in students_by_semester.items():
+        for student_id in student_ids:
+            rows = results.get((student_id, semester))
+            entry = semester_entry(semester, rows, credits) if rows else None
+            ops.append(UpdateOne({"id": student_id}, semester_update(semester, entry)))
+    await db.students.bulk_write(ops, ordered=False)
+    return len(ops)
+
+async def recompute_cgpa(db, match: Optional[Dict] = None, batch_size: int = 500) -> int:
+    """Full recompute for every (student, semester) with results matching `match`.
+
+    Without a match, semesters already on student documents are included too,
+    so entries whose results were all deleted get dropped.
+    """
+    pairs: Set[StudentSemester] = set()
+    async for pair in db.results.aggregate([
+        {"$match": match or {}},
+        {"$group": {"_id": {"student_id": "$student_id", "semester": "$semester"}}}
+    ], allowDiskUse=True):
+        pairs.add((pair["_id"]["student_id"], pair["_id"]["semester"]))
+    if match is None:
+        async for student in db.students.find({"semester_results.0": {"$exists": True}}, {"_id": 0, "id": 1, "semester_results.semester": 1}):
+            pairs.update((student["id"], entry["semester"]) for entry in student["semester_results"])
+
+    ordered = sorted(pairs)
+    refreshed = 0
+    for start in range(0, len(ordered), batch_size):
+        refreshed += await refresh_semesters(db, ordered[start:start + batch_size])
+    return refreshed
@@ -1,22 +1,80 @@
 import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import time
+from email.message import EmailMessage
+from typing import Dict, Optional
 from core.config import settings
 
-async def send_verification_email(to_email: str, verification_link: str):
-    msg = MIMEMultipart()
-    msg['From'] = settings.FROM_EMAIL
+def build_message(to_email: str, subject: str, body: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg['From'] = settings.FROM_EMAIL or settings.SMTP_USERNAME
     msg['To'] = to_email
-    msg['Subject'] = 'Email Verification'
-
-    body = f"Please verify your email by clicking on the following link: {verification_link}"
-    msg.attach(MIMEText(body, 'plain'))
-
-    try:
-        with smtplib.SMTP(settings.SMTP_SERVER, settings.SMTP_PORT) as server:
-            server.starttls()
-            server.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
-            server.send_message(msg)
-            print("Verification email sent successfully.")
-    except Exception as e:
-        print(f"Failed to send email: {e}")
+    msg['Subject'] = subject
+    msg.set_content(body)
+    return msg
+
+def is_permanent_failure(error: Exception) -> bool:
+    """5xx replies about the message or recipient will fail again; everything else is retried"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+class SMTPSession:
+    """One authenticated SMTP connection reused for many messages.
+
+    Connects (EHLO, STARTTLS, login) on first use, reconnects once when the
+    server has dropped an idle connection, and is closed by its owner.
+    """
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None,
+                 username: Optional[str] = None, password: Optional[str] = None,
+                 starttls: Optional[bool] = None, timeout: Optional[float] = None):
+        self.host = host or settings.SMTP_SERVER
+        self.port = port or settings.SMTP_PORT
+        self.username = settings.SMTP_USERNAME if username is None else username
+        self.password = settings.SMTP_PASSWORD if password is None else password
+        self.starttls = settings.SMTP_STARTTLS if starttls is None else starttls
+        self.timeout = timeout or settings.SMTP_TIMEOUT_SECONDS
+        self.last_used = time.monotonic()
+        self._server: Optional[smtplib.SMTP] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._server is not None
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.ehlo()
+            if self.starttls:
+                server.starttls()
+                server.ehlo()
+            if self.username:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+
+    def send(self, message: EmailMessage) -> Dict:
+        if self._server is None:
+            self._connect()
+        try:
+            refused = self._server.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            self._server = None
+            self._connect()
+            refused = self._server.send_message(message)
+        self.last_used = time.monotonic()
+        return refused
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except smtplib.SMTPException:
+            self._server.close()
+        except OSError:
+            pass
+        self._server = None
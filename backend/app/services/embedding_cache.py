@@ -0,0 +1,104 @@
+"""Content-addressed cache of face embeddings on local disk.
+
+A photo's key is sha256(model version + image bytes), so an unchanged
+photo never goes through the embedding model twice for the same model,
+while a model upgrade misses naturally and the old entries age out.
+Vectors live in a fixed (capacity x dim) float32 .npy file that is
+memory-mapped, so a hit reads one row from the page cache; the key ->
+row map is a small JSON file kept in least-recently-used order. When the
+cache is full the least recently used row is overwritten.
+
+Open it with `with EmbeddingCache.open() as cache:`, which holds an
+exclusive lock beside the directory and saves the key map on exit.
+"""
+from contextlib import contextmanager
+from collections import OrderedDict
+from typing import Dict, Iterator, Optional
+import hashlib
+import json
+import os
+import numpy as np
+from core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent writers are not serialized
+    fcntl = None
+
+def photo_key(data: bytes, model_version: Optional[str] = None) -> str:
+    digest = hashlib.sha256((model_version or settings.FACE_MODEL_VERSION).encode())
+    digest.update(b"\0")
+    digest.update(data)
+    return digest.hexdigest()
+
+class EmbeddingCache:
+    def __init__(self, path: str, dim: int, capacity: int):
+        self.path = path
+        self.dim = dim
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(path, exist_ok=True)
+        vectors_path = os.path.join(path, "vectors.npy")
+        slots = self._read_slots()
+        if slots is None or not os.path.exists(vectors_path):
+            # New cache, or its shape no longer matches the settings: start over
+            self.vectors = np.lib.format.open_memmap(vectors_path, mode="w+", dtype=np.float32, shape=(capacity, dim))
+            self.slots: "OrderedDict[str, int]" = OrderedDict()
+        else:
+            self.vectors = np.load(vectors_path, mmap_mode="r+")
+            self.slots = OrderedDict(slots)
+        self.free = sorted(set(range(capacity)) - set(self.slots.values()), reverse=True)
+
+    def _read_slots(self) -> Optional[Dict[str, int]]:
+        try:
+            with open(os.path.join(self.path, "slots.json")) as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return None
+        if saved.get("dim") != self.dim or saved.get("capacity") != self.capacity:
+            return None
+        return saved["slots"]
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.slots
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        slot = self.slots.get(key)
+        if slot is None:
+            self.misses += 1
+            return None
+        self.slots.move_to_end(key)
+        self.hits += 1
+        return np.array(self.vectors[slot])
+
+    def put(self, key: str, vector: np.ndarray):
+        slot = self.slots.pop(key, None)
+        if slot is None:
+            slot = self.free.pop() if self.free else self.slots.popitem(last=False)[1]
+        self.vectors[slot] = vector
+        self.slots[key] = slot
+
+    def save(self):
+        self.vectors.flush()
+        # Key map last, so every row it names is already on disk
+        tmp = os.path.join(self.path, "slots.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"dim": self.dim, "capacity": self.capacity, "slots": list(self.slots.items())}, f)
+        os.replace(tmp, os.path.join(self.path, "slots.json"))
+
+    @classmethod
+    @contextmanager
+    def open(cls, path: Optional[str] = None, dim: Optional[int] = None, capacity: Optional[int] = None) -> Iterator["EmbeddingCache"]:
+        path = path or settings.EMBEDDING_CACHE_DIR
+        with open(path.rstrip("/") + ".lock", "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            cache = cls(path, dim or settings.FACE_EMBEDDING_DIM, capacity or settings.EMBEDDING_CACHE_CAPACITY)
+            try:
+                yield cache
+            finally:
+                cache.save()
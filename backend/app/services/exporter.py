@@ -0,0 +1,64 @@
+from enum import Enum
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+import csv
+import io
+import json
+
+EXPORT_BATCH_SIZE = 5000
+
+ATTENDANCE_EXPORT_COLUMNS = [
+    "id", "student_id", "faculty_id", "date", "period", "subject", "status",
+    "section", "semester", "created_at", "updated_at"
+]
+RESULTS_EXPORT_COLUMNS = [
+    "id", "student_id", "subject", "test_type", "test_date", "marks_obtained", "total_marks",
+    "percentage", "grade", "semester", "section", "created_at", "updated_at"
+]
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv"
+}
+
+def export_query(date_field: str, start_date: Optional[str] = None, end_date: Optional[str] = None, **filters) -> Dict:
+    """Equality filters plus an inclusive date range on the stored date strings"""
+    query = {field: value for field, value in filters.items() if value is not None}
+    if start_date or end_date:
+        query[date_field] = {}
+        if start_date:
+            query[date_field]["$gte"] = start_date
+        if end_date:
+            query[date_field]["$lte"] = end_date
+    return query
+
+def _csv_line(values: Sequence) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(["" if value is None else value for value in values])
+    return buffer.getvalue()
+
+async def stream_export(collection, query: Dict, columns: List[str], sort_field: str,
+                        fmt: ExportFormat, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    """Yield one encoded chunk per cursor batch, so memory is bounded by batch_size rows"""
+    projection = {"_id": 0, **{column: 1 for column in columns}}
+    cursor = collection.find(query, projection).sort(sort_field, 1).batch_size(batch_size)
+    lines: List[str] = []
+    if fmt == ExportFormat.CSV:
+        lines.append(_csv_line(columns))
+    try:
+        async for doc in cursor:
+            if fmt == ExportFormat.CSV:
+                lines.append(_csv_line([doc.get(column) for column in columns]))
+            else:
+                lines.append(json.dumps({column: doc.get(column) for column in columns}, default=str) + "\n")
+            if len(lines) >= batch_size:
+                yield "".join(lines).encode()
+                lines = []
+        if lines:
+            yield "".join(lines).encode()
+    finally:
+        # Client disconnects cancel the generator; release the server-side cursor
+        await cursor.close()
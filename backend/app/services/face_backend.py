@@ -0,0 +1,91 @@
+"""Pluggable face detector and embedder for the classroom-photo pipeline.
+
+No model ships with the backend. A deployment points FACE_BACKEND at a
+subclass of FaceBackend ("package.module:Class") that implements `detect`
+and `embed` with its model runtime of choice; alignment to the standard
+112x112 five-landmark template is provided here in numpy. The class is
+instantiated once per pipeline worker process, so it may load models in
+its constructor. Its embeddings must be those of FACE_MODEL_VERSION.
+"""
+from abc import ABC, abstractmethod
+from typing import List, NamedTuple
+import importlib
+import numpy as np
+
+# Eyes, nose tip and mouth corners in a 112x112 crop (ArcFace convention)
+FACE_TEMPLATE = np.array([
+    [38.2946, 51.6963],
+    [73.5318, 51.5014],
+    [56.0252, 71.7366],
+    [41.5493, 92.3655],
+    [70.7299, 92.2041]
+], dtype=np.float32)
+CROP_SIZE = 112
+
+class DetectedFace(NamedTuple):
+    box: np.ndarray        # x1, y1, x2, y2
+    landmarks: np.ndarray  # 5 x 2, in FACE_TEMPLATE order
+    score: float
+
+def similarity_transform(source: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """2x3 least-squares similarity (Umeyama) mapping `source` points onto `target`"""
+    source_mean, target_mean = source.mean(axis=0), target.mean(axis=0)
+    source_centered, target_centered = source - source_mean, target - target_mean
+    covariance = target_centered.T @ source_centered / len(source)
+    u, singular, vt = np.linalg.svd(covariance)
+    sign = np.eye(2)
+    if np.linalg.det(u) * np.linalg.det(vt) < 0:
+        sign[1, 1] = -1
+    rotation = u @ sign @ vt
+    scale = np.trace(np.diag(singular) @ sign) / max(source_centered.var(axis=0).sum(), 1e-12)
+    matrix = np.zeros((2, 3))
+    matrix[:, :2] = scale * rotation
+    matrix[:, 2] = target_mean - matrix[:, :2] @ source_mean
+    return matrix
+
+def warp_affine(image: np.ndarray, matrix: np.ndarray, size: int) -> np.ndarray:
+    """Bilinear (size x size) crop whose pixel (x, y) maps to `matrix` @ source pixel"""
+    inverse = np.linalg.inv(np.vstack([matrix, [0, 0, 1]]))[:2].astype(np.float32)
+    ys, xs = np.mgrid[0:size, 0:size].astype(np.float32)
+    source_x = inverse[0, 0] * xs + inverse[0, 1] * ys + inverse[0, 2]
+    source_y = inverse[1, 0] * xs + inverse[1, 1] * ys + inverse[1, 2]
+    height, width = image.shape[:2]
+    x0 = np.clip(np.floor(source_x), 0, width - 2).astype(np.intp)
+    y0 = np.clip(np.floor(source_y), 0, height - 2).astype(np.intp)
+    fx = np.clip(source_x - x0, 0, 1)[..., None]
+    fy = np.clip(source_y - y0, 0, 1)[..., None]
+    # Gather only the four neighbours of each output pixel, never convert the whole photo
+    pixels = image.reshape(-1, image.shape[2])
+    corner = y0 * width + x0
+    top = np.take(pixels, corner, axis=0) * (1 - fx) + np.take(pixels, corner + 1, axis=0) * fx
+    bottom = np.take(pixels, corner + width, axis=0) * (1 - fx) + np.take(pixels, corner + width + 1, axis=0) * fx
+    crop = top * (1 - fy) + bottom * fy
+    outside = (source_x < 0) | (source_x > width - 1) | (source_y < 0) | (source_y > height - 1)
+    crop[outside] = 0
+    return (crop + 0.5).astype(np.uint8)
+
+class FaceBackend(ABC):
+    """Detector and embedder used inside pipeline worker processes"""
+
+    @abstractmethod
+    def detect(self, image: np.ndarray) -> List[DetectedFace]:
+        """Faces in an (H x W x 3) RGB uint8 image"""
+
+    def align(self, image: np.ndarray, face: DetectedFace) -> np.ndarray:
+        """A (112 x 112 x 3) crop with the landmarks on FACE_TEMPLATE"""
+        matrix = similarity_transform(np.asarray(face.landmarks, dtype=np.float64), FACE_TEMPLATE.astype(np.float64))
+        return warp_affine(image, matrix, CROP_SIZE)
+
+    @abstractmethod
+    def embed(self, crops: np.ndarray) -> np.ndarray:
+        """(n x FACE_EMBEDDING_DIM) embeddings for (n x 112 x 112 x 3) aligned crops"""
+
+def load_backend(path: str) -> FaceBackend:
+    module_name, _, class_name = path.partition(":")
+    if not module_name or not class_name:
+        raise ValueError(f"FACE_BACKEND must look like 'package.module:Class', got {path!r}")
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    if not (isinstance(backend_class, type) and issubclass(backend_class, FaceBackend)):
+        raise TypeError(f"{path} is not a FaceBackend subclass")
+    # A subclass missing detect or embed fails here with a TypeError naming them
+    return backend_class()
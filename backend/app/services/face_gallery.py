@@ -0,0 +1,128 @@
+"""Per-section face galleries and the vectorized matcher.
+
+Embeddings are stored L2-normalized as raw float32 bytes, so a gallery
+loads as one contiguous (rows x dim) float32 matrix with each student's
+rows adjacent. Matching a frame is a single matrix multiply of its faces
+against the gallery, then argpartition picks the best rows per face
+without sorting the whole row; a student with several embeddings scores
+as their best row.
+
+Galleries are cached per (model version, section) and dropped when that
+section's embeddings change, with a TTL for writes made by other workers.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+import asyncio
+import time
+import numpy as np
+from core.config import settings, FACE_EMBEDDINGS_COLLECTION
+
+Candidate = Tuple[str, float]
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def encode_vector(vector: np.ndarray) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+def decode_vectors(blobs: Sequence[bytes], dim: int) -> np.ndarray:
+    return np.frombuffer(b"".join(blobs), dtype=np.float32).reshape(len(blobs), dim)
+
+class FaceGallery:
+    def __init__(self, student_ids: Sequence[str], vectors: np.ndarray):
+        """`student_ids` names the owner of each row of `vectors`"""
+        order = sorted(range(len(student_ids)), key=student_ids.__getitem__)
+        owners = [student_ids[i] for i in order]
+        self.matrix = normalize(vectors[order])
+        self.student_ids: List[str] = sorted(set(owners))
+        positions = {student_id: index for index, student_id in enumerate(self.student_ids)}
+        self.row_owner = np.array([positions[owner] for owner in owners], dtype=np.intp)
+        self.max_rows = int(np.bincount(self.row_owner).max()) if len(owners) else 0
+
+    def __len__(self) -> int:
+        return len(self.student_ids)
+
+    @property
+    def rows(self) -> int:
+        return self.matrix.shape[0]
+
+    def match(self, queries: np.ndarray, top_k: int, threshold: float) -> List[List[Candidate]]:
+        """Best `top_k` students per face at or above `threshold`, highest first"""
+        if len(self) == 0 or len(queries) == 0:
+            return [[] for _ in range(len(queries))]
+        similarities = normalize(queries) @ self.matrix.T
+        # A student's best row outranks all but the rows of higher-scoring
+        # students, so the top k students are always within the top k * max_rows rows
+        depth = min(top_k * self.max_rows, similarities.shape[1])
+        best = np.argpartition(-similarities, depth - 1, axis=1)[:, :depth]
+        best_scores = np.take_along_axis(similarities, best, axis=1)
+        order = np.argsort(-best_scores, axis=1)
+        best = self.row_owner[np.take_along_axis(best, order, axis=1)]
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+
+        matches = []
+        for owners, scores in zip(best.tolist(), best_scores.tolist()):
+            candidates, seen = [], set()
+            for owner, score in zip(owners, scores):
+                if score < threshold or len(candidates) == top_k:
+                    break
+                if owner not in seen:
+                    seen.add(owner)
+                    candidates.append((self.student_ids[owner], float(score)))
+            matches.append(candidates)
+        return matches
+
+def assign_unique(candidates: List[List[Candidate]]) -> List[Optional[Candidate]]:
+    """Give each face at most one student and each student at most one face, best scores first"""
+    ranked = sorted(
+        ((score, face, student_id) for face, options in enumerate(candidates) for student_id, score in options),
+        reverse=True
+    )
+    assigned: List[Optional[Candidate]] = [None] * len(candidates)
+    taken = set()
+    for score, face, student_id in ranked:
+        if assigned[face] is None and student_id not in taken:
+            assigned[face] = (student_id, score)
+            taken.add(student_id)
+    return assigned
+
+def gallery_query(section: Optional[str] = None, model_version: Optional[str] = None) -> Dict:
+    # vector is None on the marker left for a registration photo without a face
+    query = {"model_version": model_version or settings.FACE_MODEL_VERSION, "vector": {"$ne": None}}
+    if section is not None:
+        query["section"] = section
+    return query
+
+async def load_gallery(db, section: Optional[str] = None) -> FaceGallery:
+    docs = await db[FACE_EMBEDDINGS_COLLECTION].find(
+        gallery_query(section), {"_id": 0, "student_id": 1, "vector": 1}
+    ).to_list(length=None)
+    vectors = decode_vectors([doc["vector"] for doc in docs], settings.FACE_EMBEDDING_DIM)
+    return FaceGallery([doc["student_id"] for doc in docs], vectors)
+
+_galleries: Dict[Optional[str], Tuple[FaceGallery, float]] = {}
+_lock = asyncio.Lock()
+
+def _fresh(section: Optional[str]) -> Optional[FaceGallery]:
+    cached = _galleries.get(section)
+    if cached is not None and time.monotonic() - cached[1] < settings.FACE_GALLERY_TTL_SECONDS:
+        return cached[0]
+    return None
+
+async def get_gallery(db, section: Optional[str] = None) -> FaceGallery:
+    """A section's gallery, or the campus-wide one when section is None"""
+    gallery = _fresh(section)
+    if gallery is not None:
+        return gallery
+    async with _lock:
+        gallery = _fresh(section)
+        if gallery is None:
+            gallery = await load_gallery(db, section)
+            _galleries[section] = (gallery, time.monotonic())
+    return gallery
+
+def invalidate_gallery(section: Optional[str] = None):
+    """Drop a section's gallery and the campus-wide one that includes it"""
+    _galleries.pop(section, None)
+    _galleries.pop(None, None)
@@ -0,0 +1,282 @@
+"""Approximate nearest-neighbour (IVF) index for campus-wide face search.
+
+A spherical k-means quantizer splits the embeddings into inverted lists.
+A query only scans the rows of its `nprobe` closest lists, and all
+queries probing the same list share one matrix multiply. The index is
+saved as .npy files and memory-mapped on load, so every worker shares the
+page cache instead of holding its own copy. Writers hold an exclusive
+flock on the index's lock file and reloads take a shared one, so a reader never
+sees half of an update or a directory mid-swap.
+
+Updates do not rebuild the index. A student's new embeddings go to a small
+delta (scanned exhaustively) and their old rows are masked. Once the delta
+passes FACE_ANN_DELTA_LIMIT rows it is folded into the inverted lists
+with the existing centroids. build_face_index.py retrains from scratch.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import json
+import logging
+import os
+import shutil
+import numpy as np
+from core.config import settings
+from app.services.face_gallery import Candidate, normalize
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent updates from several workers are not serialized
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+def train_centroids(vectors: np.ndarray, nlist: int, iterations: int = 20, sample: int = 256, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on at most `sample` rows per list"""
+    rng = np.random.default_rng(seed)
+    if len(vectors) > nlist * sample:
+        vectors = vectors[rng.choice(len(vectors), nlist * sample, replace=False)]
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = np.bincount(assignment, minlength=nlist) == 0
+        # Re-seed empty lists from random rows rather than leaving them dead
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = normalize(sums)
+    return centroids
+
+def default_nlist(rows: int) -> int:
+    return max(1, min(rows, int(np.sqrt(rows))))
+
+class IVFIndex:
+    def __init__(self, centroids: np.ndarray, vectors: np.ndarray, offsets: np.ndarray, owners: np.ndarray,
+                 student_ids: List[str], meta: Dict, delta_vectors: Optional[np.ndarray] = None,
+                 delta_owners: Optional[List[str]] = None, removed: Iterable[str] = ()):
+        self.centroids = centroids
+        self.vectors = vectors
+        self.offsets = offsets
+        self.owners = owners
+        self.student_ids = student_ids
+        self.meta = meta
+        self.delta_vectors = delta_vectors if delta_vectors is not None else np.zeros((0, centroids.shape[1]), dtype=np.float32)
+        self.delta_owners = list(delta_owners or [])
+        self.removed = set(removed)
+        positions = {student_id: index for index, student_id in enumerate(student_ids)}
+        removed_positions = [positions[student_id] for student_id in self.removed if student_id in positions]
+        self.alive = ~np.isin(owners, removed_positions)
+        counts = np.bincount(owners) if len(owners) else np.zeros(0, dtype=int)
+        self.max_rows = int(max(counts.max() if len(counts) else 0, settings.FACE_MAX_EMBEDDINGS_PER_STUDENT, 1))
+
+    @classmethod
+    def build(cls, row_owners: Sequence[str], vectors: np.ndarray, nlist: Optional[int] = None,
+              centroids: Optional[np.ndarray] = None) -> "IVFIndex":
+        vectors = normalize(vectors)
+        if centroids is None:
+            centroids = train_centroids(vectors, nlist or default_nlist(len(vectors)))
+        assignment = np.argmax(vectors @ centroids.T, axis=1) if len(vectors) else np.zeros(0, dtype=np.intp)
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=len(centroids)))]).astype(np.int64)
+        student_ids = sorted(set(row_owners))
+        positions = {student_id: index for index, student_id in enumerate(student_ids)}
+        owners = np.array([positions[row_owners[row]] for row in order], dtype=np.int32)
+        meta = {
+            "model_version": settings.FACE_MODEL_VERSION,
+            "dim": int(vectors.shape[1]),
+            "nlist": int(len(centroids)),
+            "rows": int(len(vectors)),
+            "built_at": datetime.now().isoformat()
+        }
+        return cls(centroids, vectors[order], offsets, owners, student_ids, meta)
+
+    def search(self, queries: np.ndarray, top_k: int, threshold: float, nprobe: Optional[int] = None) -> List[List[Candidate]]:
+        """Best `top_k` students per face from the `nprobe` closest lists plus the delta"""
+        queries = normalize(queries)
+        nprobe = min(nprobe or settings.FACE_ANN_NPROBE, len(self.centroids))
+        depth = top_k * self.max_rows
+        found: List[List[Tuple[np.ndarray, np.ndarray]]] = [[] for _ in range(len(queries))]
+        if len(queries) == 0:
+            return []
+
+        probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        probing = np.argsort(probes, axis=None, kind="stable") // nprobe
+        lists = np.sort(probes, axis=None)
+        boundaries = np.flatnonzero(np.diff(lists)) + 1
+        for members, list_id in zip(np.split(probing, boundaries), lists[np.concatenate([[0], boundaries])]):
+            start, end = int(self.offsets[list_id]), int(self.offsets[list_id + 1])
+            if start == end:
+                continue
+            block = queries[members] @ self.vectors[start:end].T
+            block[:, ~self.alive[start:end]] = -np.inf
+            self._collect(found, members, block, depth, self.owners[start:end])
+
+        if len(self.delta_owners):
+            # Delta rows are numbered after the base students
+            codes = np.arange(len(self.student_ids), len(self.student_ids) + len(self.delta_owners))
+            self._collect(found, np.arange(len(queries)), queries @ self.delta_vectors.T, depth, codes)
+        return [self._merge(parts, top_k, threshold) for parts in found]
+
+    def _owner(self, code: int) -> str:
+        base = len(self.student_ids)
+        return self.student_ids[code] if code < base else self.delta_owners[code - base]
+
+    @staticmethod
+    def _collect(found, members: np.ndarray, block: np.ndarray, depth: int, codes: np.ndarray):
+        take = min(depth, block.shape[1])
+        top = np.argpartition(-block, take - 1, axis=1)[:, :take]
+        scores = np.take_along_axis(block, top, axis=1)
+        for query, rows, row_scores in zip(members.tolist(), codes[top], scores):
+            found[query].append((row_scores, rows))
+
+    def _merge(self, parts, top_k: int, threshold: float) -> List[Candidate]:
+        if not parts:
+            return []
+        scores = np.concatenate([part[0] for part in parts])
+        codes = np.concatenate([part[1] for part in parts])
+        order = np.argsort(-scores)
+        candidates, seen = [], set()
+        for code, score in zip(codes[order].tolist(), scores[order].tolist()):
+            if score < threshold or len(candidates) == top_k:
+                break
+            owner = self._owner(code)
+            if owner not in seen:
+                seen.add(owner)
+                candidates.append((owner, score))
+        return candidates
+
+    def with_student(self, student_id: str, vectors: np.ndarray) -> "IVFIndex":
+        """A copy with a student's embeddings replaced (none removes them); the lists are shared, not copied"""
+        keep = [row for row, owner in enumerate(self.delta_owners) if owner != student_id]
+        delta_vectors = np.concatenate([self.delta_vectors[keep], normalize(vectors)]) if len(vectors) else self.delta_vectors[keep]
+        delta_owners = [self.delta_owners[row] for row in keep] + [student_id] * len(vectors)
+        removed = self.removed | {student_id} if student_id in self.student_ids else self.removed
+        return IVFIndex(
+            self.centroids, self.vectors, self.offsets, self.owners, self.student_ids, self.meta,
+            delta_vectors, delta_owners, removed
+        )
+
+    def compacted(self) -> "IVFIndex":
+        """Fold the delta into the lists and drop masked rows, keeping the centroids"""
+        live = np.flatnonzero(self.alive)
+        owners = [self.student_ids[owner] for owner in self.owners[live]] + self.delta_owners
+        vectors = np.concatenate([np.asarray(self.vectors[live]), self.delta_vectors])
+        return IVFIndex.build(owners, vectors, centroids=np.asarray(self.centroids))
+
+    def save(self, path: str, delta_only: bool = False):
+        os.makedirs(path, exist_ok=True)
+        if not delta_only:
+            for name in ("centroids", "vectors", "offsets", "owners"):
+                _atomic_save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+            _atomic_json(os.path.join(path, "students.json"), self.student_ids)
+        # One file, so the delta's rows and owners are always replaced together
+        with open(os.path.join(path, "delta.npz.tmp"), "wb") as f:
+            np.savez(
+                f, vectors=self.delta_vectors,
+                owners=np.array(self.delta_owners, dtype=str), removed=np.array(sorted(self.removed), dtype=str)
+            )
+        os.replace(os.path.join(path, "delta.npz.tmp"), os.path.join(path, "delta.npz"))
+        # Written last: readers reload when meta.json changes
+        _atomic_json(os.path.join(path, "meta.json"), self.meta)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "IVFIndex":
+        mode = "r" if mmap else None
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in ("centroids", "vectors", "offsets", "owners")}
+        with open(os.path.join(path, "students.json")) as f:
+            student_ids = json.load(f)
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        delta_vectors, delta_owners, removed = None, None, ()
+        if os.path.exists(os.path.join(path, "delta.npz")):
+            with np.load(os.path.join(path, "delta.npz")) as delta:
+                delta_vectors, delta_owners, removed = delta["vectors"], delta["owners"].tolist(), delta["removed"].tolist()
+        return cls(
+            np.asarray(arrays["centroids"]), arrays["vectors"], np.asarray(arrays["offsets"]), np.asarray(arrays["owners"]),
+            student_ids, meta, delta_vectors, delta_owners, removed
+        )
+
+def _atomic_save(path: str, array: np.ndarray):
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, np.asarray(array))
+    os.replace(path + ".tmp", path)
+
+def _atomic_json(path: str, value):
+    with open(path + ".tmp", "w") as f:
+        json.dump(value, f)
+    os.replace(path + ".tmp", path)
+
+@contextmanager
+def index_lock(path: Optional[str] = None, shared: bool = False):
+    """flock on the file beside the index directory, since compaction swaps the directory itself"""
+    path = os.path.abspath(path or settings.FACE_ANN_INDEX_DIR)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".lock", "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+
+def save_index(index: IVFIndex, path: Optional[str] = None):
+    """Write a freshly built index beside the live one and swap the directories; hold index_lock"""
+    path = path or settings.FACE_ANN_INDEX_DIR
+    staging = path + ".building"
+    shutil.rmtree(staging, ignore_errors=True)
+    index.save(staging)
+    if os.path.exists(path):
+        # Workers still holding the old memory maps keep reading the unlinked files
+        shutil.rmtree(path + ".old", ignore_errors=True)
+        os.replace(path, path + ".old")
+    os.replace(staging, path)
+    shutil.rmtree(path + ".old", ignore_errors=True)
+
+_index: Optional[IVFIndex] = None
+_stamp: Optional[int] = None
+
+def _meta_stamp(path: str) -> Optional[int]:
+    try:
+        return os.stat(os.path.join(path, "meta.json")).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def _reload(path: str) -> Optional[IVFIndex]:
+    global _index, _stamp
+    stamp = _meta_stamp(path)
+    if stamp == _stamp:
+        return _index
+    index = IVFIndex.load(path) if stamp is not None else None
+    if index is not None and index.meta.get("model_version") != settings.FACE_MODEL_VERSION:
+        logger.warning("Face index was built for another model version; rebuild it with build_face_index.py")
+        index = None
+    _index, _stamp = index, stamp
+    return index
+
+def get_face_index() -> Optional[IVFIndex]:
+    """The on-disk index, reloaded when another worker or a rebuild changed it"""
+    if not settings.FACE_ANN_ENABLED:
+        return None
+    path = settings.FACE_ANN_INDEX_DIR
+    if _meta_stamp(path) == _stamp:
+        return _index
+    with index_lock(path, shared=True):
+        return _reload(path)
+
+def update_face_index(student_id: str, vectors: np.ndarray) -> bool:
+    """Replace a student's embeddings in the on-disk index; blocking, run it in a thread"""
+    global _index, _stamp
+    path = settings.FACE_ANN_INDEX_DIR
+    if not settings.FACE_ANN_ENABLED or _meta_stamp(path) is None:
+        return False
+    with index_lock(path):
+        # Reload under the lock so other workers' updates are kept
+        index = _reload(path)
+        if index is None:
+            return False
+        # Searches in flight keep the index they started with; the updated copy is swapped in
+        index = index.with_student(student_id, vectors)
+        if len(index.delta_owners) > settings.FACE_ANN_DELTA_LIMIT:
+            index = index.compacted()
+            save_index(index, path)
+        else:
+            index.save(path, delta_only=True)
+        _index, _stamp = index, _meta_stamp(path)
+    return True
@@ -0,0 +1,34 @@
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from core.config import settings
+
+GradeBoundaries = List[Tuple[float, str]]
+
+def parse_boundaries(table: str) -> GradeBoundaries:
+    """Parse "90:A+,80:A,...,0:F" into (minimum percentage, grade) pairs, highest first"""
+    boundaries = []
+    for item in table.split(","):
+        minimum, grade = item.split(":", 1)
+        boundaries.append((float(minimum), grade.strip()))
+    return sorted(boundaries, reverse=True)
+
+DEFAULT_BOUNDARIES = parse_boundaries(settings.GRADE_BOUNDARIES)
+
+def grade_batch(marks: Sequence[float], totals: Sequence[float],
+                boundaries: Optional[GradeBoundaries] = None) -> Tuple[np.ndarray, List[str]]:
+    """Percentages and grades for a whole marks sheet in one vectorized pass"""
+    boundaries = boundaries or DEFAULT_BOUNDARIES
+    marks = np.asarray(marks, dtype=float)
+    totals = np.asarray(totals, dtype=float)
+    percentages = np.divide(marks, totals, out=np.zeros_like(marks), where=totals > 0) * 100
+
+    # Ascending minimums; searchsorted finds the highest boundary each percentage reaches
+    minimums = np.array([minimum for minimum, _ in reversed(boundaries)])
+    grades = np.array([grade for _, grade in reversed(boundaries)], dtype=object)
+    positions = np.searchsorted(minimums, percentages, side="right") - 1
+    # Below the lowest boundary falls back to the lowest grade
+    return percentages, list(grades[np.clip(positions, 0, len(grades) - 1)])
+
+def grade_for(marks_obtained: float, total_marks: float, boundaries: Optional[GradeBoundaries] = None) -> Tuple[float, str]:
+    percentages, grades = grade_batch([marks_obtained], [total_marks], boundaries)
+    return float(percentages[0]), grades[0]
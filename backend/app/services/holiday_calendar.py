@@ -0,0 +1,138 @@
+"""Sorted in-memory holiday calendar per state.
+
+Holidays are held as sorted day ordinals, so every lookup is a bisect.
+Holidays for "All" apply to every state. Working days are counted with
+weekday arithmetic minus the holidays that fall on a weekday. For each of
+those holidays the calendar precomputes the first working day after it, so
+next_working_day never walks a run of holidays. The calendar is rebuilt
+when the holidays router writes, and after a TTL for writes made by other
+workers.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+import asyncio
+import time
+from core.config import settings, HOLIDAYS_COLLECTION
+
+ALL_STATES = "All"
+
+def parse_weekend(days: str) -> FrozenSet[int]:
+    return frozenset(int(day) for day in days.split(",") if day.strip())
+
+def _weekday(ordinal: int) -> int:
+    # date.fromordinal(1) is a Monday
+    return (ordinal - 1) % 7
+
+class StateCalendar:
+    def __init__(self, ordinals: Iterable[int], weekend: FrozenSet[int]):
+        self.weekend = weekend
+        self.days: List[int] = sorted(set(ordinals))
+        # Holidays on a weekend never change a working-day count
+        self.weekday_holidays: List[int] = [day for day in self.days if _weekday(day) not in weekend]
+        self._next_after: Dict[int, int] = {}
+        for day in reversed(self.weekday_holidays):
+            self._next_after[day] = self._resolve(day + 1)
+
+    def _skip_weekend(self, ordinal: int) -> int:
+        while _weekday(ordinal) in self.weekend:
+            ordinal += 1
+        return ordinal
+
+    def _resolve(self, ordinal: int) -> int:
+        ordinal = self._skip_weekend(ordinal)
+        # Later holidays are resolved first, so this is a single dict lookup
+        return self._next_after.get(ordinal, ordinal)
+
+    def is_holiday(self, ordinal: int) -> bool:
+        index = bisect_left(self.days, ordinal)
+        return index < len(self.days) and self.days[index] == ordinal
+
+    def between(self, start: int, end: int) -> Tuple[int, int]:
+        """Index range of holidays within [start, end]"""
+        return bisect_left(self.days, start), bisect_right(self.days, end)
+
+    def working_days(self, start: int, end: int) -> int:
+        if end < start:
+            return 0
+        weeks, remainder = divmod(end - start + 1, 7)
+        weekdays = weeks * (7 - len(self.weekend))
+        weekdays += sum(1 for offset in range(remainder) if _weekday(start + weeks * 7 + offset) not in self.weekend)
+        holidays = bisect_right(self.weekday_holidays, end) - bisect_left(self.weekday_holidays, start)
+        return weekdays - holidays
+
+    def next_working_day(self, ordinal: int) -> int:
+        """First working day strictly after the given day"""
+        if len(self.weekend) >= 7:
+            raise ValueError("Every weekday is configured as weekend")
+        return self._resolve(ordinal + 1)
+
+class HolidayCalendar:
+    def __init__(self, holidays: Iterable[Dict], weekend: Optional[FrozenSet[int]] = None):
+        weekend = parse_weekend(settings.WEEKEND_DAYS) if weekend is None else weekend
+        by_state: Dict[str, List[int]] = {}
+        self.names: Dict[Tuple[str, int], List[str]] = {}
+        for holiday in holidays:
+            ordinal = date.fromisoformat(str(holiday["date"])[:10]).toordinal()
+            state = holiday.get("state") or ALL_STATES
+            by_state.setdefault(state, []).append(ordinal)
+            self.names.setdefault((state, ordinal), []).append(holiday["name"])
+
+        shared = by_state.get(ALL_STATES, [])
+        self._all = StateCalendar(shared, weekend)
+        self._states = {
+            state: StateCalendar(ordinals + shared, weekend)
+            for state, ordinals in by_state.items() if state != ALL_STATES
+        }
+
+    def _for(self, state: Optional[str]) -> StateCalendar:
+        return self._states.get(state, self._all) if state else self._all
+
+    def is_holiday(self, day: date, state: Optional[str] = None) -> bool:
+        return self._for(state).is_holiday(day.toordinal())
+
+    def holiday_names(self, day: date, state: Optional[str] = None) -> List[str]:
+        ordinal = day.toordinal()
+        names = self.names.get((ALL_STATES, ordinal), [])
+        if state and state != ALL_STATES:
+            names = names + self.names.get((state, ordinal), [])
+        return names
+
+    def holidays_between(self, start: date, end: date, state: Optional[str] = None) -> List[date]:
+        calendar = self._for(state)
+        low, high = calendar.between(start.toordinal(), end.toordinal())
+        return [date.fromordinal(ordinal) for ordinal in calendar.days[low:high]]
+
+    def is_working_day(self, day: date, state: Optional[str] = None) -> bool:
+        calendar = self._for(state)
+        return day.weekday() not in calendar.weekend and not calendar.is_holiday(day.toordinal())
+
+    def working_days_between(self, start: date, end: date, state: Optional[str] = None) -> int:
+        """Working days in [start, end], both inclusive"""
+        return self._for(state).working_days(start.toordinal(), end.toordinal())
+
+    def next_working_day(self, day: date, state: Optional[str] = None) -> date:
+        return date.fromordinal(self._for(state).next_working_day(day.toordinal()))
+
+_calendar: Optional[HolidayCalendar] = None
+_loaded_at = 0.0
+_lock = asyncio.Lock()
+
+async def load_holiday_calendar(db) -> HolidayCalendar:
+    holidays = await db[HOLIDAYS_COLLECTION].find({}, {"_id": 0, "date": 1, "state": 1, "name": 1}).to_list(length=None)
+    return HolidayCalendar(holidays)
+
+async def get_holiday_calendar(db) -> HolidayCalendar:
+    """The worker's calendar, loaded on first use and again once stale or invalidated"""
+    global _calendar, _loaded_at
+    if _calendar is not None and time.monotonic() - _loaded_at < settings.HOLIDAY_CALENDAR_TTL_SECONDS:
+        return _calendar
+    async with _lock:
+        if _calendar is None or time.monotonic() - _loaded_at >= settings.HOLIDAY_CALENDAR_TTL_SECONDS:
+            _calendar = await load_holiday_calendar(db)
+            _loaded_at = time.monotonic()
+    return _calendar
+
+def invalidate_holiday_calendar():
+    global _calendar
+    _calendar = None
@@ -0,0 +1,59 @@
+"""Once-a-day leases for the background jobs every API worker schedules.
+
+A run is a JOB_RUNS_COLLECTION document keyed by (job, date) under a
+unique index. claim_daily_run upserts it with find_one_and_update: the
+first worker inserts it and gets a run id, the others hit the unique key
+and skip. A run that failed, or is still "running" after
+JOB_LEASE_SECONDS because its worker died, can be claimed again.
+
+Maintenance path: takes the synchronous database, not the async one.
+"""
+from datetime import date, datetime, timedelta
+from typing import Callable, Optional
+import logging
+import uuid
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from core.config import settings, JOB_RUNS_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+def claim_daily_run(db, job: str, day: Optional[date] = None, lease_seconds: Optional[int] = None) -> Optional[str]:
+    """Run id of a new lease on today's run of a job, None when another run holds or finished it"""
+    now = datetime.now()
+    stale = now - timedelta(seconds=settings.JOB_LEASE_SECONDS if lease_seconds is None else lease_seconds)
+    run_id = str(uuid.uuid4())
+    try:
+        # Either matches a run that may be retried or inserts a new one; a held or finished run raises
+        previous = db[JOB_RUNS_COLLECTION].find_one_and_update(
+            {"job": job, "date": str(day or now.date()), "$or": [
+                {"status": "failed"},
+                {"status": "running", "claimed_at": {"$lt": stale}}
+            ]},
+            {"$set": {"run_id": run_id, "status": "running", "claimed_at": now, "finished_at": None}},
+            projection={"_id": 0, "run_id": 1, "status": 1}, upsert=True, return_document=ReturnDocument.BEFORE
+        )
+    except DuplicateKeyError:
+        return None
+    if previous is not None:
+        logger.warning(f"Taking over {job} from run {previous['run_id']} ({previous['status']})")
+    return run_id
+
+def finish_run(db, job: str, run_id: str, status: str = "done"):
+    db[JOB_RUNS_COLLECTION].update_one(
+        {"job": job, "run_id": run_id}, {"$set": {"status": status, "finished_at": datetime.now()}}
+    )
+
+def run_once_daily(db, job: str, fn: Callable[[str], object]):
+    """Call fn(run_id) if this worker wins today's lease for the job"""
+    run_id = claim_daily_run(db, job)
+    if run_id is None:
+        logger.info(f"Skipping {job}: today's run is held by another worker")
+        return None
+    try:
+        result = fn(run_id)
+    except Exception:
+        finish_run(db, job, run_id, "failed")
+        raise
+    finish_run(db, job, run_id)
+    return result
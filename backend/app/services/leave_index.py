@@ -0,0 +1,142 @@
+"""In-memory index of approved leaves, used to resolve attendance in bulk.
+
+Each student's approved leaves are merged into sorted, disjoint day ranges,
+so "is this student on leave today" is one bisect and a whole roster is
+checked in well under a millisecond. A static interval tree over every
+approved leave answers "who is on leave during [a, b]" in O(log n + k).
+Leaves are keyed by USN; the index maps them to student ids once at load.
+Like the holiday calendar, the index is dropped on leave writes and
+reloaded after a TTL for writes made by other workers.
+"""
+from bisect import bisect_right
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import time
+from core.config import settings, LEAVES_COLLECTION, STUDENTS_COLLECTION
+from app.models.enums import LeaveStatus
+
+def _ordinal(value) -> int:
+    return date.fromisoformat(str(value)[:10]).toordinal()
+
+class IntervalTree:
+    """Static interval tree: intervals sorted by start, laid out as an implicit
+    balanced BST where each node keeps the largest end in its subtree."""
+    def __init__(self, intervals: Iterable[Tuple[int, int, Dict]]):
+        self.intervals = sorted(intervals, key=lambda interval: (interval[0], interval[1]))
+        self.max_end = [0] * len(self.intervals)
+        self._build(0, len(self.intervals) - 1)
+
+    def _build(self, low: int, high: int) -> int:
+        if low > high:
+            return -1
+        middle = (low + high) // 2
+        self.max_end[middle] = max(self.intervals[middle][1], self._build(low, middle - 1), self._build(middle + 1, high))
+        return self.max_end[middle]
+
+    def overlapping(self, start: int, end: int) -> List[Dict]:
+        found: List[Dict] = []
+        stack = [(0, len(self.intervals) - 1)]
+        while stack:
+            low, high = stack.pop()
+            if low > high:
+                continue
+            middle = (low + high) // 2
+            # Nothing in this subtree ends on or after the query start
+            if self.max_end[middle] < start:
+                continue
+            stack.append((low, middle - 1))
+            interval_start, interval_end, payload = self.intervals[middle]
+            # Right subtree starts even later, so it can only match if this node starts in time
+            if interval_start <= end:
+                if interval_end >= start:
+                    found.append(payload)
+                stack.append((middle + 1, high))
+        return found
+
+class LeaveIndex:
+    def __init__(self, leaves: Iterable[Dict]):
+        ranges: Dict[str, List[Tuple[int, int]]] = {}
+        intervals = []
+        for leave in leaves:
+            start, end = _ordinal(leave["start_date"]), _ordinal(leave["end_date"])
+            if end < start:
+                continue
+            ranges.setdefault(leave["student_id"], []).append((start, end))
+            intervals.append((start, end, leave))
+
+        # Merged per-student ranges: parallel start/end lists for bisecting
+        self._by_student: Dict[str, Tuple[List[int], List[int]]] = {}
+        for student_id, spans in ranges.items():
+            starts, ends = [], []
+            for start, end in sorted(spans):
+                if ends and start <= ends[-1] + 1:
+                    ends[-1] = max(ends[-1], end)
+                else:
+                    starts.append(start)
+                    ends.append(end)
+            self._by_student[student_id] = (starts, ends)
+        self._tree = IntervalTree(intervals)
+
+    def on_leave(self, student_id: str, day: date) -> bool:
+        spans = self._by_student.get(student_id)
+        if spans is None:
+            return False
+        ordinal = day.toordinal()
+        index = bisect_right(spans[0], ordinal) - 1
+        return index >= 0 and spans[1][index] >= ordinal
+
+    def students_on_leave(self, student_ids: Iterable[str], day: date) -> Set[str]:
+        return {student_id for student_id in student_ids if self.on_leave(student_id, day)}
+
+    def on_leave_during(self, start: date, end: date, student_ids: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Approved leaves overlapping [start, end], optionally for some students only"""
+        leaves = self._tree.overlapping(start.toordinal(), end.toordinal())
+        if student_ids is not None:
+            wanted = set(student_ids)
+            leaves = [leave for leave in leaves if leave["student_id"] in wanted]
+        return sorted(leaves, key=lambda leave: (leave["start_date"], leave["student_id"]))
+
+_index: Optional[LeaveIndex] = None
+_loaded_at = 0.0
+_lock = asyncio.Lock()
+
+async def load_leave_index(db) -> LeaveIndex:
+    leaves = await db[LEAVES_COLLECTION].find(
+        {"status": LeaveStatus.APPROVED.value},
+        {"_id": 1, "usn": 1, "leave_type": 1, "start_date": 1, "end_date": 1}
+    ).to_list(length=None)
+    usns = list({leave["usn"] for leave in leaves})
+    student_ids = {
+        student["usn"]: student["id"]
+        async for student in db[STUDENTS_COLLECTION].find({"usn": {"$in": usns}}, {"_id": 0, "id": 1, "usn": 1})
+    }
+
+    resolved = []
+    for leave in leaves:
+        if leave["usn"] not in student_ids:
+            continue
+        resolved.append({
+            "id": str(leave["_id"]),
+            "student_id": student_ids[leave["usn"]],
+            "usn": leave["usn"],
+            "leave_type": leave["leave_type"],
+            "start_date": str(leave["start_date"])[:10],
+            "end_date": str(leave["end_date"])[:10]
+        })
+    return LeaveIndex(resolved)
+
+async def get_leave_index(db) -> LeaveIndex:
+    """The worker's leave index, loaded on first use and again once stale or invalidated"""
+    global _index, _loaded_at
+    if _index is not None and time.monotonic() - _loaded_at < settings.LEAVE_INDEX_TTL_SECONDS:
+        return _index
+    async with _lock:
+        if _index is None or time.monotonic() - _loaded_at >= settings.LEAVE_INDEX_TTL_SECONDS:
+            _index = await load_leave_index(db)
+            _loaded_at = time.monotonic()
+    return _index
+
+def invalidate_leave_index():
+    global _index
+    _index = None
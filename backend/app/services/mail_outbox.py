@@ -0,0 +1,192 @@
+"""Persistent outbound mail queue.
+
+Requests only insert into the ``email_outbox`` collection; a background
+worker claims due messages in batches and sends each batch over one
+reused SMTP session in a worker thread. Failures are retried with
+exponential backoff and jitter up to EMAIL_MAX_ATTEMPTS; permanent (5xx)
+rejections fail straight away. The claim's lock is extended while its
+batch is being sent, so a batch whose worker died is picked up again once
+the claim expires, but a slow one is not sent twice.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import logging
+import random
+import smtplib
+import time
+import uuid
+from pymongo import UpdateOne
+from core.config import settings, EMAIL_OUTBOX_COLLECTION
+from app.services.emailer import SMTPSession, build_message, is_permanent_failure
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+# Errors that mean the session itself is unusable; the rest of the batch waits for a retry
+SESSION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError,
+                  smtplib.SMTPAuthenticationError, smtplib.SMTPNotSupportedError)
+
+def breaks_session(error: Exception) -> bool:
+    # SMTPException subclasses OSError, so only non-SMTP OSErrors are socket failures
+    return isinstance(error, SESSION_ERRORS) or (isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException))
+
+# Set by enqueues so the worker in this process does not wait for its next poll
+_wakeup = asyncio.Event()
+
+def outbox_message(to_email: str, subject: str, body: str, kind: str = "notification", now: Optional[datetime] = None) -> Dict:
+    now = now or datetime.now()
+    return {
+        "id": str(uuid.uuid4()),
+        "to": to_email,
+        "subject": subject,
+        "body": body,
+        "kind": kind,
+        "status": PENDING,
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now
+    }
+
+async def enqueue_email(db, to_email: str, subject: str, body: str, kind: str = "notification") -> str:
+    message = outbox_message(to_email, subject, body, kind)
+    await db[EMAIL_OUTBOX_COLLECTION].insert_one(message)
+    _wakeup.set()
+    return message["id"]
+
+async def enqueue_emails(db, messages: Iterable[Tuple[str, str, str]], kind: str = "notification", chunk_size: int = 1000) -> int:
+    """Queue many (to, subject, body) messages with unordered insert_many calls"""
+    now = datetime.now()
+    queued = 0
+    chunk: List[Dict] = []
+    for to_email, subject, body in messages:
+        chunk.append(outbox_message(to_email, subject, body, kind, now))
+        if len(chunk) == chunk_size:
+            await db[EMAIL_OUTBOX_COLLECTION].insert_many(chunk, ordered=False)
+            queued += len(chunk)
+            chunk = []
+    if chunk:
+        await db[EMAIL_OUTBOX_COLLECTION].insert_many(chunk, ordered=False)
+        queued += len(chunk)
+    if queued:
+        _wakeup.set()
+    return queued
+
+async def send_verification_email(db, to_email: str, verification_link: str) -> str:
+    body = f"Please verify your email by clicking on the following link: {verification_link}"
+    return await enqueue_email(db, to_email, "Email Verification", body, kind="verification")
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter, so retries of one outage spread out"""
+    delay = min(settings.EMAIL_RETRY_MAX_SECONDS, settings.EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+async def claim_batch(db, limit: int) -> Tuple[Optional[str], List[Dict]]:
+    """Claim up to `limit` due messages for this worker with three round trips"""
+    now = datetime.now()
+    due = {"$or": [
+        {"status": PENDING, "next_attempt_at": {"$lte": now}},
+        {"status": SENDING, "locked_until": {"$lt": now}}
+    ]}
+    outbox = db[EMAIL_OUTBOX_COLLECTION]
+    ids = [doc["id"] async for doc in outbox.find(due, {"_id": 0, "id": 1}).sort("next_attempt_at", 1).limit(limit)]
+    if not ids:
+        return None, []
+
+    # Re-checking `due` in the update means two workers never claim the same message
+    claim = str(uuid.uuid4())
+    await outbox.update_many({"id": {"$in": ids}, **due}, {"$set": {
+        "status": SENDING,
+        "claim": claim,
+        "locked_until": now + timedelta(seconds=settings.EMAIL_OUTBOX_LOCK_SECONDS)
+    }})
+    return claim, await outbox.find({"claim": claim}, {"_id": 0}).to_list(length=None)
+
+def send_batch(session: SMTPSession, messages: List[Dict]) -> List[Optional[Exception]]:
+    """Send messages in order over one session; runs in a worker thread"""
+    errors: List[Optional[Exception]] = []
+    for position, message in enumerate(messages):
+        try:
+            session.send(build_message(message["to"], message["subject"], message["body"]))
+            errors.append(None)
+        except Exception as e:
+            if not breaks_session(e):
+                errors.append(e)
+                continue
+            session.close()
+            errors.extend([e] * (len(messages) - position))
+            break
+    return errors
+
+def outcome_operations(claim: str, messages: List[Dict], errors: List[Optional[Exception]], now: datetime) -> List[UpdateOne]:
+    ops = []
+    release = {"claim": "", "locked_until": ""}
+    for message, error in zip(messages, errors):
+        key = {"id": message["id"], "claim": claim}
+        attempts = message.get("attempts", 0) + 1
+        if error is None:
+            ops.append(UpdateOne(key, {"$set": {"status": SENT, "sent_at": now, "attempts": attempts}, "$unset": release}))
+        elif is_permanent_failure(error) or attempts >= settings.EMAIL_MAX_ATTEMPTS:
+            ops.append(UpdateOne(key, {"$set": {"status": FAILED, "attempts": attempts, "last_error": str(error)[:500]}, "$unset": release}))
+        else:
+            ops.append(UpdateOne(key, {"$set": {
+                "status": PENDING,
+                "attempts": attempts,
+                "last_error": str(error)[:500],
+                "next_attempt_at": now + timedelta(seconds=retry_delay(attempts))
+            }, "$unset": release}))
+    return ops
+
+async def hold_claim(db, claim: str):
+    """Keep pushing a claim's lock forward while its batch is being sent"""
+    lock_seconds = settings.EMAIL_OUTBOX_LOCK_SECONDS
+    while True:
+        await asyncio.sleep(lock_seconds / 3)
+        await db[EMAIL_OUTBOX_COLLECTION].update_many(
+            {"claim": claim, "status": SENDING},
+            {"$set": {"locked_until": datetime.now() + timedelta(seconds=lock_seconds)}}
+        )
+
+async def deliver_batch(db, session: SMTPSession, limit: Optional[int] = None) -> int:
+    """Claim, send and record one batch; returns how many messages were claimed"""
+    claim, messages = await claim_batch(db, limit or settings.EMAIL_OUTBOX_BATCH_SIZE)
+    if not messages:
+        return 0
+    # A slow server can take longer than the lock (batch size x SMTP_TIMEOUT_SECONDS)
+    keeper = asyncio.create_task(hold_claim(db, claim))
+    try:
+        errors = await asyncio.to_thread(send_batch, session, messages)
+    finally:
+        keeper.cancel()
+    await db[EMAIL_OUTBOX_COLLECTION].bulk_write(outcome_operations(claim, messages, errors, datetime.now()), ordered=False)
+    sent = errors.count(None)
+    if sent < len(messages):
+        logger.warning(f"Email outbox: {len(messages) - sent} of {len(messages)} messages failed, last error: {next(e for e in reversed(errors) if e)}")
+    return len(messages)
+
+async def run_outbox_worker(db, session: Optional[SMTPSession] = None):
+    """Deliver queued mail forever, keeping the SMTP session open while there is work"""
+    session = session or SMTPSession()
+    try:
+        while True:
+            try:
+                claimed = await deliver_batch(db, session)
+            except Exception as e:
+                logger.error(f"Email outbox batch failed: {e}")
+                claimed = 0
+            if claimed:
+                continue
+
+            if session.connected and time.monotonic() - session.last_used > settings.EMAIL_SMTP_IDLE_SECONDS:
+                await asyncio.to_thread(session.close)
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=settings.EMAIL_OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            _wakeup.clear()
+    finally:
+        await asyncio.to_thread(session.close)
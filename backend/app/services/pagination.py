@@ -0,0 +1,34 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import base64
+from fastapi import HTTPException
+
+def encode_cursor(last_id: str) -> str:
+    return base64.urlsafe_b64encode(last_id.encode()).decode()
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(cursor.encode()).decode()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def projection_for(fields: Optional[str], allowed: Iterable[str], default: Iterable[str]) -> Dict[str, int]:
+    """Turn a comma-separated fields= parameter into a MongoDB projection"""
+    requested = [field.strip() for field in fields.split(",") if field.strip()] if fields else list(default)
+    unknown = sorted(set(requested) - set(allowed))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    projection = {field: 1 for field in requested}
+    # The cursor is the last id, so it is always returned
+    projection.update({"_id": 0, "id": 1})
+    return projection
+
+async def keyset_page(collection, query: Dict, projection: Dict[str, int], limit: int,
+                      cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """One page ordered by the unique `id`, resuming after the cursor instead of skipping"""
+    if cursor:
+        query = {**query, "id": {"$gt": decode_cursor(cursor)}}
+    docs = await collection.find(query, projection).sort("id", 1).limit(limit + 1).to_list(length=limit + 1)
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(docs[-1]["id"])
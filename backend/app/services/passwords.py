@@ -0,0 +1,79 @@
+"""Password hashing on a bounded worker pool.
+
+Hashes are scrypt (memory-hard) and stored as
+``scrypt$<log2 n>$<r>$<p>$<salt>$<digest>``, so the cost can be raised later
+without invalidating existing hashes. The KDF runs on a thread pool (hashlib
+releases the GIL while OpenSSL works) so a login storm never blocks the event loop.
+Legacy unsalted SHA-256 hex digests still verify and are flagged for rehash.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from core.config import settings
+
+SCHEME = "scrypt"
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode()
+
+def _scrypt(password: str, salt: bytes, log_n: int, r: int, p: int) -> bytes:
+    n = 1 << log_n
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p,
+        maxmem=256 * n * r * p, dklen=KEY_BYTES
+    )
+
+def hash_password_sync(password: str, log_n: Optional[int] = None) -> str:
+    """Hash with the configured cost (or an explicit log2 n, used by the benchmark)"""
+    log_n = settings.PASSWORD_SCRYPT_LOG_N if log_n is None else log_n
+    r, p = settings.PASSWORD_SCRYPT_R, settings.PASSWORD_SCRYPT_P
+    salt = os.urandom(SALT_BYTES)
+    digest = _scrypt(password, salt, log_n, r, p)
+    return f"{SCHEME}${log_n}${r}${p}${_b64(salt)}${_b64(digest)}"
+
+def verify_password_sync(password: str, hashed: str) -> bool:
+    if is_legacy_hash(hashed):
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), hashed)
+    try:
+        scheme, log_n, r, p, salt, digest = hashed.split("$")
+    except ValueError:
+        return False
+    if scheme != SCHEME:
+        return False
+    candidate = _scrypt(password, base64.b64decode(salt), int(log_n), int(r), int(p))
+    return hmac.compare_digest(candidate, base64.b64decode(digest))
+
+def is_legacy_hash(hashed: str) -> bool:
+    """Unsalted SHA-256 hex digests written before scrypt was introduced"""
+    return len(hashed) == 64 and "$" not in hashed
+
+def needs_rehash(hashed: str) -> bool:
+    """True for legacy hashes and for scrypt hashes below the configured cost"""
+    if is_legacy_hash(hashed):
+        return True
+    try:
+        _, log_n, r, p, _, _ = hashed.split("$")
+    except ValueError:
+        return True
+    return (int(log_n), int(r), int(p)) != (
+        settings.PASSWORD_SCRYPT_LOG_N, settings.PASSWORD_SCRYPT_R, settings.PASSWORD_SCRYPT_P
+    )
+
+async def hash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_executor, hash_password_sync, password)
+
+async def verify_password(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """Check a password off the event loop; returns (valid, replacement hash or None)"""
+    loop = asyncio.get_running_loop()
+    valid = await loop.run_in_executor(_executor, verify_password_sync, password, hashed)
+    if not valid or not needs_rehash(hashed):
+        return valid, None
+    return True, await loop.run_in_executor(_executor, hash_password_sync, password)
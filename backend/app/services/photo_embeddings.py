@@ -0,0 +1,172 @@
+"""Face embeddings from students' registration photos.
+
+A rebuild fetches every student's `photo_url`, hashes the bytes and skips
+students whose stored photo embedding already has that hash. Remaining
+photos are looked up in the on-disk EmbeddingCache and only cache misses
+reach the embedding model, on the photo pipeline's worker pool. After a
+restart nothing is embedded again; after a model upgrade every photo is
+embedded once and later rebuilds hit the cache.
+
+Photo embeddings are stored with source "photo" beside the ones enrolled
+through the API, and replace only the student's previous photo embedding.
+A photo without a face replaces it with a marker whose vector is None, so
+the old face leaves the gallery and the photo is not embedded again.
+
+Maintenance path: takes the synchronous database, not the async one.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import base64
+import logging
+import time
+import uuid
+import numpy as np
+import requests
+from pymongo import DeleteMany, InsertOne
+from core.config import settings, FACE_EMBEDDINGS_COLLECTION
+from app.services.embedding_cache import EmbeddingCache, photo_key
+from app.services.face_gallery import decode_vectors, encode_vector, gallery_query, normalize
+from app.services.face_index import update_face_index
+from app.services.photo_pipeline import try_embed_enrollment_photo, worker_pool
+
+logger = logging.getLogger(__name__)
+
+PHOTO_SOURCE = "photo"
+
+def fetch_photo(url: str) -> bytes:
+    """Bytes of a data: URI, an http(s) URL or a local file path"""
+    if url.startswith("data:"):
+        return base64.b64decode(url.partition(",")[2])
+    if url.startswith(("http://", "https://")):
+        response = requests.get(url, timeout=settings.PHOTO_FETCH_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        return response.content
+    with open(url, "rb") as f:
+        return f.read()
+
+def _fetch(student: Dict) -> Tuple[Dict, Optional[bytes], Optional[str]]:
+    try:
+        return student, fetch_photo(student["photo_url"]), None
+    except Exception as e:
+        return student, None, str(e)
+
+def _embed_chunk(students: List[Dict], stored: Dict[str, str], cache: EmbeddingCache, pool, fetcher,
+                 changed: Dict[str, str], vectors: Dict[str, Optional[np.ndarray]], metrics: Dict):
+    to_embed: Dict[str, bytes] = {}  # photo key -> bytes
+    for student, data, error in fetcher.map(_fetch, students):
+        if data is None:
+            metrics["failed"] += 1
+            logger.warning(f"Could not fetch photo of student {student['id']}: {error}")
+            continue
+        key = photo_key(data)
+        if stored.get(student["id"]) == key:
+            metrics["unchanged"] += 1
+            continue
+        changed[student["id"]] = key
+        if key in vectors or key in to_embed:
+            continue
+        vector = cache.get(key)
+        if vector is not None:
+            vectors[key] = vector
+            metrics["cache_hits"] += 1
+        else:
+            to_embed[key] = data
+    if not to_embed:
+        return
+
+    keys = list(to_embed)
+    # A photo that cannot be decoded or embedded fails alone, not the whole refresh
+    results = pool().map(
+        try_embed_enrollment_photo, [to_embed[key] for key in keys],
+        [settings.PHOTO_MAX_PIXELS] * len(keys), [settings.FACE_EMBEDDING_DIM] * len(keys)
+    )
+    for key, (vector, error) in zip(keys, results):
+        if error is not None:
+            students_with_photo = [student_id for student_id, photo in changed.items() if photo == key]
+            metrics["failed"] += len(students_with_photo)
+            logger.warning(f"Could not embed photo of students {', '.join(students_with_photo)}: {error}")
+            continue
+        if vector is None:
+            vectors[key] = None
+            metrics["no_face"] += 1
+            continue
+        vector = normalize(vector[None])[0]
+        cache.put(key, vector)
+        vectors[key] = vector
+        metrics["embedded"] += 1
+
+def refresh_photo_embeddings(db, workers: Optional[int] = None, chunk_size: int = 256) -> Dict:
+    """Embed new or changed registration photos; returns counts and timings"""
+    started = time.perf_counter()
+    metrics = {"students": 0, "unchanged": 0, "cache_hits": 0, "embedded": 0, "no_face": 0, "failed": 0, "updated": 0}
+    embeddings = db[FACE_EMBEDDINGS_COLLECTION]
+    stored = {
+        doc["student_id"]: doc.get("photo_hash")
+        for doc in embeddings.find(
+            {"source": PHOTO_SOURCE, "model_version": settings.FACE_MODEL_VERSION}, {"_id": 0, "student_id": 1, "photo_hash": 1}
+        )
+    }
+    students = list(db.students.find({"photo_url": {"$nin": [None, ""]}}, {"_id": 0, "id": 1, "photo_url": 1}))
+    metrics["students"] = len(students)
+
+    changed: Dict[str, str] = {}  # student id -> photo key
+    vectors: Dict[str, Optional[np.ndarray]] = {}  # photo key -> embedding, None without a face
+    executor = None
+
+    def pool():
+        # Started only once a photo misses the cache
+        nonlocal executor
+        if executor is None:
+            if not settings.FACE_BACKEND:
+                raise RuntimeError("Photos need embedding but no face backend is configured (FACE_BACKEND)")
+            executor = worker_pool(settings.FACE_BACKEND, workers or settings.PHOTO_PIPELINE_WORKERS)
+        return executor
+
+    # Chunked, so only a chunk of photo bytes is held at a time
+    try:
+        with EmbeddingCache.open() as cache, ThreadPoolExecutor(settings.PHOTO_FETCH_THREADS) as fetcher:
+            for offset in range(0, len(students), chunk_size):
+                _embed_chunk(students[offset:offset + chunk_size], stored, cache, pool, fetcher, changed, vectors, metrics)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    embed_seconds = time.perf_counter() - started
+
+    now = datetime.now()
+    ops: List = []
+    updated: List[str] = []
+    for student_id, key in changed.items():
+        if key not in vectors:
+            continue
+        vector = vectors[key]
+        ops.append(DeleteMany({"student_id": student_id, "source": PHOTO_SOURCE}))
+        ops.append(InsertOne({
+            "id": str(uuid.uuid4()),
+            "student_id": student_id,
+            "section": None,
+            "model_version": settings.FACE_MODEL_VERSION,
+            "vector": None if vector is None else encode_vector(vector),
+            "source": PHOTO_SOURCE,
+            "photo_hash": key,
+            "created_at": now
+        }))
+        updated.append(student_id)
+    if ops:
+        # Ordered, so each student's old photo embedding goes before the new one lands
+        embeddings.bulk_write(ops, ordered=True)
+    metrics["updated"] = len(updated)
+
+    if len(updated) > settings.FACE_ANN_DELTA_LIMIT:
+        logger.warning("Many photo embeddings changed; rebuild the face index with build_face_index.py")
+        updated = []
+    for student_id in updated:
+        docs = list(embeddings.find({**gallery_query(), "student_id": student_id}, {"_id": 0, "vector": 1}))
+        update_face_index(student_id, decode_vectors([doc["vector"] for doc in docs], settings.FACE_EMBEDDING_DIM))
+
+    metrics.update({
+        "embed_seconds": round(embed_seconds, 3),
+        "total_seconds": round(time.perf_counter() - started, 3)
+    })
+    logger.info(f"Photo embedding refresh: {metrics}")
+    return metrics
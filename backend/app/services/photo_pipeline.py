@@ -0,0 +1,236 @@
+"""Classroom-photo ingestion: decode -> detect -> align -> embed -> match.
+
+Decoding and detect/align/embed are CPU bound and run on a process pool
+of PHOTO_PIPELINE_WORKERS spawned workers, each holding one FaceBackend.
+A decoded photo is written once into a shared memory block and the
+analysing worker maps that block instead of receiving a pickled copy; it
+unlinks the block when done. Stages are joined by asyncio queues of
+PHOTO_PIPELINE_QUEUE_SIZE, so at most that many decoded photos wait per
+stage and decoding pauses when analysis falls behind. Matching runs in
+the API process against the section gallery, a cheap matrix multiply per
+photo. Writing the attendance is left to the caller (enroll_roster).
+
+Photos are independent, so throughput grows with the number of workers
+until the pool matches the cores available.
+"""
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context, shared_memory
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import io
+import time
+import numpy as np
+from core.config import settings
+from app.services.face_backend import FaceBackend, load_backend
+from app.services.face_gallery import FaceGallery, assign_unique
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is only needed where photos are ingested
+    Image = None
+
+# Worker process side
+
+_backend: Optional[FaceBackend] = None
+
+def _init_worker(backend_path: str):
+    global _backend
+    _backend = load_backend(backend_path)
+
+def decode_image(data: bytes, max_pixels: int) -> "Image.Image":
+    with Image.open(io.BytesIO(data)) as photo:
+        if photo.width * photo.height > max_pixels:
+            raise ValueError(f"Photo has more than {max_pixels} pixels")
+        return ImageOps.exif_transpose(photo).convert("RGB")
+
+def decode_photo(data: bytes, max_pixels: int) -> Tuple[str, Tuple[int, int, int], Dict[str, float]]:
+    """Decode an encoded photo into a new shared memory block: (block name, shape, seconds)"""
+    started, cpu_started = time.perf_counter(), time.process_time()
+    image = decode_image(data, max_pixels)
+    pixels, shape = image.tobytes(), (image.height, image.width, 3)
+    block = shared_memory.SharedMemory(create=True, size=len(pixels))
+    block.buf[:len(pixels)] = pixels
+    block.close()
+    return block.name, shape, {"decode": time.perf_counter() - started, "cpu": time.process_time() - cpu_started}
+
+def embed_enrollment_photo(data: bytes, max_pixels: int, dim: int) -> Optional[np.ndarray]:
+    """Embedding of the most confident face in a registration photo, None when it shows no face"""
+    image = np.asarray(decode_image(data, max_pixels))
+    faces = _backend.detect(image)
+    if not faces:
+        return None
+    face = max(faces, key=lambda face: face.score)
+    vector = np.asarray(_backend.embed(_backend.align(image, face)[None]), dtype=np.float32).reshape(-1)
+    if vector.shape != (dim,):
+        raise ValueError(f"Face backend returned an embedding of shape {vector.shape}, expected ({dim},)")
+    return vector
+
+def try_embed_enrollment_photo(data: bytes, max_pixels: int, dim: int) -> Tuple[Optional[np.ndarray], Optional[str]]:
+    """embed_enrollment_photo that reports a bad photo as (None, error) instead of raising"""
+    try:
+        return embed_enrollment_photo(data, max_pixels, dim), None
+    except Exception as e:
+        return None, str(e)
+
+def _detect_and_align(image: np.ndarray, timings: Dict[str, float]):
+    started = time.perf_counter()
+    faces = _backend.detect(image)
+    timings["detect"] = time.perf_counter() - started
+    started = time.perf_counter()
+    crops = [_backend.align(image, face) for face in faces]
+    timings["align"] = time.perf_counter() - started
+    return faces, crops
+
+def analyse_photo(name: str, shape: Tuple[int, int, int], dim: int) -> Tuple[np.ndarray, np.ndarray, Dict[str, float]]:
+    """Detect, align and embed the faces of a shared photo, then release its block"""
+    timings: Dict[str, float] = {}
+    cpu_started = time.process_time()
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        faces, crops = _detect_and_align(np.ndarray(shape, dtype=np.uint8, buffer=block.buf), timings)
+    finally:
+        block.unlink()
+        try:
+            block.close()
+        except BufferError:  # a traceback still references the view; the mapping goes with it
+            pass
+
+    started = time.perf_counter()
+    embeddings = np.asarray(_backend.embed(np.stack(crops)), dtype=np.float32) if crops else np.zeros((0, dim), dtype=np.float32)
+    timings["embed"] = time.perf_counter() - started
+    timings["cpu"] = time.process_time() - cpu_started
+    if embeddings.shape != (len(faces), dim):
+        raise ValueError(f"Face backend returned embeddings of shape {embeddings.shape}, expected ({len(faces)}, {dim})")
+    boxes = np.array([np.asarray(face.box, dtype=np.float32) for face in faces]).reshape(len(faces), 4)
+    return embeddings, boxes, timings
+
+def _release(name: str):
+    try:
+        block = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    block.close()
+    block.unlink()
+
+# API process side
+
+def worker_pool(backend_path: str, workers: int) -> ProcessPoolExecutor:
+    """Spawned workers that each load the face backend once"""
+    return ProcessPoolExecutor(workers, mp_context=get_context("spawn"), initializer=_init_worker, initargs=(backend_path,))
+
+class PhotoPipeline:
+    def __init__(self, backend_path: str, workers: int, queue_size: int):
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.broken = False
+        self.executor = worker_pool(backend_path, self.workers)
+
+    async def run(self, photos: List[bytes], gallery: FaceGallery, top_k: int, threshold: float) -> Dict:
+        """Per-photo results, every recognized face with its student, and seconds spent per stage.
+
+        "cpu" is the processor time all stages used, "total" the wall-clock time.
+        """
+        loop = asyncio.get_running_loop()
+        dim = settings.FACE_EMBEDDING_DIM
+        decoded: asyncio.Queue = asyncio.Queue(self.queue_size)
+        embedded: asyncio.Queue = asyncio.Queue(self.queue_size)
+        results = [{"photo": index, "faces": 0, "error": None} for index in range(len(photos))]
+        faces: List[Dict] = []
+        timings: Dict[str, float] = defaultdict(float)
+        pending = iter(enumerate(photos))
+
+        async def decode_worker():
+            for index, data in pending:
+                try:
+                    name, shape, seconds = await loop.run_in_executor(self.executor, decode_photo, data, settings.PHOTO_MAX_PIXELS)
+                except Exception as e:
+                    self.broken |= isinstance(e, BrokenProcessPool)
+                    results[index]["error"] = f"Could not decode photo: {e}"
+                    continue
+                for stage, value in seconds.items():
+                    timings[stage] += value
+                await decoded.put((index, name, shape))
+
+        async def decode_stage():
+            await asyncio.gather(*(decode_worker() for _ in range(self.workers)))
+            for _ in range(self.workers):
+                await decoded.put(None)
+
+        async def analyse_worker():
+            while (item := await decoded.get()) is not None:
+                index, name, shape = item
+                try:
+                    embeddings, boxes, seconds = await loop.run_in_executor(self.executor, analyse_photo, name, shape, dim)
+                except Exception as e:
+                    # A crashed worker never unlinked its block
+                    self.broken |= isinstance(e, BrokenProcessPool)
+                    _release(name)
+                    results[index]["error"] = f"Face analysis failed: {e}"
+                    continue
+                for stage, value in seconds.items():
+                    timings[stage] += value
+                await embedded.put((index, embeddings, boxes))
+
+        async def analyse_stage():
+            await asyncio.gather(*(analyse_worker() for _ in range(self.workers)))
+            await embedded.put(None)
+
+        async def match_stage():
+            while (item := await embedded.get()) is not None:
+                index, embeddings, boxes = item
+                started, cpu_started = time.perf_counter(), time.thread_time()
+                # One face per student within a photo; the same student may appear in several photos
+                assigned = assign_unique(gallery.match(embeddings, top_k, threshold)) if len(embeddings) else []
+                timings["match"] += time.perf_counter() - started
+                timings["cpu"] += time.thread_time() - cpu_started
+                results[index]["faces"] = len(embeddings)
+                for face, (box, best) in enumerate(zip(boxes.tolist(), assigned)):
+                    faces.append({
+                        "photo": index,
+                        "face": face,
+                        "box": box,
+                        "student_id": best[0] if best else None,
+                        "score": best[1] if best else None
+                    })
+
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(decode_stage(), analyse_stage(), match_stage())
+        finally:
+            # Blocks still queued when a stage failed or the request was cancelled
+            while not decoded.empty():
+                item = decoded.get_nowait()
+                if item is not None:
+                    _release(item[1])
+        timings["total"] = time.perf_counter() - started
+        return {"photos": results, "faces": faces, "timings": {stage: round(value, 4) for stage, value in timings.items()}}
+
+    def shutdown(self):
+        self.executor.shutdown(cancel_futures=True)
+
+_pipeline: Optional[PhotoPipeline] = None
+
+def photo_pipeline_available() -> Optional[str]:
+    """Why photos cannot be ingested here, or None when they can"""
+    if Image is None:
+        return "Pillow is not installed"
+    if not settings.FACE_BACKEND:
+        return "No face backend is configured (FACE_BACKEND)"
+    return None
+
+def get_photo_pipeline() -> PhotoPipeline:
+    """The process-wide pipeline; its worker pool is started on first use"""
+    global _pipeline
+    if _pipeline is not None and _pipeline.broken:
+        shutdown_photo_pipeline()
+    if _pipeline is None:
+        _pipeline = PhotoPipeline(settings.FACE_BACKEND, settings.PHOTO_PIPELINE_WORKERS, settings.PHOTO_PIPELINE_QUEUE_SIZE)
+    return _pipeline
+
+def shutdown_photo_pipeline():
+    global _pipeline
+    if _pipeline is not None:
+        _pipeline.shutdown()
+        _pipeline = None
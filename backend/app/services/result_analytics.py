@@ -0,0 +1,76 @@
+from typing import Dict, List, Optional, Tuple
+from core.response_cache import response_cache
+from models.results import ClassResultSummary, ResultRanking
+
+ResultGroup = Tuple[str, str, str]  # (subject, test_date, test_type)
+
+def result_summary_pipeline(subject: str, test_date: str, test_type: str) -> List[Dict]:
+    """One round trip: moments, grade histogram and every student's rank and percentile"""
+    return [
+        {"$match": {"subject": subject, "test_date": test_date, "test_type": test_type}},
+        # Ascending rank - 1 is the number of students strictly below
+        {"$setWindowFields": {
+            "sortBy": {"percentage": 1},
+            "output": {
+                "below": {"$rank": {}},
+                "class_size": {"$count": {}, "window": {"documents": ["unbounded", "unbounded"]}}
+            }
+        }},
+        {"$setWindowFields": {"sortBy": {"percentage": -1}, "output": {"rank": {"$rank": {}}}}},
+        {"$facet": {
+            "stats": [{"$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "mean": {"$avg": "$percentage"},
+                "std_dev": {"$stdDevPop": "$percentage"},
+                "min": {"$min": "$percentage"},
+                "max": {"$max": "$percentage"}
+            }}],
+            "distribution": [{"$group": {"_id": "$grade", "count": {"$sum": 1}}}],
+            "rankings": [
+                {"$sort": {"rank": 1, "student_id": 1}},
+                {"$project": {
+                    "_id": 0, "student_id": 1, "marks_obtained": 1, "total_marks": 1, "percentage": 1, "grade": 1, "rank": 1,
+                    "percentile": {"$multiply": [{"$divide": [{"$subtract": ["$below", 1]}, "$class_size"]}, 100]}
+                }}
+            ]
+        }}
+    ]
+
+def _median(descending: List[float]) -> float:
+    middle = len(descending) // 2
+    if len(descending) % 2:
+        return descending[middle]
+    return (descending[middle - 1] + descending[middle]) / 2
+
+async def result_summary(db, subject: str, test_date: str, test_type: str) -> Optional[ClassResultSummary]:
+    facets = (await db.results.aggregate(result_summary_pipeline(subject, test_date, test_type)).to_list(length=1))[0]
+    if not facets["stats"]:
+        return None
+    stats = facets["stats"][0]
+    rankings = facets["rankings"]
+    summary = ClassResultSummary(
+        subject=subject,
+        test_date=test_date,
+        test_type=test_type,
+        count=stats["count"],
+        mean=stats["mean"],
+        # Rankings arrive sorted by percentage, so the median needs no second pass
+        median=_median([ranking["percentage"] for ranking in rankings]),
+        std_dev=stats["std_dev"],
+        min=stats["min"],
+        max=stats["max"],
+        grade_distribution={bucket["_id"]: bucket["count"] for bucket in facets["distribution"]},
+        rankings=[ResultRanking(**ranking) for ranking in rankings]
+    )
+    return summary
+
+def summary_tags(subject: str, test_date: str, test_type: str) -> List[str]:
+    """Response cache tags of a summary: its date's group and its own test type"""
+    group = f"results:group={subject}|{test_date}"
+    return ["results", group, f"{group}|{test_type}"]
+
+async def invalidate_result_summary(subject: str, test_date: str, test_type: Optional[str] = None):
+    """Drop cached summaries of a group in every worker; without test_type every test type on that date"""
+    group = f"results:group={subject}|{test_date}"
+    await response_cache.invalidate([group if test_type is None else f"{group}|{test_type}"])
@@ -0,0 +1,110 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+import csv
+import io
+import uuid
+import numpy as np
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from models.results import MarksEntry, MarksSheet
+from app.services.grading import GradeBoundaries, grade_batch
+from app.services.cgpa import refresh_semesters
+
+def sheet_boundaries(sheet: MarksSheet) -> Optional[GradeBoundaries]:
+    if not sheet.grade_boundaries:
+        return None
+    return sorted(((minimum, grade) for grade, minimum in sheet.grade_boundaries.items()), reverse=True)
+
+def parse_marks_csv(content: str) -> List[MarksEntry]:
+    """Read student_id, marks_obtained and an optional total_marks column"""
+    reader = csv.DictReader(io.StringIO(content))
+    if not reader.fieldnames or not {"student_id", "marks_obtained"} <= set(reader.fieldnames):
+        raise ValueError("CSV needs student_id and marks_obtained columns")
+    entries = []
+    for line, record in enumerate(reader, start=2):
+        try:
+            entries.append(MarksEntry(
+                student_id=record["student_id"].strip(),
+                marks_obtained=float(record["marks_obtained"]),
+                total_marks=float(record["total_marks"]) if record.get("total_marks") else None
+            ))
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid marks on line {line}")
+    return entries
+
+def _row(student_id: str, result: str, detail: Optional[str] = None, percentage: Optional[float] = None, grade: Optional[str] = None) -> Dict:
+    row = {"student_id": student_id, "result": result}
+    if percentage is not None:
+        row.update({"percentage": percentage, "grade": grade})
+    if detail:
+        row["detail"] = detail
+    return row
+
+async def upload_marks_sheet(db, sheet: MarksSheet) -> Dict:
+    """Grade a whole marks sheet at once and upsert it with one unordered bulk_write.
+
+    Rows are keyed on the unique (student_id, test_date, subject) index, so a
+    re-uploaded sheet corrects marks instead of failing on duplicates.
+    The affected students' semester CGPA is refreshed afterwards.
+    """
+    now = datetime.now()
+    test_date = str(sheet.test_date)
+    marks = np.array([entry.marks_obtained for entry in sheet.entries], dtype=float)
+    totals = np.array([entry.total_marks or sheet.total_marks for entry in sheet.entries], dtype=float)
+    percentages, grades = grade_batch(marks, totals, sheet_boundaries(sheet))
+    invalid = (marks < 0) | (totals <= 0) | (marks > totals)
+
+    rows: List[Dict] = [None] * len(sheet.entries)
+    ops = []
+    positions = []
+    seen = set()
+    for position, entry in enumerate(sheet.entries):
+        if entry.student_id in seen:
+            rows[position] = _row(entry.student_id, "failed", "Student listed more than once in sheet")
+            continue
+        seen.add(entry.student_id)
+        if invalid[position]:
+            rows[position] = _row(entry.student_id, "failed", "Marks must be between 0 and total marks")
+            continue
+        ops.append(UpdateOne(
+            {"student_id": entry.student_id, "test_date": test_date, "subject": sheet.subject},
+            {
+                "$set": {
+                    "test_type": sheet.test_type,
+                    "marks_obtained": entry.marks_obtained,
+                    "total_marks": float(totals[position]),
+                    "percentage": float(percentages[position]),
+                    "grade": grades[position],
+                    "semester": sheet.semester,
+                    "section": sheet.section,
+                    "updated_at": now
+                },
+                "$setOnInsert": {"id": str(uuid.uuid4()), "created_at": now}
+            },
+            upsert=True
+        ))
+        positions.append(position)
+
+    upserted, errors = set(), {}
+    if ops:
+        try:
+            result = await db.results.bulk_write(ops, ordered=False)
+            upserted = set(result.upserted_ids)
+        except BulkWriteError as e:
+            upserted = {upsert["index"] for upsert in e.details.get("upserted", [])}
+            errors = {error["index"]: error for error in e.details.get("writeErrors", [])}
+
+    for op_index, position in enumerate(positions):
+        student_id = sheet.entries[position].student_id
+        if op_index in errors:
+            rows[position] = _row(student_id, "failed", errors[op_index].get("errmsg"))
+        else:
+            outcome = "created" if op_index in upserted else "updated"
+            rows[position] = _row(student_id, outcome, percentage=float(percentages[position]), grade=grades[position])
+
+    await refresh_semesters(db, [(row["student_id"], sheet.semester) for row in rows if row["result"] != "failed"])
+
+    summary = {"created": 0, "updated": 0, "failed": 0, "rows": rows}
+    for row in rows:
+        summary[row["result"]] += 1
+    return summary
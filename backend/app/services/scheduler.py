@@ -0,0 +1,22 @@
+import asyncio
+from datetime import datetime, time, timedelta
+from typing import Callable
+import logging
+
+logger = logging.getLogger(__name__)
+
+def seconds_until(at: time, now: datetime) -> float:
+    """Seconds from now until the next occurrence of a wall-clock time"""
+    next_run = datetime.combine(now.date(), at)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+async def run_daily(job: Callable[[], None], at: time = time(0, 0)):
+    """Run a blocking job once a day in a worker thread, forever"""
+    while True:
+        await asyncio.sleep(seconds_until(at, datetime.now()))
+        try:
+            await asyncio.to_thread(job)
+        except Exception as e:
+            logger.error(f"Scheduled job {getattr(job, '__name__', job)} failed: {e}")
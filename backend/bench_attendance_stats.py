@@ -0,0 +1,77 @@
+import asyncio
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from core.config import settings
+from app.services.attendance_stats import student_attendance_stats, faculty_attendance_stats
+
+BENCH_DB = "attendance_bench"
+TOTAL_ROWS = 1_000_000
+STUDENTS = 2000
+FACULTY = 100
+SUBJECTS = ["Mathematics", "Physics", "Chemistry", "Programming", "Electronics", "Mechanics", "English", "Data Structures"]
+PERIODS = 4
+TARGET_MS = 100
+RUNS = 200
+
+def seed(db):
+    """Fill the bench database with TOTAL_ROWS attendance rows (once)"""
+    if db.attendance.estimated_document_count() >= TOTAL_ROWS:
+        return
+    db.attendance.drop()
+    db.attendance.create_index([("student_id", 1), ("date", 1), ("period", 1)], unique=True)
+    db.attendance.create_index("date")
+    db.attendance.create_index("student_id")
+    db.attendance.create_index([("faculty_id", 1), ("date", 1)])
+
+    days = TOTAL_ROWS // (STUDENTS * PERIODS)
+    first_day = date.today() - timedelta(days=days - 1)
+    batch = []
+    for student in range(STUDENTS):
+        for day in range(days):
+            for period in range(1, PERIODS + 1):
+                subject = (student + day + period) % len(SUBJECTS)
+                batch.append({
+                    "student_id": f"student-{student}",
+                    "faculty_id": f"faculty-{(student // 20 + subject) % FACULTY}",
+                    "date": str(first_day + timedelta(days=day)),
+                    "period": period,
+                    "subject": SUBJECTS[subject],
+                    "status": "present" if random.random() < 0.8 else "absent"
+                })
+                if len(batch) == 10000:
+                    db.attendance.insert_many(batch, ordered=False)
+                    batch = []
+    if batch:
+        db.attendance.insert_many(batch, ordered=False)
+
+async def measure(name, call):
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        await call()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p50 = timings[len(timings) // 2]
+    p95 = timings[int(len(timings) * 0.95)]
+    verdict = "PASS" if p95 < TARGET_MS else "FAIL"
+    print(f"{verdict} - {name}: p50 {p50:.1f} ms, p95 {p95:.1f} ms, max {timings[-1]:.1f} ms")
+    return p95 < TARGET_MS
+
+async def run_benchmark():
+    # Measured through the same async driver the endpoints use
+    db = AsyncIOMotorClient(settings.MONGODB_URL)[BENCH_DB]
+    ok = await measure("student stats", lambda: student_attendance_stats(db, f"student-{random.randrange(STUDENTS)}"))
+    ok = await measure("faculty stats", lambda: faculty_attendance_stats(db, f"faculty-{random.randrange(FACULTY)}")) and ok
+    return ok
+
+if __name__ == "__main__":
+    db = MongoClient(settings.MONGODB_URL)[BENCH_DB]
+    print(f"Seeding {TOTAL_ROWS} attendance rows into {BENCH_DB}...")
+    seed(db)
+    print(f"Rows: {db.attendance.estimated_document_count()}")
+    
+    sys.exit(0 if asyncio.run(run_benchmark()) else 1)
@@ -0,0 +1,40 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.services.passwords import hash_password_sync, verify_password_sync
+
+# log2(n) settings to compare; r and p come from settings
+COSTS = [int(cost) for cost in sys.argv[1:]] or [12, 13, 14, 15, 16]
+SECONDS = 3.0
+PASSWORD = "correct horse battery staple"
+
+def logins_per_second(hashed: str, workers: int) -> float:
+    """Verify the same hash on `workers` threads for SECONDS and return verifications/s"""
+    deadline = time.perf_counter() + SECONDS
+
+    def worker():
+        done = 0
+        while time.perf_counter() < deadline:
+            verify_password_sync(PASSWORD, hashed)
+            done += 1
+        return done
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        total = sum(pool.map(lambda _: worker(), range(workers)))
+    return total / (time.perf_counter() - started)
+
+if __name__ == "__main__":
+    cores = os.cpu_count() or 1
+    print(f"Login throughput by scrypt cost ({cores} cores, {SECONDS:.0f}s per run)")
+    print(f"{'log2 n':>6} {'memory':>8} {'latency':>9} {'per core':>10} {'all cores':>10}")
+    for log_n in COSTS:
+        hashed = hash_password_sync(PASSWORD, log_n)
+        started = time.perf_counter()
+        verify_password_sync(PASSWORD, hashed)
+        latency_ms = (time.perf_counter() - started) * 1000
+        memory_mb = 128 * int(hashed.split("$")[2]) * (1 << log_n) / (1024 * 1024)
+        single = logins_per_second(hashed, 1)
+        pooled = logins_per_second(hashed, cores)
+        print(f"{log_n:>6} {memory_mb:>6.0f}MB {latency_ms:>7.1f}ms {single:>8.1f}/s {pooled:>8.1f}/s")
@@ -0,0 +1,87 @@
+"""Throughput of the classroom-photo pipeline at increasing worker counts.
+
+Uses SyntheticBackend, a stand-in detector/embedder with realistic CPU cost:
+each photo is a grid of flat tiles whose colour encodes a student, detection
+scans a downscaled copy of the photo and embedding is a dense projection of
+every aligned crop. No database is needed.
+
+    python bench_photo_pipeline.py [photos] [students]
+"""
+import asyncio
+import io
+import os
+import sys
+import time
+import numpy as np
+from PIL import Image
+from app.services.face_backend import CROP_SIZE, FACE_TEMPLATE, DetectedFace, FaceBackend
+from app.services.face_gallery import FaceGallery
+from app.services.photo_pipeline import PhotoPipeline
+
+TILE = 160
+COLUMNS, ROWS = 8, 5
+DIM = 512
+
+def student_vector(student: int) -> np.ndarray:
+    return np.random.default_rng(student).normal(size=DIM).astype(np.float32)
+
+class SyntheticBackend(FaceBackend):
+    def __init__(self):
+        self.projection = np.random.default_rng(0).normal(size=(CROP_SIZE * CROP_SIZE * 3, 64)).astype(np.float32)
+
+    def detect(self, image):
+        small = image[::4, ::4].astype(np.float32)
+        edges = np.abs(np.diff(small, axis=0)).sum() + np.abs(np.diff(small, axis=1)).sum()
+        faces = []
+        for row in range(image.shape[0] // TILE):
+            for column in range(image.shape[1] // TILE):
+                y, x = row * TILE, column * TILE
+                if image[y + TILE // 2, x + TILE // 2, 2] == 200:
+                    landmarks = FACE_TEMPLATE * (TILE / CROP_SIZE) + [x, y]
+                    faces.append(DetectedFace(np.array([x, y, x + TILE, y + TILE]), landmarks, float(edges > 0)))
+        return faces
+
+    def embed(self, crops):
+        features = crops.reshape(len(crops), -1).astype(np.float32) @ self.projection
+        students = crops[:, CROP_SIZE // 2, CROP_SIZE // 2, 0].astype(int) + 256 * crops[:, CROP_SIZE // 2, CROP_SIZE // 2, 1].astype(int)
+        return np.stack([student_vector(student) for student in students]) + 1e-6 * features[:, :1]
+
+def make_photo(students) -> bytes:
+    image = np.zeros((ROWS * TILE, COLUMNS * TILE, 3), dtype=np.uint8)
+    for position, student in enumerate(students):
+        y, x = (position // COLUMNS) * TILE, (position % COLUMNS) * TILE
+        image[y:y + TILE, x:x + TILE] = (student % 256, student // 256, 200)
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+async def measure(workers: int, photos, gallery, expected) -> None:
+    pipeline = PhotoPipeline("bench_photo_pipeline:SyntheticBackend", workers, queue_size=4)
+    try:
+        await pipeline.run(photos[:workers], gallery, 3, 0.5)  # start the workers
+        started = time.perf_counter()
+        result = await pipeline.run(photos, gallery, 3, 0.5)
+        elapsed = time.perf_counter() - started
+    finally:
+        pipeline.shutdown()
+    found = {face["student_id"] for face in result["faces"] if face["student_id"]}
+    stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in result["timings"].items() if stage != "total")
+    print(f"{workers:>7}  {len(photos) / elapsed:>10.1f}  {len(found & expected) / len(expected):>6.3f}  {stages}")
+
+def main():
+    photo_count = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    student_count = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    rng = np.random.default_rng(1)
+    students = [f"s{student}" for student in range(student_count)]
+    gallery = FaceGallery(students, np.stack([student_vector(student) for student in range(student_count)]))
+    seated = [rng.choice(student_count, COLUMNS * ROWS, replace=False) for _ in range(photo_count)]
+    photos = [make_photo(group) for group in seated]
+    expected = {f"s{student}" for group in seated for student in group}
+
+    print(f"{photo_count} photos of {COLUMNS * ROWS} faces ({COLUMNS * TILE}x{ROWS * TILE}), {os.cpu_count()} cores")
+    print("workers  photos/s  recall  stage seconds (summed over workers)")
+    for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        asyncio.run(measure(workers, photos, gallery, expected))
+
+if __name__ == "__main__":
+    main()
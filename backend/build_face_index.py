@@ -0,0 +1,24 @@
+import sys
+import time
+from core.config import settings, FACE_EMBEDDINGS_COLLECTION
+from core.database import get_database
+from app.services.face_gallery import decode_vectors, gallery_query
+from app.services.face_index import IVFIndex, index_lock, save_index
+
+if __name__ == "__main__":
+    # Optional list count; defaults to sqrt(rows)
+    nlist = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    db = get_database()
+    docs = list(db[FACE_EMBEDDINGS_COLLECTION].find(
+        gallery_query(), {"_id": 0, "student_id": 1, "vector": 1}
+    ))
+    if not docs:
+        sys.exit(f"No {settings.FACE_MODEL_VERSION} face embeddings to index")
+
+    started = time.perf_counter()
+    vectors = decode_vectors([doc["vector"] for doc in docs], settings.FACE_EMBEDDING_DIM)
+    index = IVFIndex.build([doc["student_id"] for doc in docs], vectors, nlist)
+    with index_lock():
+        save_index(index)
+    print(f"Indexed {len(docs)} embeddings of {len(index.student_ids)} students into {index.meta['nlist']} lists "
+          f"at {settings.FACE_ANN_INDEX_DIR} in {time.perf_counter() - started:.1f}s")
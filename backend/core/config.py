@@ -2,16 +2,129 @@ import os
 
 class Settings:
     MONGODB_URL: str = "mongodb://localhost:27017"
-    SECRET_KEY: str = "your-secret-key-here-for-jwt-tokens"
+    
+    # MongoDB connection pool, sized per worker process
+    MONGODB_MIN_POOL_SIZE: int = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+    MONGODB_MAX_POOL_SIZE: int = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+    MONGODB_MAX_IDLE_TIME_MS: int = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "60000"))
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "2000"))
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+    MONGODB_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "5000"))
+    MONGODB_SOCKET_TIMEOUT_MS: int = int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "10000"))
+    # Wire compression; zstd and snappy need the zstandard / python-snappy packages
+    MONGODB_COMPRESSORS: str = os.getenv("MONGODB_COMPRESSORS", "zlib")
+    SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here-for-jwt-tokens")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Verified-token cache; entries also expire with their token
+    PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+    PRINCIPAL_CACHE_TTL_SECONDS: int = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+    
+    # Password hashing (scrypt); each hash needs 128 * r * 2**log_n bytes of memory
+    PASSWORD_SCRYPT_LOG_N: int = int(os.getenv("PASSWORD_SCRYPT_LOG_N", "14"))
+    PASSWORD_SCRYPT_R: int = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+    PASSWORD_SCRYPT_P: int = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+    
     # Email configuration
-    SMTP_SERVER: str = "smtp.gmail.com"
-    SMTP_PORT: int = 587
-    SMTP_USERNAME: str = ""
-    SMTP_PASSWORD: str = ""
-    FROM_EMAIL: str = ""
+    SMTP_SERVER: str = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+    SMTP_PORT: int = int(os.getenv("SMTP_PORT", "587"))
+    SMTP_USERNAME: str = os.getenv("SMTP_USERNAME", "")
+    SMTP_PASSWORD: str = os.getenv("SMTP_PASSWORD", "")
+    SMTP_STARTTLS: bool = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+    SMTP_TIMEOUT_SECONDS: float = float(os.getenv("SMTP_TIMEOUT_SECONDS", "30"))
+    FROM_EMAIL: str = os.getenv("FROM_EMAIL", "")
+    
+    # Outbound mail queue: one SMTP session per worker, reused across batches
+    EMAIL_OUTBOX_BATCH_SIZE: int = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "200"))
+    EMAIL_OUTBOX_POLL_SECONDS: float = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "5"))
+    # A claimed batch is picked up again when its worker has not extended the
+    # lock (every third of this time while sending) for this long
+    EMAIL_OUTBOX_LOCK_SECONDS: int = int(os.getenv("EMAIL_OUTBOX_LOCK_SECONDS", "300"))
+    EMAIL_MAX_ATTEMPTS: int = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+    EMAIL_RETRY_BASE_SECONDS: float = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+    EMAIL_RETRY_MAX_SECONDS: float = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", "3600"))
+    # The SMTP session is closed after this long without mail
+    EMAIL_SMTP_IDLE_SECONDS: float = float(os.getenv("EMAIL_SMTP_IDLE_SECONDS", "60"))
+    # Sent messages are removed from the outbox after this many days
+    EMAIL_OUTBOX_RETENTION_DAYS: int = int(os.getenv("EMAIL_OUTBOX_RETENTION_DAYS", "7"))
+    
+    # Result grading: minimum percentage per grade
+    GRADE_BOUNDARIES: str = os.getenv("GRADE_BOUNDARIES", "90:A+,80:A,70:B+,60:B,50:C,40:D,0:F")
+    # CGPA: grade points per grade and the credit weight of subjects without an entry
+    GRADE_POINTS: str = os.getenv("GRADE_POINTS", "A+:10,A:9,B+:8,B:7,C:6,D:5,F:0")
+    DEFAULT_SUBJECT_CREDITS: float = float(os.getenv("DEFAULT_SUBJECT_CREDITS", "1"))
+    
+    # Response cache for read-heavy GETs: "local" (in-memory stand-in), "redis" or "none" for the shared tier
+    RESPONSE_CACHE_BACKEND: str = os.getenv("RESPONSE_CACHE_BACKEND", "local")
+    RESPONSE_CACHE_REDIS_URL: str = os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+    RESPONSE_CACHE_LOCAL_SIZE: int = int(os.getenv("RESPONSE_CACHE_LOCAL_SIZE", "2000"))
+    # Kept short so writes handled by other workers show up quickly
+    RESPONSE_CACHE_LOCAL_TTL_SECONDS: int = int(os.getenv("RESPONSE_CACHE_LOCAL_TTL_SECONDS", "30"))
+    RESPONSE_CACHE_SHARED_TTL_SECONDS: int = int(os.getenv("RESPONSE_CACHE_SHARED_TTL_SECONDS", "300"))
+    # Entries held by the in-memory shared tier ("local" backend)
+    RESPONSE_CACHE_SHARED_SIZE: int = int(os.getenv("RESPONSE_CACHE_SHARED_SIZE", "20000"))
+    
+    # Holiday calendar: weekday numbers (Monday=0) that are never working days,
+    # and how long a worker trusts its copy before reloading
+    WEEKEND_DAYS: str = os.getenv("WEEKEND_DAYS", "5,6")
+    HOLIDAY_CALENDAR_TTL_SECONDS: int = int(os.getenv("HOLIDAY_CALENDAR_TTL_SECONDS", "300"))
+    # Approved-leave index used to record absences as leave
+    LEAVE_INDEX_TTL_SECONDS: int = int(os.getenv("LEAVE_INDEX_TTL_SECONDS", "300"))
+    
+    # Daily background jobs run once per day across all workers; a run that
+    # has not finished after this long may be taken over
+    JOB_LEASE_SECONDS: int = int(os.getenv("JOB_LEASE_SECONDS", "3600"))
+    
+    # Nightly attendance shortage alerts; subjects with fewer classes than
+    # the minimum are not judged yet
+    ATTENDANCE_SHORTAGE_THRESHOLD: float = float(os.getenv("ATTENDANCE_SHORTAGE_THRESHOLD", "75"))
+    ATTENDANCE_SHORTAGE_MIN_CLASSES: int = int(os.getenv("ATTENDANCE_SHORTAGE_MIN_CLASSES", "10"))
+    ATTENDANCE_SHORTAGE_CHANNELS: str = os.getenv("ATTENDANCE_SHORTAGE_CHANNELS", "email,in_app")
+    ATTENDANCE_SHORTAGE_REPEAT_DAYS: int = int(os.getenv("ATTENDANCE_SHORTAGE_REPEAT_DAYS", "7"))
+    ATTENDANCE_SHORTAGE_BATCH_SIZE: int = int(os.getenv("ATTENDANCE_SHORTAGE_BATCH_SIZE", "1000"))
+    
+    # Face recognition: galleries only hold embeddings of the current model version;
+    # scores are cosine similarities of L2-normalized embeddings
+    FACE_MODEL_VERSION: str = os.getenv("FACE_MODEL_VERSION", "default-512")
+    FACE_EMBEDDING_DIM: int = int(os.getenv("FACE_EMBEDDING_DIM", "512"))
+    FACE_MAX_EMBEDDINGS_PER_STUDENT: int = int(os.getenv("FACE_MAX_EMBEDDINGS_PER_STUDENT", "5"))
+    FACE_MATCH_THRESHOLD: float = float(os.getenv("FACE_MATCH_THRESHOLD", "0.5"))
+    FACE_MATCH_TOP_K: int = int(os.getenv("FACE_MATCH_TOP_K", "3"))
+    FACE_GALLERY_TTL_SECONDS: int = int(os.getenv("FACE_GALLERY_TTL_SECONDS", "300"))
+    # Optional IVF index for campus-wide matches, built by build_face_index.py
+    FACE_ANN_ENABLED: bool = os.getenv("FACE_ANN_ENABLED", "true").lower() == "true"
+    FACE_ANN_INDEX_DIR: str = os.getenv("FACE_ANN_INDEX_DIR", "face_index")
+    FACE_ANN_NPROBE: int = int(os.getenv("FACE_ANN_NPROBE", "8"))
+    # Rows added since the last fold into the inverted lists
+    FACE_ANN_DELTA_LIMIT: int = int(os.getenv("FACE_ANN_DELTA_LIMIT", "2000"))
+    # Detector + embedder for classroom photos, as "module:Class" (see app/services/face_backend.py)
+    FACE_BACKEND: str = os.getenv("FACE_BACKEND", "")
+    PHOTO_PIPELINE_WORKERS: int = int(os.getenv("PHOTO_PIPELINE_WORKERS", str(os.cpu_count() or 1)))
+    PHOTO_PIPELINE_QUEUE_SIZE: int = int(os.getenv("PHOTO_PIPELINE_QUEUE_SIZE", "4"))
+    PHOTO_MAX_IMAGES: int = int(os.getenv("PHOTO_MAX_IMAGES", "20"))
+    PHOTO_MAX_BYTES: int = int(os.getenv("PHOTO_MAX_BYTES", str(15 * 1024 * 1024)))
+    PHOTO_MAX_PIXELS: int = int(os.getenv("PHOTO_MAX_PIXELS", str(40_000_000)))
+    # Registration-photo embeddings by content hash, so rebuilds only embed new or changed photos
+    EMBEDDING_CACHE_DIR: str = os.getenv("EMBEDDING_CACHE_DIR", "embedding_cache")
+    EMBEDDING_CACHE_CAPACITY: int = int(os.getenv("EMBEDDING_CACHE_CAPACITY", "100000"))
+    PHOTO_FETCH_THREADS: int = int(os.getenv("PHOTO_FETCH_THREADS", "16"))
+    PHOTO_FETCH_TIMEOUT_SECONDS: int = int(os.getenv("PHOTO_FETCH_TIMEOUT_SECONDS", "10"))
+    # Live capture sessions: frames closer than the diff threshold (mean absolute
+    # difference of 32x32 grayscale thumbnails, 0-255) to the last sampled frame are skipped
+    STREAM_FRAME_DIFF_THRESHOLD: float = float(os.getenv("STREAM_FRAME_DIFF_THRESHOLD", "2"))
+    # Processor time a session may use per second of its duration (in cores), plus a burst allowance
+    STREAM_CPU_SHARE: float = float(os.getenv("STREAM_CPU_SHARE", "0.5"))
+    STREAM_CPU_BURST_SECONDS: float = float(os.getenv("STREAM_CPU_BURST_SECONDS", "5"))
+    # Summed match scores a student needs over the session to be marked present
+    STREAM_PRESENCE_CONFIDENCE: float = float(os.getenv("STREAM_PRESENCE_CONFIDENCE", "1.2"))
+    STREAM_MAX_FRAMES_PER_REQUEST: int = int(os.getenv("STREAM_MAX_FRAMES_PER_REQUEST", "30"))
+    # Sessions never ended are dropped after this long without frames
+    STREAM_SESSION_TTL_HOURS: int = int(os.getenv("STREAM_SESSION_TTL_HOURS", "6"))
+
+    # Parquet snapshots for analytics, refreshed nightly
+    ANALYTICS_EXPORT_DIR: str = os.getenv("ANALYTICS_EXPORT_DIR", "analytics_exports")
     
     # Frontend URL for email verification
     FRONTEND_URL: str = "http://localhost:8501"
@@ -24,4 +137,14 @@ USERS_COLLECTION = "users"
 STUDENTS_COLLECTION = "students"
 FACULTY_COLLECTION = "faculty"
 ATTENDANCE_COLLECTION = "attendance"
+ATTENDANCE_BUCKETS_COLLECTION = "attendance_buckets"
 RESULTS_COLLECTION = "results"
+SUBJECT_CREDITS_COLLECTION = "subject_credits"
+HOLIDAYS_COLLECTION = "holidays"
+LEAVES_COLLECTION = "leaves"
+EMAIL_OUTBOX_COLLECTION = "email_outbox"
+ATTENDANCE_ALERTS_COLLECTION = "attendance_alerts"
+NOTIFICATIONS_COLLECTION = "notifications"
+FACE_EMBEDDINGS_COLLECTION = "face_embeddings"
+ATTENDANCE_SESSIONS_COLLECTION = "attendance_sessions"
+JOB_RUNS_COLLECTION = "job_runs"
@@ -1,19 +1,79 @@
 from pymongo import MongoClient
+from pymongo.monitoring import ConnectionPoolListener
+from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.errors import ConnectionFailure, DuplicateKeyError
-from typing import Optional
+from typing import Dict, Optional
 import logging
-from core.config import settings, ATTENDANCE_DB, USERS_COLLECTION, STUDENTS_COLLECTION, FACULTY_COLLECTION, ATTENDANCE_COLLECTION, RESULTS_COLLECTION
+import threading
+from core.config import settings, ATTENDANCE_DB, USERS_COLLECTION, STUDENTS_COLLECTION, FACULTY_COLLECTION, ATTENDANCE_COLLECTION, ATTENDANCE_BUCKETS_COLLECTION, RESULTS_COLLECTION, SUBJECT_CREDITS_COLLECTION, HOLIDAYS_COLLECTION, LEAVES_COLLECTION, EMAIL_OUTBOX_COLLECTION, ATTENDANCE_ALERTS_COLLECTION, NOTIFICATIONS_COLLECTION, FACE_EMBEDDINGS_COLLECTION, ATTENDANCE_SESSIONS_COLLECTION, JOB_RUNS_COLLECTION
 
 logger = logging.getLogger(__name__)
 
+class PoolMonitor(ConnectionPoolListener):
+    """Track connection pool usage for one client from PyMongo's pool events"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open_connections = 0
+        self.checked_out = 0
+        self.checkout_failures = 0
+        
+    def _add(self, field: str, amount: int):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+            
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_check_out_started(self, event): pass
+    
+    def connection_created(self, event):
+        self._add("open_connections", 1)
+        
+    def connection_closed(self, event):
+        self._add("open_connections", -1)
+        
+    def connection_check_out_failed(self, event):
+        self._add("checkout_failures", 1)
+        
+    def connection_checked_out(self, event):
+        self._add("checked_out", 1)
+        
+    def connection_checked_in(self, event):
+        self._add("checked_out", -1)
+        
+    def stats(self) -> Dict:
+        return {
+            "max_pool_size": settings.MONGODB_MAX_POOL_SIZE,
+            "open_connections": self.open_connections,
+            "checked_out": self.checked_out,
+            "utilisation": self.checked_out / settings.MONGODB_MAX_POOL_SIZE if settings.MONGODB_MAX_POOL_SIZE else 0.0,
+            "checkout_failures": self.checkout_failures
+        }
+
+def client_options() -> Dict:
+    """Pool, timeout and compression options shared by the sync and async clients"""
+    return {
+        "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+        "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGODB_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGODB_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGODB_SOCKET_TIMEOUT_MS,
+        "compressors": settings.MONGODB_COMPRESSORS
+    }
+
 class Database:
     def __init__(self):
         self.client: Optional[MongoClient] = None
         self.db = None
+        self.pool_monitor = PoolMonitor()
         
     def connect(self):
         try:
-            self.client = MongoClient(settings.MONGODB_URL)
+            self.client = MongoClient(settings.MONGODB_URL, event_listeners=[self.pool_monitor], **client_options())
             self.db = self.client[ATTENDANCE_DB]
             # Test connection
             self.client.admin.command('ping')
@@ -29,43 +89,139 @@ class Database:
             self.client.close()
             logger.info("Disconnected from MongoDB")
             
-    def _create_indexes(self):
-        """Create necessary indexes for optimal performance"""
+    def _index(self, collection: str, keys, **options) -> bool:
+        """Create one index; a failure (e.g. duplicates under a unique key) is logged and skips only that index"""
         try:
-            # Users collection indexes
-            self.db[USERS_COLLECTION].create_index("email", unique=True)
-            
-            # Students collection indexes
-            self.db[STUDENTS_COLLECTION].create_index("usn", unique=True)
-            self.db[STUDENTS_COLLECTION].create_index("email", unique=True)
-            self.db[STUDENTS_COLLECTION].create_index("user_id", unique=True)
-            
-            # Faculty collection indexes
-            self.db[FACULTY_COLLECTION].create_index("email", unique=True)
-            self.db[FACULTY_COLLECTION].create_index("user_id", unique=True)
+            self.db[collection].create_index(keys, **options)
+            return True
+        except Exception as e:
+            logger.error(f"Error creating index {keys} on {collection}: {e}")
+            self._index_failures += 1
+            return False
             
-            # Attendance collection indexes
-            self.db[ATTENDANCE_COLLECTION].create_index([("student_id", 1), ("date", 1), ("period", 1)], unique=True)
-            self.db[ATTENDANCE_COLLECTION].create_index("date")
-            self.db[ATTENDANCE_COLLECTION].create_index("student_id")
+    def _create_indexes(self):
+        """Create necessary indexes for optimal performance, each independently"""
+        self._index_failures = 0
+        # Users collection indexes
+        self._index(USERS_COLLECTION, "email", unique=True)
+        
+        # Students collection indexes
+        self._index(STUDENTS_COLLECTION, "id", unique=True)
+        self._index(STUDENTS_COLLECTION, "usn", unique=True)
+        self._index(STUDENTS_COLLECTION, "email", unique=True)
+        self._index(STUDENTS_COLLECTION, "user_id", unique=True)
+        # List filters; the trailing id serves the keyset cursor
+        for field in ("year", "stream", "college"):
+            self._index(STUDENTS_COLLECTION, [(field, 1), ("id", 1)])
+        # Incremental analytics export reads by updated_at
+        self._index(STUDENTS_COLLECTION, "updated_at")
+        
+        # Faculty collection indexes
+        self._index(FACULTY_COLLECTION, "email", unique=True)
+        self._index(FACULTY_COLLECTION, "user_id", unique=True)
+        self._index(FACULTY_COLLECTION, "id", unique=True)
+        for field in ("department", "stream", "college_name"):
+            self._index(FACULTY_COLLECTION, [(field, 1), ("id", 1)])
+        
+        # Attendance collection indexes
+        self._index(ATTENDANCE_COLLECTION, [("student_id", 1), ("date", 1), ("period", 1)], unique=True)
+        self._index(ATTENDANCE_COLLECTION, "date")
+        self._index(ATTENDANCE_COLLECTION, "student_id")
+        self._index(ATTENDANCE_COLLECTION, [("faculty_id", 1), ("date", 1)])
+        self._index(ATTENDANCE_COLLECTION, [("semester", 1), ("section", 1), ("date", 1)])
+        self._index(ATTENDANCE_COLLECTION, "updated_at")
+        
+        # Attendance window buckets
+        self._index(ATTENDANCE_BUCKETS_COLLECTION, [("student_id", 1), ("granularity", 1), ("start", 1), ("subject", 1)], unique=True)
+        self._index(ATTENDANCE_BUCKETS_COLLECTION, [("granularity", 1), ("start", 1)])
+        
+        # Results collection indexes
+        self._index(RESULTS_COLLECTION, [("student_id", 1), ("test_date", 1), ("subject", 1)], unique=True)
+        self._index(RESULTS_COLLECTION, "student_id")
+        self._index(RESULTS_COLLECTION, "test_date")
+        self._index(RESULTS_COLLECTION, [("semester", 1), ("section", 1), ("test_date", 1)])
+        self._index(RESULTS_COLLECTION, "updated_at")
+        # CGPA refresh reads one student's semester
+        self._index(RESULTS_COLLECTION, [("student_id", 1), ("semester", 1)])
+        self._index(RESULTS_COLLECTION, [("subject", 1), ("test_date", 1), ("test_type", 1)])
+        self._index(SUBJECT_CREDITS_COLLECTION, "subject", unique=True)
+        
+        # Holidays collection indexes (dates stored as YYYY-MM-DD strings)
+        self._index(HOLIDAYS_COLLECTION, "date")
+        self._index(HOLIDAYS_COLLECTION, [("state", 1), ("date", 1)])
+        
+        # Leaves collection indexes
+        self._index(LEAVES_COLLECTION, "usn")
+        self._index(LEAVES_COLLECTION, [("status", 1), ("start_date", 1)])
+        
+        # Email outbox indexes
+        self._index(EMAIL_OUTBOX_COLLECTION, "id", unique=True)
+        self._index(EMAIL_OUTBOX_COLLECTION, [("status", 1), ("next_attempt_at", 1)])
+        self._index(EMAIL_OUTBOX_COLLECTION, "claim", sparse=True)
+        self._index(EMAIL_OUTBOX_COLLECTION, "sent_at", expireAfterSeconds=settings.EMAIL_OUTBOX_RETENTION_DAYS * 86400)
+        
+        # Attendance shortage alert state and in-app notifications
+        self._index(ATTENDANCE_ALERTS_COLLECTION, "student_id", unique=True)
+        self._index(ATTENDANCE_ALERTS_COLLECTION, "run_id")
+        self._index(NOTIFICATIONS_COLLECTION, [("user_id", 1), ("created_at", -1)])
+        
+        # Face embeddings, loaded per (model version, section) gallery
+        self._index(FACE_EMBEDDINGS_COLLECTION, "student_id")
+        self._index(FACE_EMBEDDINGS_COLLECTION, [("model_version", 1), ("section", 1)])
+        
+        # Live capture sessions, dropped once idle past their TTL
+        self._index(ATTENDANCE_SESSIONS_COLLECTION, "id", unique=True)
+        self._index(ATTENDANCE_SESSIONS_COLLECTION, "updated_at", expireAfterSeconds=settings.STREAM_SESSION_TTL_HOURS * 3600)
+        
+        # Daily job leases, one per job and date
+        self._index(JOB_RUNS_COLLECTION, [("job", 1), ("date", 1)], unique=True)
+        
+        if self._index_failures:
+            logger.error(f"{self._index_failures} database indexes could not be created")
+        else:
+            logger.info("Database indexes created successfully")
             
-            # Results collection indexes
-            self.db[RESULTS_COLLECTION].create_index([("student_id", 1), ("test_date", 1), ("subject", 1)], unique=True)
-            self.db[RESULTS_COLLECTION].create_index("student_id")
-            self.db[RESULTS_COLLECTION].create_index("test_date")
+    def get_collection(self, collection_name: str):
+        """Get a specific collection from the database"""
+        if self.db is None:
+            self.connect()
+        return self.db[collection_name]
+    
+    def pool_stats(self) -> Dict:
+        return self.pool_monitor.stats()
+
+class AsyncDatabase:
+    """asyncio-native counterpart of Database used by the request handlers"""
+    def __init__(self):
+        self.client: Optional[AsyncIOMotorClient] = None
+        self.db = None
+        self.pool_monitor = PoolMonitor()
+        
+    def connect(self):
+        # Motor connects lazily on first use; the synchronous Database has
+        # already checked the server and created the indexes at startup.
+        self.client = AsyncIOMotorClient(settings.MONGODB_URL, event_listeners=[self.pool_monitor], **client_options())
+        self.db = self.client[ATTENDANCE_DB]
+        logger.info("Created async MongoDB client")
+        return True
             
-            logger.info("Database indexes created successfully")
-        except Exception as e:
-            logger.error(f"Error creating database indexes: {e}")
+    def disconnect(self):
+        if self.client:
+            self.client.close()
+            logger.info("Disconnected async MongoDB client")
             
     def get_collection(self, collection_name: str):
         """Get a specific collection from the database"""
         if self.db is None:
             self.connect()
         return self.db[collection_name]
+    
+    def pool_stats(self) -> Dict:
+        return self.pool_monitor.stats()
 
-# Global database instance
+# Global database instances
 db_instance = Database()
+async_db_instance = AsyncDatabase()
 
 def get_db():
     """Get the database instance"""
@@ -78,3 +234,16 @@ def get_database():
     if db_instance.db is None:
         db_instance.connect()
     return db_instance.db
+
+
+async def get_async_db():
+    """Get the async database instance"""
+    if async_db_instance.db is None:
+        async_db_instance.connect()
+    return async_db_instance
+
+async def get_async_database():
+    """Get the async database connection"""
+    if async_db_instance.db is None:
+        async_db_instance.connect()
+    return async_db_instance.db
\ No newline at end of file
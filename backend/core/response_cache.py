@@ -0,0 +1,159 @@
+"""Two-tier response cache for read-heavy GET endpoints.
+
+The in-process LRU tier answers repeat requests without leaving the worker.
+The shared tier (Redis when configured, otherwise an in-memory stand-in with the
+same interface) lets workers reuse each other's entries. Entries are tagged by
+collection and filter values, and writes invalidate the tags they affect.
+Responses carry an ETag, so a matching If-None-Match is answered with a 304.
+"""
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+import hashlib
+import json
+import threading
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from core.cache import TTLCache
+from core.config import settings
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # only needed for RESPONSE_CACHE_BACKEND=redis
+    redis = None
+
+class LocalSharedCache:
+    """In-memory stand-in for the shared tier, used when no Redis is configured"""
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries = TTLCache(maxsize, ttl, on_evict=self._forget)
+        self._tags: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _forget(self, key: str, entry: tuple):
+        # Called by the entries cache, under self._lock, for expired and evicted keys
+        for tag in entry[1]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    async def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry is not None else None
+
+    async def set(self, key: str, value: Dict, tags: Iterable[str]):
+        tags = tuple(tags)
+        with self._lock:
+            old = self._entries.pop(key)
+            if old is not None:
+                self._forget(key, old)
+            self._entries.set(key, (value, tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+    async def invalidate_tags(self, tags: Iterable[str]):
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, set()):
+                    entry = self._entries.pop(key)
+                    if entry is not None:
+                        self._forget(key, entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class RedisSharedCache:
+    """Shared tier on Redis; each tag is a set of the keys it covers"""
+    def __init__(self, url: str, ttl: float, prefix: str = "response-cache:"):
+        self.client = redis.from_url(url)
+        self.ttl = int(ttl)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Dict]:
+        raw = await self.client.get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    async def set(self, key: str, value: Dict, tags: Iterable[str]):
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+            for tag in tags:
+                pipe.sadd(self.prefix + "tag:" + tag, key)
+                pipe.expire(self.prefix + "tag:" + tag, self.ttl)
+            await pipe.execute()
+
+    async def invalidate_tags(self, tags: Iterable[str]):
+        for tag in tags:
+            tag_key = self.prefix + "tag:" + tag
+            keys = await self.client.smembers(tag_key)
+            await self.client.delete(tag_key, *[self.prefix + key.decode() for key in keys])
+
+class ResponseCache:
+    def __init__(self, local: TTLCache, shared=None):
+        self.local = local
+        self.shared = shared
+
+    async def get(self, key: str) -> Optional[Dict]:
+        entry = self.local.get(key)
+        if entry is None and self.shared is not None:
+            entry = await self.shared.get(key)
+            if entry is not None:
+                self.local.set(key, entry)
+        return entry
+
+    async def set(self, key: str, entry: Dict):
+        self.local.set(key, entry)
+        if self.shared is not None:
+            await self.shared.set(key, entry, entry["tags"])
+
+    async def invalidate(self, tags: Iterable[str]):
+        tags = set(tags)
+        self.local.delete_where(lambda _, entry: not tags.isdisjoint(entry["tags"]))
+        if self.shared is not None:
+            await self.shared.invalidate_tags(tags)
+
+def _shared_tier():
+    if settings.RESPONSE_CACHE_BACKEND == "redis":
+        if redis is None:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis needs the redis package")
+        return RedisSharedCache(settings.RESPONSE_CACHE_REDIS_URL, settings.RESPONSE_CACHE_SHARED_TTL_SECONDS)
+    if settings.RESPONSE_CACHE_BACKEND == "local":
+        return LocalSharedCache(settings.RESPONSE_CACHE_SHARED_SIZE, settings.RESPONSE_CACHE_SHARED_TTL_SECONDS)
+    return None
+
+response_cache = ResponseCache(
+    TTLCache(settings.RESPONSE_CACHE_LOCAL_SIZE, settings.RESPONSE_CACHE_LOCAL_TTL_SECONDS),
+    _shared_tier()
+)
+
+def query_tags(collection: str, **filters) -> List[str]:
+    """Tags for a read: the collection plus each filter value, or collection:* when unfiltered"""
+    values = [f"{collection}:{field}={value}" for field, value in sorted(filters.items()) if value is not None]
+    return [collection] + (values or [f"{collection}:*"])
+
+def write_tags(collection: str, **fields) -> List[str]:
+    """Tags a written document can affect: unfiltered reads and reads filtered on its values"""
+    return [f"{collection}:*"] + [f"{collection}:{field}={value}" for field, value in fields.items() if value is not None]
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+async def cached_json(request: Request, tags: List[str], build: Callable[[], Awaitable[Any]]) -> Response:
+    """Serve a GET from the cache (or build and store it), answering If-None-Match with 304"""
+    query = "&".join(f"{name}={value}" for name, value in sorted(request.query_params.multi_items()))
+    key = f"{request.url.path}?{query}"
+    entry = await response_cache.get(key)
+    status = "HIT"
+    if entry is None:
+        status = "MISS"
+        body = json.dumps(jsonable_encoder(await build()), separators=(",", ":"))
+        entry = {"etag": f'"{hashlib.sha256(body.encode()).hexdigest()[:32]}"', "body": body, "tags": tags}
+        await response_cache.set(key, entry)
+
+    headers = {"ETag": entry["etag"], "Cache-Control": "private, no-cache", "X-Cache": status}
+    if _etag_matches(request, entry["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
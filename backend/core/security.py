@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+import hashlib
+import time
+from jose import jwt
+from core.cache import TTLCache
+from core.config import settings
+
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    """Sign a JWT carrying the principal's id, role, profile id and token version"""
+    to_encode = data.copy()
+    now = datetime.utcnow()
+    expire = now + (expires_delta or timedelta(minutes=15))
+    to_encode.update({"exp": int(expire.timestamp()), "iat": int(now.timestamp())})
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+def decode_access_token(token: str) -> Dict:
+    """Verify signature and expiry; raises JWTError when either check fails"""
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+class PrincipalCache:
+    """Verified principals keyed by token digest, so repeat requests skip the users lookup"""
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize, ttl)
+
+    @staticmethod
+    def _digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict]:
+        return self._cache.get(self._digest(token))
+
+    def put(self, token: str, principal: Dict, expires_at: float):
+        # Never keep a principal past its token's own expiry
+        self._cache.set(self._digest(token), principal, ttl=max(expires_at - time.time(), 0))
+
+    def invalidate_user(self, user_id: str) -> int:
+        """Drop every cached token of a user, e.g. after a password change or deactivation"""
+        return self._cache.delete_where(lambda _, principal: principal["id"] == user_id)
+
+    def clear(self):
+        self._cache.clear()
+
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS)
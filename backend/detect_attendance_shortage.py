@@ -0,0 +1,9 @@
+import json
+import sys
+from core.database import get_database
+from app.services.attendance_shortage import detect_attendance_shortage
+
+if __name__ == "__main__":
+    # Optional threshold override, e.g. `python detect_attendance_shortage.py 80`
+    threshold = float(sys.argv[1]) if len(sys.argv) > 1 else None
+    print(json.dumps(detect_attendance_shortage(get_database(), threshold=threshold), indent=2))
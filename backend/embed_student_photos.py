@@ -0,0 +1,9 @@
+import json
+import sys
+from core.database import get_database
+from app.services.photo_embeddings import refresh_photo_embeddings
+
+if __name__ == "__main__":
+    # Optional worker count for the embedding model, e.g. `python embed_student_photos.py 4`
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    print(json.dumps(refresh_photo_embeddings(get_database(), workers=workers), indent=2))
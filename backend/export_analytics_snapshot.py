@@ -0,0 +1,11 @@
+import sys
+from core.database import get_database
+from app.services.analytics_export import export_analytics_snapshot
+
+if __name__ == "__main__":
+    # --full rebuilds every dataset (drops deleted documents); otherwise only changes since the last run
+    full = "--full" in sys.argv[1:]
+    collections = [arg for arg in sys.argv[1:] if not arg.startswith("--")] or None
+    exported = export_analytics_snapshot(get_database(), full=full, collections=collections)
+    for collection, rows in exported.items():
+        print(f"Exported {rows} {collection} rows")
\ No newline at end of file
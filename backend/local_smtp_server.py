@@ -0,0 +1,105 @@
+"""Local SMTP stand-in for development and tests.
+
+Accepts EHLO, AUTH, MAIL, RCPT, DATA and QUIT without delivering anything;
+received messages are kept in memory (and printed when run as a script).
+Point the backend at it with:
+
+    SMTP_SERVER=127.0.0.1 SMTP_PORT=8025 SMTP_STARTTLS=false python -m uvicorn main:app
+
+Addresses in `reject` get a 550, which the outbox treats as a permanent failure.
+"""
+import argparse
+import socketserver
+import threading
+from email import message_from_bytes
+from typing import List, Optional, Set
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        sender, recipients = None, []
+        self.reply("220 localhost ESMTP stand-in")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command, _, argument = line.decode(errors="replace").strip().partition(" ")
+            command = command.upper()
+            if command == "EHLO":
+                self.wfile.write(b"250-localhost\r\n250-8BITMIME\r\n250 AUTH PLAIN LOGIN\r\n")
+            elif command == "HELO":
+                self.reply("250 localhost")
+            elif command == "AUTH":
+                self.reply("235 Authentication successful")
+            elif command == "MAIL":
+                sender, recipients = argument.partition(":")[2].strip(), []
+                self.reply("250 OK")
+            elif command == "RCPT":
+                address = argument.partition(":")[2].strip().strip("<>")
+                if address in server.reject:
+                    self.reply("550 Mailbox unavailable")
+                else:
+                    recipients.append(address)
+                    self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if data in (b".\r\n", b".\n", b""):
+                        break
+                    lines.append(data[1:] if data.startswith(b"..") else data)
+                message = message_from_bytes(b"".join(lines))
+                with server.lock:
+                    server.messages.append({"from": sender, "to": recipients, "message": message})
+                if server.verbose:
+                    print(f"[{len(server.messages)}] {sender} -> {', '.join(recipients)}: {message['Subject']}")
+                self.reply("250 OK queued")
+            elif command in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, reject: Optional[Set[str]] = None, verbose: bool = False):
+        super().__init__((host, port), _SMTPHandler)
+        self.reject = reject or set()
+        self.verbose = verbose
+        self.messages: List[dict] = []
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local SMTP stand-in that prints received mail")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+    server = LocalSMTPServer(args.host, args.port, verbose=True)
+    print(f"SMTP stand-in listening on {args.host}:{server.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
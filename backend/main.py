@@ -1,7 +1,18 @@
-from fastapi import FastAPI
+import asyncio
+from datetime import time
+from functools import partial
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from pymongo.errors import ConnectionFailure
 from core.config import settings
-from core.database import get_database
+from core.database import get_database, get_async_database, db_instance, async_db_instance
+from app.services.scheduler import run_daily
+from app.services.attendance_windows import run_midnight_compaction
+from app.services.analytics_export import run_analytics_export
+from app.services.mail_outbox import run_outbox_worker
+from app.services.attendance_shortage import run_attendance_shortage
+from app.services.photo_pipeline import shutdown_photo_pipeline
 
 app = FastAPI(
     title="AI Powered Attendance Tracking System",
@@ -18,6 +29,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# A saturated pool or unreachable server fails fast instead of hanging requests
+@app.exception_handler(ConnectionFailure)
+async def database_unavailable(request: Request, exc: ConnectionFailure):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database temporarily unavailable, please retry"},
+        headers={"Retry-After": "1"}
+    )
+
 # Initialize database connection
 try:
     get_database()
@@ -29,14 +49,39 @@ except Exception as e:
 # Import and include routers
 from routers import (
     auth, attendance, results,
-    student, faculty
+    student, faculty, export, academic, faces
 )
+from app.routers import holidays, events, leaves
 
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(attendance.router, tags=["attendance"])
 app.include_router(results.router, prefix="/results", tags=["results"])
 app.include_router(student.router, tags=["students"])
 app.include_router(faculty.router, tags=["faculty"])
+app.include_router(export.router, tags=["export"])
+app.include_router(academic.router, tags=["academic"])
+app.include_router(faces.router, tags=["faces"])
+app.include_router(holidays.router, prefix="/holidays", tags=["holidays"])
+app.include_router(events.router, prefix="/events", tags=["events"])
+app.include_router(leaves.router, prefix="/leaves", tags=["leaves"])
+
+# Background jobs
+background_tasks = []
+
+@app.on_event("startup")
+async def start_background_jobs():
+    background_tasks.append(asyncio.create_task(run_daily(partial(run_midnight_compaction, get_database()))))
+    # After compaction, so the students snapshot carries fresh window counters
+    background_tasks.append(asyncio.create_task(run_daily(partial(run_analytics_export, get_database()), at=time(1, 0))))
+    # Reads the percentages refreshed by compaction; alerts go out through the outbox
+    background_tasks.append(asyncio.create_task(run_daily(partial(run_attendance_shortage, get_database()), at=time(2, 0))))
+    background_tasks.append(asyncio.create_task(run_outbox_worker(await get_async_database())))
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    for task in background_tasks:
+        task.cancel()
+    shutdown_photo_pipeline()
 
 @app.get("/")
 def read_root():
@@ -59,4 +104,11 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "database": "connected"}
+    return {
+        "status": "healthy",
+        "database": "connected",
+        "connection_pools": {
+            "sync": db_instance.pool_stats(),
+            "async": async_db_instance.pool_stats()
+        }
+    }
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import date, datetime
 from enum import Enum
 
@@ -9,12 +9,33 @@ class AttendanceStatus(str, Enum):
     LEAVE = "leave"
     HOLIDAY = "holiday"
 
+class AttendanceWriteMode(str, Enum):
+    INSERT = "insert"
+    UPSERT = "upsert"
+
 class AttendanceCreate(BaseModel):
     student_id: str
     date: date
     period: int
     subject: str
     status: AttendanceStatus
+    idempotency_key: Optional[str] = None
+    section: Optional[str] = None
+    semester: Optional[int] = None
+
+class RosterEntry(BaseModel):
+    student_id: str
+    status: AttendanceStatus
+    idempotency_key: Optional[str] = None
+
+class AttendanceRosterCreate(BaseModel):
+    date: date
+    period: int
+    subject: str
+    entries: List[RosterEntry]
+    mode: AttendanceWriteMode = AttendanceWriteMode.INSERT
+    section: Optional[str] = None
+    semester: Optional[int] = None
 
 class AttendanceUpdate(BaseModel):
     status: Optional[AttendanceStatus] = None
@@ -27,8 +48,29 @@ class AttendanceResponse(BaseModel):
     period: int
     subject: str
     status: str
+    section: Optional[str] = None
+    semester: Optional[int] = None
     created_at: datetime
     updated_at: datetime
+    write_result: Optional[str] = None  # set in upsert mode
+
+class RosterRowResult(BaseModel):
+    student_id: str
+    # insert mode: "inserted", "duplicate" or "failed"
+    # upsert mode: "created", "unchanged", "updated", "conflict" or "failed"
+    result: str
+    detail: Optional[str] = None
+
+class AttendanceRosterResponse(BaseModel):
+    on_leave: int = 0  # absences recorded as leave from approved applications
+    inserted: int = 0
+    duplicates: int = 0
+    created: int = 0
+    unchanged: int = 0
+    updated: int = 0
+    conflicts: int = 0
+    failed: int = 0
+    rows: List[RosterRowResult]
 
 class AttendanceSummary(BaseModel):
     total_classes: int
@@ -71,4 +113,22 @@ class OverallAttendanceStats(BaseModel):
     monthly_count: int
     total_classes: int
     attended_classes: int
-    average_percentage: float
\ No newline at end of file
+    average_percentage: float
+
+class AttendanceStatsResponse(BaseModel):
+    overall_attendance: OverallAttendanceStats
+    subject_wise_attendance: List[SubjectAttendanceStats]
+
+class FacultySubjectAttendanceStats(BaseModel):
+    daily_count: int
+    weekly_count: int
+    monthly_count: int
+    total_classes: int
+    average_attendance: float
+
+class FacultyAttendanceStats(BaseModel):
+    daily_classes: int
+    weekly_classes: int
+    monthly_classes: int
+    total_classes: int
+    subject_wise_stats: Dict[str, FacultySubjectAttendanceStats]
\ No newline at end of file
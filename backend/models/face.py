@@ -0,0 +1,98 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, List, Dict
+from datetime import date
+from models.attendance import AttendanceRosterResponse
+
+class FaceEmbeddingUpload(BaseModel):
+    embeddings: List[List[float]]
+    section: Optional[str] = None
+
+class FaceEmbeddingSummary(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+
+    student_id: str
+    section: Optional[str] = None
+    model_version: str
+    embeddings: int
+
+class FaceMatchRequest(BaseModel):
+    embeddings: List[List[float]]
+    section: Optional[str] = None  # None matches against every enrolled student
+    top_k: Optional[int] = Field(None, ge=1, le=50)
+    threshold: Optional[float] = None
+    # Campus-wide matches use the IVF index when one is built, unless exact is set
+    exact: bool = False
+    nprobe: Optional[int] = Field(None, ge=1, le=1024)
+
+class FaceCandidate(BaseModel):
+    student_id: str
+    score: float
+
+class FaceMatch(BaseModel):
+    face: int
+    # Best candidate once each student is given to at most one face
+    student_id: Optional[str] = None
+    score: Optional[float] = None
+    candidates: List[FaceCandidate]
+
+class FaceMatchResponse(BaseModel):
+    section: Optional[str] = None
+    method: str = "exact"  # "exact" or "ivf"
+    gallery_size: int
+    matches: List[FaceMatch]
+    elapsed_ms: float
+
+class PhotoResult(BaseModel):
+    photo: int
+    filename: Optional[str] = None
+    faces: int
+    error: Optional[str] = None
+
+class PhotoFace(BaseModel):
+    photo: int
+    face: int
+    box: List[float]  # x1, y1, x2, y2 in photo pixels
+    student_id: Optional[str] = None
+    score: Optional[float] = None
+
+class PhotoAttendanceResponse(BaseModel):
+    section: str
+    subject: str
+    period: int
+    date: str
+    photos: List[PhotoResult]
+    faces: List[PhotoFace]
+    present: int
+    absent: int
+    timings: Dict[str, float]  # seconds per stage summed over workers, plus processor "cpu" and wall-clock "total"
+    attendance: AttendanceRosterResponse
+
+class CaptureSessionCreate(BaseModel):
+    section: str
+    subject: str
+    period: int
+    attendance_date: Optional[date] = None  # today when omitted
+    semester: Optional[int] = None
+    mark_absent: bool = True
+
+class CaptureTrack(BaseModel):
+    student_id: str
+    frames: int
+    confidence: float  # summed match scores over the session
+    best: float
+    present: bool
+
+class CaptureSessionStatus(BaseModel):
+    id: str
+    section: str
+    subject: str
+    period: int
+    date: str
+    status: str  # "open", "committing" or "committed"
+    frames: Dict[str, int]  # received, sampled, similar, over_budget, invalid
+    faces: int
+    cpu_seconds: float
+    cpu_share: float  # cores used on average since the session started
+    elapsed_seconds: float
+    tracks: List[CaptureTrack]
+    attendance: Optional[AttendanceRosterResponse] = None
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime, date
 from enum import Enum
 
@@ -91,4 +91,11 @@ class FacultyInDB(FacultyBase):
 class FacultyResponse(FacultyBase):
     id: str
     created_at: datetime
-    updated_at: datetime
\ No newline at end of file
+    updated_at: datetime
+
+class FacultyPage(BaseModel):
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+# Fields returned by the faculty list when no fields= projection is given
+FACULTY_LIST_FIELDS = ["name", "email", "position", "department", "stream", "college_name", "employee_id"]
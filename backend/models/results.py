@@ -1,7 +1,8 @@
 from pydantic import BaseModel
 from typing import Optional, List, Dict
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
+from models.student import SemesterResult
 
 class TestType(str, Enum):
     CLASS_TEST = "class_test"
@@ -54,3 +55,61 @@ class TestResultSummary(BaseModel):
     test_type: TestType
     results: List[ResultResponse]
     average_percentage: float
+
+class MarksEntry(BaseModel):
+    student_id: str
+    marks_obtained: float
+    total_marks: Optional[float] = None  # defaults to the sheet's total_marks
+
+class MarksSheet(BaseModel):
+    subject: str
+    test_type: str  # "internal" or "lab"
+    test_date: date
+    semester: int
+    total_marks: float
+    section: Optional[str] = None
+    entries: List[MarksEntry]
+    grade_boundaries: Optional[Dict[str, float]] = None  # grade -> minimum percentage
+
+class MarksSheetRowResult(BaseModel):
+    student_id: str
+    result: str  # created, updated or failed
+    percentage: Optional[float] = None
+    grade: Optional[str] = None
+    detail: Optional[str] = None
+
+class MarksSheetResponse(BaseModel):
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    rows: List[MarksSheetRowResult]
+
+class SubjectCredits(BaseModel):
+    credits: float
+
+class StudentTranscript(BaseModel):
+    student_id: str
+    total_cgpa: float = 0.0
+    semester_results: List[SemesterResult] = []
+
+class ResultRanking(BaseModel):
+    student_id: str
+    marks_obtained: float
+    total_marks: float
+    percentage: float
+    grade: str
+    rank: int
+    percentile: float  # share of the class scoring strictly lower
+
+class ClassResultSummary(BaseModel):
+    subject: str
+    test_date: str
+    test_type: str
+    count: int
+    mean: float
+    median: float
+    std_dev: float
+    min: float
+    max: float
+    grade_distribution: Dict[str, int]
+    rankings: List[ResultRanking]
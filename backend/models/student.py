@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Any
 from datetime import date, datetime
 from enum import Enum
 
@@ -102,8 +102,8 @@ class OverallAttendance(BaseModel):
 class ExamResult(BaseModel):
     subject: str
     exam_type: str  # "internal" or "lab"
-    marks_obtained: int
-    total_marks: int
+    marks_obtained: float
+    total_marks: float
     percentage: float
     grade: str
     exam_date: date
@@ -111,6 +111,7 @@ class ExamResult(BaseModel):
 class SemesterResult(BaseModel):
     semester: int
     cgpa: float
+    credits: float = 0.0
     subjects: List[ExamResult] = []
     internal_results: List[ExamResult] = []
     lab_results: List[ExamResult] = []
@@ -133,3 +134,18 @@ class StudentResponse(StudentBase):
     overall_attendance: OverallAttendance
     created_at: datetime
     updated_at: datetime
+
+class StudentPage(BaseModel):
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+class Notification(BaseModel):
+    id: str
+    type: str
+    title: str
+    message: str
+    read: bool = False
+    created_at: datetime
+
+# Fields returned by the student list when no fields= projection is given
+STUDENT_LIST_FIELDS = ["name", "usn", "email", "degree", "college", "stream", "year", "total_cgpa", "overall_attendance"]
@@ -0,0 +1,17 @@
+import sys
+from core.database import get_database
+from app.services.attendance_rollups import rebuild_rollups
+from app.services.attendance_windows import rebuild_buckets, refresh_student_windows
+
+def rebuild(student_ids=None):
+    db = get_database()
+    rebuilt = rebuild_rollups(db, student_ids)
+    print(f"Rebuilt attendance rollups for {rebuilt} students")
+    
+    compacted = rebuild_buckets(db, student_ids)
+    refreshed = refresh_student_windows(db)
+    print(f"Rebuilt window buckets ({compacted} days compacted) and refreshed {refreshed} students")
+
+if __name__ == "__main__":
+    # Optionally pass student ids to rebuild only those students
+    rebuild(sys.argv[1:] or None)
@@ -0,0 +1,14 @@
+import asyncio
+import sys
+from core.database import get_async_database
+from app.services.cgpa import recompute_cgpa
+
+async def recompute(student_ids=None):
+    db = await get_async_database()
+    match = {"student_id": {"$in": student_ids}} if student_ids else None
+    refreshed = await recompute_cgpa(db, match)
+    print(f"Recomputed CGPA for {refreshed} student semesters")
+
+if __name__ == "__main__":
+    # Optionally pass student ids to recompute only those students
+    asyncio.run(recompute(sys.argv[1:] or None))
\ No newline at end of file
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from typing import List, Optional
 from datetime import datetime, date
 import uuid
 from models.academic import *
-from core.database import get_database
+from core.database import get_async_database
 from routers.auth import get_current_user
+from core.response_cache import cached_json, query_tags, response_cache, write_tags
 
 router = APIRouter(prefix="/academic", tags=["academic"])
 
@@ -12,7 +13,7 @@ router = APIRouter(prefix="/academic", tags=["academic"])
 async def create_note(
     note: NoteCreate,
     current_user = Depends(get_current_user),
-    db = Depends(get_database)
+    db = Depends(get_async_database)
 ):
     if current_user["role"] not in ["faculty", "admin"]:
         raise HTTPException(status_code=403, detail="Only faculty and admin can create notes")
@@ -23,18 +24,23 @@ async def create_note(
     note_data["created_at"] = datetime.now()
     note_data["updated_at"] = datetime.now()
     
-    db.notes.insert_one(note_data)
+    await db.notes.insert_one(note_data)
+    await response_cache.invalidate(write_tags("notes", subject=note.subject))
     return Note(**note_data)
 
 @router.get("/notes", response_model=List[Note])
 async def get_notes(
+    request: Request,
     subject: Optional[str] = None,
     current_user = Depends(get_current_user),
-    db = Depends(get_database)
+    db = Depends(get_async_database)
 ):
     query = {}
     if subject:
         query["subject"] = subject
     
-    notes = list(db.notes.find(query))
-    return [Note(**note) for note in notes]
\ No newline at end of file
+    async def load():
+        notes = await db.notes.find(query).to_list(length=None)
+        return [Note(**note) for note in notes]
+    
+    return await cached_json(request, query_tags("notes", subject=subject), load)
\ No newline at end of file
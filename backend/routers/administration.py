@@ -3,7 +3,7 @@ from typing import List, Optional
 from datetime import datetime, date, timedelta
 import uuid
 from models.administration import *
-from core.database import get_database
+from core.database import get_async_database
 from routers.auth import get_current_user
 
 router = APIRouter(prefix="/admin", tags=["administration"])
@@ -11,14 +11,14 @@ router = APIRouter(prefix="/admin", tags=["administration"])
 @router.get("/dashboard", response_model=DashboardData)
 async def get_dashboard_data(
     current_user = Depends(get_current_user),
-    db = Depends(get_database)
+    db = Depends(get_async_database)
 ):
     if current_user["role"] not in ["admin", "super_admin"]:
         raise HTTPException(status_code=403, detail="Only admin can access dashboard")
     
     # Get system statistics
-    total_students = db.students.count_documents({})
-    total_faculty = db.faculty.count_documents({})
+    total_students = await db.students.count_documents({})
+    total_faculty = await db.faculty.count_documents({})
     
     system_stats = SystemStats(
         total_students=total_students,
@@ -2,26 +2,66 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from datetime import date, datetime, timedelta
 from typing import List, Optional, Dict
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 import uuid
 
-from core.database import get_database
+from core.database import get_async_database
 from models.attendance import (
     AttendanceCreate, AttendanceResponse, AttendanceUpdate,
-    AttendanceSummary, MonthlyAttendance, WeeklyAttendance
+    AttendanceSummary, MonthlyAttendance, WeeklyAttendance,
+    AttendanceRosterCreate, AttendanceRosterResponse, AttendanceStatus, AttendanceWriteMode, RosterEntry
 )
 from routers.auth import get_current_user
+from app.services.attendance_service import enroll_roster
+from app.services.attendance_rollups import apply_rollups
+from app.services.leave_index import get_leave_index
 
 router = APIRouter(prefix="/attendance", tags=["attendance"])
 
 @router.post("/enroll", response_model=AttendanceResponse)
 async def enroll_attendance(
     attendance_data: AttendanceCreate,
+    mode: AttendanceWriteMode = AttendanceWriteMode.INSERT,
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_database)
+    db = Depends(get_async_database)
 ):
     if current_user["role"] != "faculty":
         raise HTTPException(status_code=403, detail="Only faculty can enroll attendance")
     
+    if mode == AttendanceWriteMode.UPSERT:
+        roster = AttendanceRosterCreate(
+            date=attendance_data.date,
+            period=attendance_data.period,
+            subject=attendance_data.subject,
+            entries=[RosterEntry(
+                student_id=attendance_data.student_id,
+                status=attendance_data.status,
+                idempotency_key=attendance_data.idempotency_key
+            )],
+            mode=mode,
+            section=attendance_data.section,
+            semester=attendance_data.semester
+        )
+        summary = await enroll_roster(db, roster, current_user["id"])
+        row = summary["rows"][0]
+        if row["result"] == "conflict":
+            raise HTTPException(status_code=409, detail=row["detail"])
+        if row["result"] == "failed":
+            raise HTTPException(status_code=500, detail=row.get("detail") or "Failed to mark attendance")
+        
+        stored = await db.attendance.find_one({
+            "student_id": attendance_data.student_id,
+            "date": str(attendance_data.date),
+            "period": attendance_data.period
+        })
+        stored["write_result"] = row["result"]
+        return AttendanceResponse(**stored)
+    
+    if attendance_data.status == AttendanceStatus.ABSENT:
+        leave_index = await get_leave_index(db)
+        if leave_index.on_leave(attendance_data.student_id, attendance_data.date):
+            attendance_data = attendance_data.copy(update={"status": AttendanceStatus.LEAVE})
+    
     attendance_dict = attendance_data.dict()
     attendance_dict["id"] = str(uuid.uuid4())
     attendance_dict["faculty_id"] = current_user["id"]
@@ -29,5 +69,23 @@ async def enroll_attendance(
     attendance_dict["created_at"] = datetime.now()
     attendance_dict["updated_at"] = datetime.now()
     
-    db.attendance.insert_one(attendance_dict)
-    return AttendanceResponse(**attendance_dict)
\ No newline at end of file
+    try:
+        await db.attendance.insert_one(attendance_dict)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Attendance already marked for this period")
+    await apply_rollups(db, [(attendance_data.student_id, str(attendance_data.date), None, None, attendance_data.subject, attendance_data.status.value)])
+    return AttendanceResponse(**attendance_dict)
+
+@router.post("/enroll/bulk", response_model=AttendanceRosterResponse)
+async def enroll_attendance_bulk(
+    roster: AttendanceRosterCreate,
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_async_database)
+):
+    if current_user["role"] != "faculty":
+        raise HTTPException(status_code=403, detail="Only faculty can enroll attendance")
+    
+    if not roster.entries:
+        raise HTTPException(status_code=400, detail="Roster has no entries")
+    
+    return AttendanceRosterResponse(**await enroll_roster(db, roster, current_user["id"]))
\ No newline at end of file
@@ -1,81 +1,74 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from datetime import datetime, timedelta
-from typing import Optional
+from pydantic import BaseModel
 import uuid
-import hashlib
+from jose import JWTError
 from models.student import StudentCreate, StudentInDB
 from models.faculty import FacultyCreate, FacultyInDB
-from core.database import get_database
+from core.database import get_async_database
 from core.config import settings
-from app.services.emailer import send_verification_email
+from core.security import create_access_token, decode_access_token, principal_cache
+from core.response_cache import response_cache, write_tags
+from app.services.mail_outbox import send_verification_email
+from app.services.passwords import hash_password, verify_password
 
 router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-SECRET_KEY = "your-secret-key-here-for-jwt-tokens"
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+class PasswordChange(BaseModel):
+    current_password: str
+    new_password: str
 
-def verify_password(plain_password, hashed_password):
-    return hashlib.sha256(plain_password.encode()).hexdigest() == hashed_password
-
-def get_password_hash(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire.timestamp()})
-    # Simple token creation without JWT library
-    import json
-    import base64
-    token_data = json.dumps(to_encode)
-    encoded_token = base64.b64encode(token_data.encode()).decode()
-    return encoded_token
-
-async def get_current_user(token: str = Depends(oauth2_scheme), db = Depends(get_database)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db = Depends(get_async_database)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    # Verified principals are cached per token, so steady-state requests skip the users lookup
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
     try:
-        import json
-        import base64
-        token_data = json.loads(base64.b64decode(token.encode()).decode())
-        user_id: str = token_data.get("sub")
-        if user_id is None:
-            raise credentials_exception
-        # Check token expiry
-        exp = token_data.get("exp")
-        if exp and datetime.utcnow().timestamp() > exp:
-            raise credentials_exception
-    except Exception:
+        payload = decode_access_token(token)
+    except JWTError:
         raise credentials_exception
-    
-    # Check in users collection
-    user = db.users.find_one({"id": user_id})
-    if user is None:
+    user_id = payload.get("sub")
+    if user_id is None:
         raise credentials_exception
-    return user
+
+    # First sight of this token: confirm the account is still active and the token not revoked
+    user = await db.users.find_one({"id": user_id}, {"_id": 0, "is_active": 1, "token_version": 1, "email": 1})
+    if user is None or not user.get("is_active", True):
+        raise credentials_exception
+    if payload.get("ver", 0) != user.get("token_version", 0):
+        raise credentials_exception
+
+    principal = {
+        "id": user_id,
+        "email": user.get("email"),
+        "role": payload.get("role"),
+        "profile_id": payload.get("profile_id"),
+        "is_active": True
+    }
+    principal_cache.put(token, principal, payload["exp"])
+    return principal
 
 @router.post("/register/student")
-async def register_student(student: StudentCreate, db = Depends(get_database)):
+async def register_student(student: StudentCreate, db = Depends(get_async_database)):
     # Check if user already exists
-    if db.users.find_one({"email": student.email}):
+    if await db.users.find_one({"email": student.email}):
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    if db.students.find_one({"usn": student.usn}):
+    if await db.students.find_one({"usn": student.usn}):
         raise HTTPException(status_code=400, detail="USN already registered")
     
     # Create user account
     user_id = str(uuid.uuid4())
-    hashed_password = get_password_hash(student.password)
+    hashed_password = await hash_password(student.password)
     
     user_data = {
         "id": user_id,
@@ -107,20 +100,20 @@ async def register_student(student: StudentCreate, db = Depends(get_database)):
         "updated_at": datetime.now()
     })
     
-    db.users.insert_one(user_data)
-    db.students.insert_one(student_dict)
+    await db.users.insert_one(user_data)
+    await db.students.insert_one(student_dict)
     
     return {"message": "Student registered successfully", "user_id": user_id}
 
 @router.post("/register/faculty")
-async def register_faculty(faculty: FacultyCreate, db = Depends(get_database)):
+async def register_faculty(faculty: FacultyCreate, db = Depends(get_async_database)):
     # Check if user already exists
-    if db.users.find_one({"email": faculty.email}):
+    if await db.users.find_one({"email": faculty.email}):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create user account
     user_id = str(uuid.uuid4())
-    hashed_password = get_password_hash(faculty.password)
+    hashed_password = await hash_password(faculty.password)
     
     user_data = {
         "id": user_id,
@@ -141,43 +134,100 @@ async def register_faculty(faculty: FacultyCreate, db = Depends(get_database)):
         "updated_at": datetime.now()
     })
     
-    db.users.insert_one(user_data)
-    db.faculty.insert_one(faculty_dict)
+    await db.users.insert_one(user_data)
+    await db.faculty.insert_one(faculty_dict)
+    await response_cache.invalidate(write_tags(
+        "faculty", department=faculty.department.value, stream=faculty.stream.value, college_name=faculty.college_name
+    ))
 
-    # Send verification email
+    # Queue the verification email; the outbox worker delivers it
     verification_link = f"http://localhost:8501/verify-email?token={user_id}&role=faculty"
     try:
-        await send_verification_email(faculty.email, verification_link)
+        await send_verification_email(db, faculty.email, verification_link)
         return {"message": "Faculty registered successfully. Please check your email for verification.", "user_id": user_id}
     except Exception as e:
         print(f"Failed to send verification email: {e}")
         return {"message": "Faculty registered successfully, but email verification failed. Please contact support.", "user_id": user_id}
 
 @router.post("/login")
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db = Depends(get_database)):
-    user = db.users.find_one({"email": form_data.username})
-    if not user or not verify_password(form_data.password, user["hashed_password"]):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db = Depends(get_async_database)):
+    user = await db.users.find_one({"email": form_data.username})
+    valid, rehashed = False, None
+    if user:
+        valid, rehashed = await verify_password(form_data.password, user["hashed_password"])
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if rehashed:
+        # Upgrade legacy SHA-256 or lower-cost hashes while we hold the plaintext
+        await db.users.update_one(
+            {"id": user["id"], "hashed_password": user["hashed_password"]},
+            {"$set": {"hashed_password": rehashed}}
+        )
+    
+    if not user.get("is_active", True):
+        raise HTTPException(status_code=403, detail="Account is deactivated")
+    
+    # Carry role and profile id in the signed token so handlers need not look them up
+    profile = None
+    if user["role"] == "student":
+        profile = await db.students.find_one({"user_id": user["id"]}, {"_id": 0, "id": 1})
+    elif user["role"] == "faculty":
+        profile = await db.faculty.find_one({"user_id": user["id"]}, {"_id": 0, "id": 1})
     
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user["id"]}, expires_delta=access_token_expires
+        data={
+            "sub": user["id"],
+            "role": user["role"],
+            "profile_id": profile["id"] if profile else None,
+            "ver": user.get("token_version", 0)
+        },
+        expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
+@router.post("/change-password")
+async def change_password(change: PasswordChange, current_user = Depends(get_current_user), db = Depends(get_async_database)):
+    user = await db.users.find_one({"id": current_user["id"]})
+    if not user or not (await verify_password(change.current_password, user["hashed_password"]))[0]:
+        raise HTTPException(status_code=400, detail="Current password is incorrect")
+    
+    # Bumping the token version revokes every token issued before the change
+    await db.users.update_one(
+        {"id": current_user["id"]},
+        {"$set": {"hashed_password": await hash_password(change.new_password)}, "$inc": {"token_version": 1}}
+    )
+    principal_cache.invalidate_user(current_user["id"])
+    return {"message": "Password changed successfully. Please log in again."}
+
+@router.post("/users/{user_id}/deactivate")
+async def deactivate_user(user_id: str, current_user = Depends(get_current_user), db = Depends(get_async_database)):
+    if current_user["role"] not in ["admin", "super_admin"]:
+        raise HTTPException(status_code=403, detail="Only administrators can deactivate accounts")
+    
+    result = await db.users.update_one(
+        {"id": user_id},
+        {"$set": {"is_active": False, "updated_at": datetime.now()}, "$inc": {"token_version": 1}}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    principal_cache.invalidate_user(user_id)
+    return {"message": "User deactivated successfully"}
+
 @router.get("/profile")
-async def get_profile(current_user = Depends(get_current_user), db = Depends(get_database)):
+async def get_profile(current_user = Depends(get_current_user), db = Depends(get_async_database)):
     if current_user["role"] == "student":
-        student = db.students.find_one({"user_id": current_user["id"]})
+        student = await db.students.find_one({"user_id": current_user["id"]})
         if student:
             student["role"] = "student"
             return student
     elif current_user["role"] == "faculty":
-        faculty = db.faculty.find_one({"user_id": current_user["id"]})
+        faculty = await db.faculty.find_one({"user_id": current_user["id"]})
         if faculty:
             faculty["role"] = "faculty"
             return faculty
@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from datetime import date
+from typing import Optional
+from core.database import get_async_database
+from routers.auth import get_current_user
+from app.services.exporter import (
+    ATTENDANCE_EXPORT_COLUMNS, RESULTS_EXPORT_COLUMNS, MEDIA_TYPES,
+    ExportFormat, export_query, stream_export
+)
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+def _streaming_response(chunks, name: str, fmt: ExportFormat) -> StreamingResponse:
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt.value}"'}
+    )
+
+@router.get("/attendance")
+async def export_attendance(
+    format: ExportFormat = ExportFormat.NDJSON,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    subject: Optional[str] = None,
+    section: Optional[str] = None,
+    semester: Optional[int] = None,
+    student_id: Optional[str] = None,
+    current_user = Depends(get_current_user),
+    db = Depends(get_async_database)
+):
+    if current_user["role"] not in ["faculty", "admin"]:
+        raise HTTPException(status_code=403, detail="Only faculty and admin can export attendance")
+
+    query = export_query(
+        "date",
+        str(start_date) if start_date else None,
+        str(end_date) if end_date else None,
+        subject=subject, section=section, semester=semester, student_id=student_id
+    )
+    chunks = stream_export(db.attendance, query, ATTENDANCE_EXPORT_COLUMNS, "date", format)
+    return _streaming_response(chunks, "attendance", format)
+
+@router.get("/results")
+async def export_results(
+    format: ExportFormat = ExportFormat.NDJSON,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    subject: Optional[str] = None,
+    section: Optional[str] = None,
+    semester: Optional[int] = None,
+    test_type: Optional[str] = None,
+    current_user = Depends(get_current_user),
+    db = Depends(get_async_database)
+):
+    if current_user["role"] not in ["faculty", "admin"]:
+        raise HTTPException(status_code=403, detail="Only faculty and admin can export results")
+
+    query = export_query(
+        "test_date",
+        str(start_date) if start_date else None,
+        str(end_date) if end_date else None,
+        subject=subject, section=section, semester=semester, test_type=test_type
+    )
+    chunks = stream_export(db.results, query, RESULTS_EXPORT_COLUMNS, "test_date", format)
+    return _streaming_response(chunks, "results", format)
@@ -0,0 +1,296 @@
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from datetime import date, datetime
+from typing import List, Optional
+import asyncio
+import time
+import uuid
+import numpy as np
+from core.config import settings, FACE_EMBEDDINGS_COLLECTION, ATTENDANCE_SESSIONS_COLLECTION
+from core.database import get_async_database
+from models.face import (
+    FaceEmbeddingUpload, FaceEmbeddingSummary, FaceMatchRequest,
+    FaceMatchResponse, FaceMatch, FaceCandidate, PhotoAttendanceResponse,
+    CaptureSessionCreate, CaptureSessionStatus, CaptureTrack
+)
+from models.attendance import AttendanceRosterCreate, AttendanceStatus, RosterEntry
+from routers.auth import get_current_user
+from app.services.face_gallery import assign_unique, decode_vectors, encode_vector, gallery_query, get_gallery, invalidate_gallery, normalize
+from app.services.face_index import get_face_index, update_face_index
+from app.services.photo_pipeline import get_photo_pipeline, photo_pipeline_available
+from app.services.attendance_service import enroll_roster
+from app.services.capture_sessions import end_session, ingest_frames, new_session
+
+router = APIRouter(prefix="/faces", tags=["faces"])
+
+def _require_staff(current_user: dict):
+    if current_user["role"] not in ["faculty", "admin"]:
+        raise HTTPException(status_code=403, detail="Only faculty and admin can manage face recognition")
+
+def _embedding_matrix(embeddings: List[List[float]]) -> np.ndarray:
+    if not embeddings:
+        raise HTTPException(status_code=400, detail="No embeddings given")
+    if any(len(embedding) != settings.FACE_EMBEDDING_DIM for embedding in embeddings):
+        raise HTTPException(status_code=400, detail=f"Embeddings must have {settings.FACE_EMBEDDING_DIM} dimensions")
+    matrix = np.array(embeddings, dtype=np.float32)
+    if not np.isfinite(matrix).all():
+        raise HTTPException(status_code=400, detail="Embeddings must be finite numbers")
+    return matrix
+
+async def _sync_face_index(db, student_id: str):
+    """Push a student's current embeddings into the on-disk IVF index, if one is built"""
+    docs = await db[FACE_EMBEDDINGS_COLLECTION].find(
+        {**gallery_query(), "student_id": student_id}, {"_id": 0, "vector": 1}
+    ).to_list(length=None)
+    vectors = decode_vectors([doc["vector"] for doc in docs], settings.FACE_EMBEDDING_DIM)
+    await asyncio.to_thread(update_face_index, student_id, vectors)
+
+@router.post("/students/{student_id}/embeddings", response_model=FaceEmbeddingSummary)
+async def enroll_face_embeddings(
+    student_id: str,
+    upload: FaceEmbeddingUpload,
+    replace: bool = False,
+    current_user = Depends(get_current_user),
+    db = Depends(get_async_database)
+):
+    """Store a student's face embeddings, keeping the newest FACE_MAX_EMBEDDINGS_PER_STUDENT"""
+    _require_staff(current_user)
+    vectors = normalize(_embedding_matrix(upload.embeddings))
+    if not await db.students.find_one({"id": student_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Student not found")
+
+    embeddings = db[FACE_EMBEDDINGS_COLLECTION]
+    scope = {"student_id": student_id, "model_version": settings.FACE_MODEL_VERSION}
+    previous_sections = await embeddings.distinct("section", scope)
+    if replace:
+        await embeddings.delete_many(scope)
+
+    now = datetime.now()
+    await embeddings.insert_many([{
+        "id": str(uuid.uuid4()),
+        "student_id": student_id,
+        "section": upload.section,
+        "model_version": settings.FACE_MODEL_VERSION,
+        "vector": encode_vector(vector),
+        "created_at": now
+    } for vector in vectors])
+
+    # The no-face photo marker holds no vector, so it neither takes a slot nor counts
+    kept = {**gallery_query(), "student_id": student_id}
+    stale = await embeddings.find(kept, {"_id": 1}).sort("created_at", -1).skip(settings.FACE_MAX_EMBEDDINGS_PER_STUDENT).to_list(length=None)
+    if stale:
+        await embeddings.delete_many({"_id": {"$in": [doc["_id"] for doc in stale]}})
+
+    for section in set(previous_sections) | {upload.section}:
+        invalidate_gallery(section)
+    await _sync_face_index(db, student_id)
+    return FaceEmbeddingSummary(
+        student_id=student_id,
+        section=upload.section,
+        model_version=settings.FACE_MODEL_VERSION,
+        embeddings=await embeddings.count_documents(kept)
+    )
+
+@router.delete("/students/{student_id}/embeddings")
+async def delete_face_embeddings(
+    student_id: str,
+    current_user = Depends(get_current_user),
+    db = Depends(get_async_database)
+):
+    _require_staff(current_user)
+    embeddings = db[FACE_EMBEDDINGS_COLLECTION]
+    sections = await embeddings.distinct("section", {"student_id": student_id})
+    result = await embeddings.delete_many({"student_id": student_id})
+    for section in sections:
+        invalidate_gallery(section)
+    await _sync_face_index(db, student_id)
+    return {"message": f"Deleted {result.deleted_count} face embeddings"}
+
+@router.post("/match", response_model=FaceMatchResponse)
+async def match_faces(
+    request: FaceMatchRequest,
+    current_user = Depends(get_current_user),
+    db = Depends(get_async_database)
+):
+    """Match the faces detected in one frame against a section's gallery"""
+    _require_staff(current_user)
+    queries = _embedding_matrix(request.embeddings)
+    top_k = request.top_k or settings.FACE_MATCH_TOP_K
+    threshold = settings.FACE_MATCH_THRESHOLD if request.threshold is None else request.threshold
+    # Loading the index stats and reads files, so keep it off the event loop
+    index = await asyncio.to_thread(get_face_index) if request.section is None and not request.exact else None
+    gallery = await get_gallery(db, request.section) if index is None else None
+
+    started = time.perf_counter()
+    if index is not None:
+        method, gallery_size = "ivf", len(index.student_ids)
+        candidates = await asyncio.to_thread(index.search, queries, top_k, threshold, request.nprobe)
+    else:
+        method, gallery_size = "exact", len(gallery)
+        candidates = await asyncio.to_thread(gallery.match, queries, top_k, threshold)
+    assigned = assign_unique(candidates)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    matches = []
+    for face, (options, best) in enumerate(zip(candidates, assigned)):
+        matches.append(FaceMatch(
+            face=face,
+            student_id=best[0] if best else None,
+            score=best[1] if best else None,
+            candidates=[FaceCandidate(student_id=student_id, score=score) for student_id, score in options]
+        ))
+    return FaceMatchResponse(
+        section=request.section, method=method, gallery_size=gallery_size, matches=matches, elapsed_ms=round(elapsed_ms, 3)
+    )
+
+@router.post("/attendance", response_model=PhotoAttendanceResponse)
+async def photo_attendance(
+    section: str = Form(...),
+    subject: str = Form(...),
+    period: int = Form(...),
+    attendance_date: Optional[date] = Form(None),
+    semester: Optional[int] = Form(None),
+    mark_absent: bool = Form(True),
+    images: List[UploadFile] = File(...),
+    current_user = Depends(get_current_user),
+    db = Depends(get_async_database)
+):
+    """Mark a period's attendance from classroom photos.
+
+    Every student of the section's gallery recognized in any photo is present;
+    with mark_absent the rest of the gallery is absent. Rows are written by
+    enroll_roster in insert mode, so a period already marked comes back as duplicates.
+    """
+    if current_user["role"] != "faculty":
+        raise HTTPException(status_code=403, detail="Only faculty can enroll attendance")
+    unavailable = photo_pipeline_available()
+    if unavailable:
+        raise HTTPException(status_code=503, detail=f"Photo attendance is unavailable: {unavailable}")
+    if not images or len(images) > settings.PHOTO_MAX_IMAGES:
+        raise HTTPException(status_code=400, detail=f"Send between 1 and {settings.PHOTO_MAX_IMAGES} photos")
+
+    photos = []
+    for image in images:
+        data = await image.read(settings.PHOTO_MAX_BYTES + 1)
+        if len(data) > settings.PHOTO_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"{image.filename} is larger than {settings.PHOTO_MAX_BYTES} bytes")
+        photos.append(data)
+
+    gallery = await get_gallery(db, section)
+    if len(gallery) == 0:
+        raise HTTPException(status_code=404, detail="No face embeddings enrolled for this section")
+    result = await get_photo_pipeline().run(photos, gallery, settings.FACE_MATCH_TOP_K, settings.FACE_MATCH_THRESHOLD)
+    for photo, image in zip(result["photos"], images):
+        photo["filename"] = image.filename
+
+    present = {face["student_id"] for face in result["faces"] if face["student_id"]}
+    absent = [student_id for student_id in gallery.student_ids if student_id not in present] if mark_absent else []
+    entries = [RosterEntry(student_id=student_id, status=AttendanceStatus.PRESENT) for student_id in sorted(present)]
+    entries += [RosterEntry(student_id=student_id, status=AttendanceStatus.ABSENT) for student_id in absent]
+    roster = AttendanceRosterCreate(
+        date=attendance_date or date.today(), period=period, subject=subject,
+        entries=entries, section=section, semester=semester
+    )
+
+    started = time.perf_counter()
+    summary = await enroll_roster(db, roster, current_user["id"]) if entries else {"rows": []}
+    result["timings"]["write"] = round(time.perf_counter() - started, 4)
+    return PhotoAttendanceResponse(
+        section=section, subject=subject, period=period, date=str(roster.date),
+        present=len(present), absent=len(absent), attendance=summary, **result
+    )
+
+def _session_status(session: dict) -> CaptureSessionStatus:
+    elapsed = ((session.get("ended_at") or datetime.now()) - session["started_at"]).total_seconds()
+    tracks = [
+        CaptureTrack(
+            student_id=student_id, frames=track.get("frames", 0), confidence=round(track.get("confidence", 0.0), 4),
+            best=round(track.get("best", 0.0), 4), present=track.get("confidence", 0.0) >= settings.STREAM_PRESENCE_CONFIDENCE
+        )
+        for student_id, track in session["tracks"].items()
+    ]
+    return CaptureSessionStatus(
+        id=session["id"], section=session["section"], subject=session["subject"], period=session["period"],
+        date=session["date"], status=session["status"], frames=session["frames"], faces=session["faces"],
+        cpu_seconds=round(session["cpu_seconds"], 4), cpu_share=round(session["cpu_seconds"] / max(elapsed, 1e-6), 4),
+        elapsed_seconds=round(elapsed, 3), tracks=sorted(tracks, key=lambda track: -track.confidence),
+        attendance=session.get("attendance")
+    )
+
+async def _own_session(db, session_id: str, current_user: dict) -> dict:
+    if current_user["role"] != "faculty":
+        raise HTTPException(status_code=403, detail="Only faculty can enroll attendance")
+    session = await db[ATTENDANCE_SESSIONS_COLLECTION].find_one({"id": session_id}, {"_id": 0})
+    if not session:
+        raise HTTPException(status_code=404, detail="Capture session not found")
+    if session["faculty_id"] != current_user["id"]:
+        raise HTTPException(status_code=403, detail="This capture session belongs to another faculty member")
+    return session
+
+@router.post("/sessions", response_model=CaptureSessionStatus)
+async def start_capture_session(
+    request: CaptureSessionCreate,
+    current_user = Depends(get_current_user),
+    db = Depends(get_async_database)
+):
+    """Open a live capture session; attendance is written once, when it ends"""
+    if current_user["role"] != "faculty":
+        raise HTTPException(status_code=403, detail="Only faculty can enroll attendance")
+    unavailable = photo_pipeline_available()
+    if unavailable:
+        raise HTTPException(status_code=503, detail=f"Live capture is unavailable: {unavailable}")
+    if len(await get_gallery(db, request.section)) == 0:
+        raise HTTPException(status_code=404, detail="No face embeddings enrolled for this section")
+
+    session = new_session(
+        request.section, request.subject, request.period, request.attendance_date or date.today(),
+        request.semester, request.mark_absent, current_user["id"]
+    )
+    await db[ATTENDANCE_SESSIONS_COLLECTION].insert_one(dict(session))
+    return _session_status(session)
+
+@router.post("/sessions/{session_id}/frames", response_model=CaptureSessionStatus)
+async def add_capture_frames(
+    session_id: str,
+    frames: List[UploadFile] = File(...),
+    current_user = Depends(get_current_user),
+    db = Depends(get_async_database)
+):
+    """Add the next frames of a session, oldest first (JPEG or PNG images)"""
+    session = await _own_session(db, session_id, current_user)
+    if session["status"] != "open":
+        raise HTTPException(status_code=409, detail="Capture session has ended")
+    if not frames or len(frames) > settings.STREAM_MAX_FRAMES_PER_REQUEST:
+        raise HTTPException(status_code=400, detail=f"Send between 1 and {settings.STREAM_MAX_FRAMES_PER_REQUEST} frames")
+
+    data = []
+    for frame in frames:
+        content = await frame.read(settings.PHOTO_MAX_BYTES + 1)
+        if len(content) > settings.PHOTO_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"{frame.filename} is larger than {settings.PHOTO_MAX_BYTES} bytes")
+        data.append(content)
+
+    session = await ingest_frames(db, session, data)
+    if session is None:
+        raise HTTPException(status_code=409, detail="Capture session has ended")
+    return _session_status(session)
+
+@router.get("/sessions/{session_id}", response_model=CaptureSessionStatus)
+async def get_capture_session(
+    session_id: str,
+    current_user = Depends(get_current_user),
+    db = Depends(get_async_database)
+):
+    return _session_status(await _own_session(db, session_id, current_user))
+
+@router.post("/sessions/{session_id}/end", response_model=CaptureSessionStatus)
+async def end_capture_session(
+    session_id: str,
+    current_user = Depends(get_current_user),
+    db = Depends(get_async_database)
+):
+    """Mark every student whose confidence reached STREAM_PRESENCE_CONFIDENCE present, in one bulk write"""
+    await _own_session(db, session_id, current_user)
+    session = await end_session(db, session_id)
+    if session is None:
+        raise HTTPException(status_code=409, detail="Capture session has already ended")
+    return _session_status(session)
@@ -1,35 +1,69 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from typing import List, Optional
 from datetime import datetime, date, timedelta
 import uuid
 from models.faculty import *
 from models.academic import *
-from core.database import get_database
+from models.attendance import FacultyAttendanceStats
+from core.database import get_async_database
 from routers.auth import get_current_user
+from app.services.attendance_stats import faculty_attendance_stats
+from app.services.pagination import keyset_page, projection_for
+from core.response_cache import cached_json, query_tags
 
 router = APIRouter(prefix="/faculty", tags=["faculty"])
 
-@router.get("/", response_model=List[FacultyResponse])
+@router.get("/", response_model=FacultyPage)
 async def get_all_faculty(
+    request: Request,
+    department: Optional[str] = None,
+    stream: Optional[str] = None,
+    college: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
     current_user = Depends(get_current_user),
-    db = Depends(get_database)
+    db = Depends(get_async_database)
 ):
     if current_user["role"] not in ["faculty", "admin"]:
         raise HTTPException(status_code=403, detail="Only faculty and admin can view all faculty")
     
-    faculty = list(db.faculty.find({}))
-    return [FacultyResponse(**fac) for fac in faculty]
+    query = {}
+    if department:
+        query["department"] = department
+    if stream:
+        query["stream"] = stream
+    if college:
+        query["college_name"] = college
+    
+    projection = projection_for(fields, FacultyResponse.__fields__, FACULTY_LIST_FIELDS)
+    
+    async def load():
+        items, next_cursor = await keyset_page(db.faculty, query, projection, limit, cursor)
+        return FacultyPage(items=items, next_cursor=next_cursor)
+    
+    return await cached_json(request, query_tags("faculty", department=department, stream=stream, college_name=college), load)
 
 @router.get("/me", response_model=FacultyResponse)
 async def get_my_profile(
     current_user = Depends(get_current_user),
-    db = Depends(get_database)
+    db = Depends(get_async_database)
 ):
     if current_user["role"] != "faculty":
         raise HTTPException(status_code=403, detail="Only faculty can access this endpoint")
     
-    faculty = db.faculty.find_one({"user_id": current_user["id"]})
+    faculty = await db.faculty.find_one({"user_id": current_user["id"]})
     if not faculty:
         raise HTTPException(status_code=404, detail="Faculty profile not found")
     
-    return FacultyResponse(**faculty)
\ No newline at end of file
+    return FacultyResponse(**faculty)
+
+@router.get("/attendance/stats", response_model=FacultyAttendanceStats)
+async def get_my_attendance_stats(
+    current_user = Depends(get_current_user),
+    db = Depends(get_async_database)
+):
+    if current_user["role"] != "faculty":
+        raise HTTPException(status_code=403, detail="Only faculty can access this endpoint")
+    
+    return await faculty_attendance_stats(db, current_user["id"])
\ No newline at end of file
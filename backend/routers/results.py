@@ -1,10 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile, status
 from typing import List, Optional
 from datetime import datetime, date
 import uuid
 from pydantic import BaseModel
-from core.database import get_database
+from core.database import get_async_database
+from models.results import ClassResultSummary, MarksSheet, MarksSheetResponse, StudentTranscript, SubjectCredits
 from routers.auth import get_current_user
+from app.services.grading import grade_for
+from app.services.results_service import parse_marks_csv, upload_marks_sheet
+from app.services.cgpa import recompute_cgpa, refresh_semesters
+from app.services.result_analytics import invalidate_result_summary, result_summary, summary_tags
+from core.response_cache import cached_json
+from core.config import SUBJECT_CREDITS_COLLECTION
 
 router = APIRouter()
 
@@ -17,6 +24,7 @@ class ResultCreate(BaseModel):
     total_marks: int
     semester: int
     grade: Optional[str] = None
+    section: Optional[str] = None
 
 class ResultResponse(BaseModel):
     id: str
@@ -24,39 +32,24 @@ class ResultResponse(BaseModel):
     subject: str
     test_type: str
     test_date: date
-    marks_obtained: int
-    total_marks: int
+    marks_obtained: float  # bulk sheets may carry half marks
+    total_marks: float
     percentage: float
     grade: str
     semester: int
+    section: Optional[str] = None
     created_at: datetime
 
 @router.post("/create", response_model=ResultResponse)
 async def create_result(
     result: ResultCreate,
     current_user = Depends(get_current_user),
-    db = Depends(get_database)
+    db = Depends(get_async_database)
 ):
     if current_user["role"] not in ["faculty", "admin"]:
         raise HTTPException(status_code=403, detail="Only faculty and admin can create results")
     
-    # Calculate percentage and grade
-    percentage = (result.marks_obtained / result.total_marks) * 100
-    
-    if percentage >= 90:
-        grade = "A+"
-    elif percentage >= 80:
-        grade = "A"
-    elif percentage >= 70:
-        grade = "B+"
-    elif percentage >= 60:
-        grade = "B"
-    elif percentage >= 50:
-        grade = "C"
-    elif percentage >= 40:
-        grade = "D"
-    else:
-        grade = "F"
+    percentage, grade = grade_for(result.marks_obtained, result.total_marks)
     
     result_data = result.dict()
     result_data.update({
@@ -68,20 +61,89 @@ async def create_result(
         "updated_at": datetime.now()
     })
     
-    db.results.insert_one(result_data)
+    await db.results.insert_one(result_data)
+    await refresh_semesters(db, [(result.student_id, result.semester)])
+    await invalidate_result_summary(result.subject, str(result.test_date), result.test_type)
     return ResultResponse(**result_data)
 
+@router.post("/bulk", response_model=MarksSheetResponse)
+async def create_results_bulk(
+    sheet: MarksSheet,
+    current_user = Depends(get_current_user),
+    db = Depends(get_async_database)
+):
+    if current_user["role"] not in ["faculty", "admin"]:
+        raise HTTPException(status_code=403, detail="Only faculty and admin can create results")
+    
+    if not sheet.entries:
+        raise HTTPException(status_code=400, detail="Marks sheet has no entries")
+    
+    summary = await upload_marks_sheet(db, sheet)
+    await invalidate_result_summary(sheet.subject, str(sheet.test_date))
+    return MarksSheetResponse(**summary)
+
+@router.post("/bulk/csv", response_model=MarksSheetResponse)
+async def create_results_bulk_csv(
+    file: UploadFile = File(...),
+    subject: str = Form(...),
+    test_type: str = Form(...),
+    test_date: date = Form(...),
+    semester: int = Form(...),
+    total_marks: float = Form(...),
+    section: Optional[str] = Form(None),
+    current_user = Depends(get_current_user),
+    db = Depends(get_async_database)
+):
+    if current_user["role"] not in ["faculty", "admin"]:
+        raise HTTPException(status_code=403, detail="Only faculty and admin can create results")
+    
+    try:
+        entries = parse_marks_csv((await file.read()).decode("utf-8-sig"))
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not entries:
+        raise HTTPException(status_code=400, detail="Marks sheet has no entries")
+    
+    sheet = MarksSheet(
+        subject=subject, test_type=test_type, test_date=test_date, semester=semester,
+        total_marks=total_marks, section=section, entries=entries
+    )
+    summary = await upload_marks_sheet(db, sheet)
+    await invalidate_result_summary(sheet.subject, str(sheet.test_date))
+    return MarksSheetResponse(**summary)
+
+@router.get("/summary", response_model=ClassResultSummary)
+async def get_result_summary(
+    request: Request,
+    subject: str,
+    test_date: date,
+    test_type: str,
+    current_user = Depends(get_current_user),
+    db = Depends(get_async_database)
+):
+    if current_user["role"] not in ["faculty", "admin"]:
+        raise HTTPException(status_code=403, detail="Only faculty and admin can view class summaries")
+    
+    async def load():
+        summary = await result_summary(db, subject, str(test_date), test_type)
+        if summary is None:
+            raise HTTPException(status_code=404, detail="No results for this test")
+        return summary
+    
+    # Shared across workers; result writes invalidate the group's tags
+    return await cached_json(request, summary_tags(subject, str(test_date), test_type), load)
+
 @router.get("/student/{student_id}")
 async def get_student_results(
     student_id: str,
     test_type: Optional[str] = None,
     semester: Optional[int] = None,
     current_user = Depends(get_current_user),
-    db = Depends(get_database)
+    db = Depends(get_async_database)
 ):
     # Students can only view their own results
     if current_user["role"] == "student":
-        student = db.students.find_one({"user_id": current_user["id"]})
+        student = await db.students.find_one({"user_id": current_user["id"]})
         if not student or student["id"] != student_id:
             raise HTTPException(status_code=403, detail="Can only view your own results")
     
@@ -91,14 +153,14 @@ async def get_student_results(
     if semester:
         query["semester"] = semester
     
-    results = list(db.results.find(query).sort("test_date", -1))
+    results = await db.results.find(query).sort("test_date", -1).to_list(length=None)
     return [ResultResponse(**result) for result in results]
 
 @router.get("/internal/{student_id}")
 async def get_internal_results(
     student_id: str,
     current_user = Depends(get_current_user),
-    db = Depends(get_database)
+    db = Depends(get_async_database)
 ):
     return await get_student_results(student_id, "internal", None, current_user, db)
 
@@ -106,7 +168,7 @@ async def get_internal_results(
 async def get_lab_results(
     student_id: str,
     current_user = Depends(get_current_user),
-    db = Depends(get_database)
+    db = Depends(get_async_database)
 ):
     return await get_student_results(student_id, "lab", None, current_user, db)
 
@@ -115,41 +177,66 @@ async def get_semester_results(
     student_id: str,
     semester: int,
     current_user = Depends(get_current_user),
-    db = Depends(get_database)
+    db = Depends(get_async_database)
 ):
     return await get_student_results(student_id, None, semester, current_user, db)
 
+@router.get("/transcript/{student_id}", response_model=StudentTranscript)
+async def get_transcript(
+    student_id: str,
+    current_user = Depends(get_current_user),
+    db = Depends(get_async_database)
+):
+    if current_user["role"] == "student" and current_user.get("profile_id") != student_id:
+        raise HTTPException(status_code=403, detail="Can only view your own transcript")
+    
+    # Semester and cumulative CGPA are materialized on the student document
+    student = await db.students.find_one({"id": student_id}, {"_id": 0, "id": 1, "total_cgpa": 1, "semester_results": 1})
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+    
+    return StudentTranscript(
+        student_id=student["id"],
+        total_cgpa=student.get("total_cgpa", 0.0),
+        semester_results=sorted(student.get("semester_results", []), key=lambda entry: entry["semester"])
+    )
+
+@router.put("/credits/{subject}")
+async def set_subject_credits(
+    subject: str,
+    subject_credits: SubjectCredits,
+    current_user = Depends(get_current_user),
+    db = Depends(get_async_database)
+):
+    if current_user["role"] not in ["faculty", "admin"]:
+        raise HTTPException(status_code=403, detail="Only faculty and admin can set subject credits")
+    
+    if subject_credits.credits <= 0:
+        raise HTTPException(status_code=400, detail="Credits must be positive")
+    
+    await db[SUBJECT_CREDITS_COLLECTION].update_one(
+        {"subject": subject},
+        {"$set": {"credits": subject_credits.credits, "updated_at": datetime.now()}},
+        upsert=True
+    )
+    refreshed = await recompute_cgpa(db, {"subject": subject})
+    return {"message": "Subject credits updated", "semesters_recomputed": refreshed}
+
 @router.put("/{result_id}")
 async def update_result(
     result_id: str,
     result_update: ResultCreate,
     current_user = Depends(get_current_user),
-    db = Depends(get_database)
+    db = Depends(get_async_database)
 ):
     if current_user["role"] not in ["faculty", "admin"]:
         raise HTTPException(status_code=403, detail="Only faculty and admin can update results")
     
-    existing_result = db.results.find_one({"id": result_id})
+    existing_result = await db.results.find_one({"id": result_id})
     if not existing_result:
         raise HTTPException(status_code=404, detail="Result not found")
     
-    # Calculate new percentage and grade
-    percentage = (result_update.marks_obtained / result_update.total_marks) * 100
-    
-    if percentage >= 90:
-        grade = "A+"
-    elif percentage >= 80:
-        grade = "A"
-    elif percentage >= 70:
-        grade = "B+"
-    elif percentage >= 60:
-        grade = "B"
-    elif percentage >= 50:
-        grade = "C"
-    elif percentage >= 40:
-        grade = "D"
-    else:
-        grade = "F"
+    percentage, grade = grade_for(result_update.marks_obtained, result_update.total_marks)
     
     update_data = result_update.dict()
     update_data.update({
@@ -159,8 +246,15 @@ async def update_result(
         "updated_at": datetime.now()
     })
     
-    db.results.update_one({"id": result_id}, {"$set": update_data})
-    updated_result = db.results.find_one({"id": result_id})
+    await db.results.update_one({"id": result_id}, {"$set": update_data})
+    # The result may have moved student or semester; refresh both sides
+    await refresh_semesters(db, {
+        (existing_result["student_id"], existing_result["semester"]),
+        (result_update.student_id, result_update.semester)
+    })
+    await invalidate_result_summary(existing_result["subject"], existing_result["test_date"], existing_result["test_type"])
+    await invalidate_result_summary(result_update.subject, str(result_update.test_date), result_update.test_type)
+    updated_result = await db.results.find_one({"id": result_id})
     
     return ResultResponse(**updated_result)
 
@@ -168,14 +262,16 @@ async def update_result(
 async def delete_result(
     result_id: str,
     current_user = Depends(get_current_user),
-    db = Depends(get_database)
+    db = Depends(get_async_database)
 ):
     if current_user["role"] not in ["faculty", "admin"]:
         raise HTTPException(status_code=403, detail="Only faculty and admin can delete results")
     
-    result = db.results.find_one({"id": result_id})
+    result = await db.results.find_one({"id": result_id})
     if not result:
         raise HTTPException(status_code=404, detail="Result not found")
     
-    db.results.delete_one({"id": result_id})
+    await db.results.delete_one({"id": result_id})
+    await refresh_semesters(db, [(result["student_id"], result["semester"])])
+    await invalidate_result_summary(result["subject"], result["test_date"], result["test_type"])
     return {"message": "Result deleted successfully"}
\ No newline at end of file
@@ -1,35 +1,88 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from typing import List, Optional
 from datetime import datetime, date, timedelta
 import uuid
 from models.student import *
 from models.academic import *
-from core.database import get_database
+from models.attendance import AttendanceStatsResponse
+from core.database import get_async_database
+from core.config import NOTIFICATIONS_COLLECTION
 from routers.auth import get_current_user
+from app.services.attendance_stats import student_attendance_stats
+from app.services.pagination import keyset_page, projection_for
 
 router = APIRouter(prefix="/students", tags=["students"])
 
-@router.get("/", response_model=List[StudentResponse])
+@router.get("/", response_model=StudentPage)
 async def get_all_students(
+    year: Optional[int] = None,
+    stream: Optional[str] = None,
+    college: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
     current_user = Depends(get_current_user),
-    db = Depends(get_database)
+    db = Depends(get_async_database)
 ):
     if current_user["role"] not in ["faculty", "admin"]:
         raise HTTPException(status_code=403, detail="Only faculty and admin can view all students")
     
-    students = list(db.students.find({}))
-    return [StudentResponse(**student) for student in students]
+    query = {}
+    if year is not None:
+        query["year"] = year
+    if stream:
+        query["stream"] = stream
+    if college:
+        query["college"] = college
+    
+    projection = projection_for(fields, StudentResponse.__fields__, STUDENT_LIST_FIELDS)
+    items, next_cursor = await keyset_page(db.students, query, projection, limit, cursor)
+    return StudentPage(items=items, next_cursor=next_cursor)
 
 @router.get("/me", response_model=StudentResponse)
 async def get_my_profile(
     current_user = Depends(get_current_user),
-    db = Depends(get_database)
+    db = Depends(get_async_database)
 ):
     if current_user["role"] != "student":
         raise HTTPException(status_code=403, detail="Only students can access this endpoint")
     
-    student = db.students.find_one({"user_id": current_user["id"]})
+    student = await db.students.find_one({"user_id": current_user["id"]})
     if not student:
         raise HTTPException(status_code=404, detail="Student profile not found")
     
-    return StudentResponse(**student)
\ No newline at end of file
+    return StudentResponse(**student)
+
+@router.get("/me/notifications", response_model=List[Notification])
+async def get_my_notifications(
+    unread_only: bool = False,
+    limit: int = Query(50, ge=1, le=200),
+    current_user = Depends(get_current_user),
+    db = Depends(get_async_database)
+):
+    if current_user["role"] != "student":
+        raise HTTPException(status_code=403, detail="Only students can access this endpoint")
+    
+    query = {"user_id": current_user["id"]}
+    if unread_only:
+        query["read"] = False
+    notifications = db[NOTIFICATIONS_COLLECTION].find(query, {"_id": 0}).sort("created_at", -1).limit(limit)
+    return [Notification(**notification) async for notification in notifications]
+
+@router.get("/me/attendance/stats", response_model=AttendanceStatsResponse)
+async def get_my_attendance_stats(
+    current_user = Depends(get_current_user),
+    db = Depends(get_async_database)
+):
+    if current_user["role"] != "student":
+        raise HTTPException(status_code=403, detail="Only students can access this endpoint")
+    
+    # The token carries the profile id; older tokens fall back to a lookup
+    student_id = current_user.get("profile_id")
+    if not student_id:
+        student = await db.students.find_one({"user_id": current_user["id"]}, {"id": 1})
+        if not student:
+            raise HTTPException(status_code=404, detail="Student profile not found")
+        student_id = student["id"]
+    
+    return await student_attendance_stats(db, student_id)
\ No newline at end of file
@@ -48,6 +48,44 @@ def test_attendance_endpoints():
     except Exception as e:
         print(f"Enroll attendance error: {e}")
 
+def test_bulk_attendance_endpoint():
+    """Test bulk roster attendance endpoint"""
+    print("\nTesting Bulk Attendance Endpoint...")
+    
+    # Get faculty token
+    faculty_token = get_auth_token("jane.smith6925@example.com", "password123")
+    if not faculty_token:
+        print("Failed to get faculty token")
+        return
+    
+    headers = {"Authorization": f"Bearer {faculty_token}"}
+    
+    roster_data = {
+        "date": str(date.today()),
+        "period": 3,
+        "subject": "Mathematics",
+        "entries": [
+            {"student_id": "68ac9c320a1edb72993d3628", "status": "present"},
+            {"student_id": "68ac9c320a1edb72993d3629", "status": "absent"}
+        ]
+    }
+    
+    try:
+        response = requests.post(f"{BASE_URL}/attendance/enroll/bulk", json=roster_data, headers=headers)
+        print(f"Bulk enroll attendance: {response.status_code} - {response.json()}")
+        
+        # Submitting the same roster again should report duplicates, not fail
+        response = requests.post(f"{BASE_URL}/attendance/enroll/bulk", json=roster_data, headers=headers)
+        print(f"Bulk enroll attendance (repeat): {response.status_code} - {response.json()}")
+    except Exception as e:
+        print(f"Bulk enroll attendance error: {e}")
+    
+    try:
+        response = requests.get(f"{BASE_URL}/faculty/attendance/stats", headers=headers)
+        print(f"Get faculty attendance stats: {response.status_code} - {response.json()}")
+    except Exception as e:
+        print(f"Get faculty attendance stats error: {e}")
+
 def test_results_endpoints():
     """Test results endpoints"""
     print("\nTesting Results Endpoints...")
@@ -77,6 +115,25 @@ def test_results_endpoints():
     except Exception as e:
         print(f"Create result error: {e}")
 
+    # Test uploading a whole marks sheet
+    sheet = {
+        "subject": "Physics",
+        "test_type": "internal",
+        "test_date": str(date.today()),
+        "semester": 3,
+        "total_marks": 50,
+        "entries": [
+            {"student_id": "68ac9c320a1edb72993d3628", "marks_obtained": 42},
+            {"student_id": "68ac9c320a1edb72993d3628", "marks_obtained": 40}  # repeat, should fail
+        ]
+    }
+
+    try:
+        response = requests.post(f"{BASE_URL}/results/bulk", json=sheet, headers=headers)
+        print(f"Bulk results: {response.status_code} - {response.json()}")
+    except Exception as e:
+        print(f"Bulk results error: {e}")
+
 def test_student_dashboard():
     """Test student dashboard endpoints"""
     print("\nTesting Student Dashboard Endpoints...")
@@ -96,6 +153,13 @@ def test_student_dashboard():
     except Exception as e:
         print(f"Get student attendance error: {e}")
     
+    # Test getting student attendance statistics
+    try:
+        response = requests.get(f"{BASE_URL}/students/me/attendance/stats", headers=headers)
+        print(f"Get student attendance stats: {response.status_code} - {response.json()}")
+    except Exception as e:
+        print(f"Get student attendance stats error: {e}")
+    
     # Test getting student results
     try:
         response = requests.get(f"{BASE_URL}/results/student/68ac9c320a1edb72993d3628", headers=headers)
@@ -107,6 +171,7 @@ if __name__ == "__main__":
     print("Testing Complete API Functionality...")
     
     test_attendance_endpoints()
+    test_bulk_attendance_endpoint()
     test_results_endpoints()
     test_student_dashboard()
     
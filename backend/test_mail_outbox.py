@@ -0,0 +1,115 @@
+"""Outbox delivery against the local SMTP stand-in.
+
+Needs MongoDB at settings.MONGODB_URL; each test works in a throwaway database.
+"""
+import asyncio
+import uuid
+from datetime import datetime
+from motor.motor_asyncio import AsyncIOMotorClient
+from core.config import settings, EMAIL_OUTBOX_COLLECTION
+from local_smtp_server import LocalSMTPServer
+from app.services import mail_outbox
+from app.services.emailer import SMTPSession
+
+# The stand-in does not log in, so SMTP_USERNAME cannot stand in for the sender
+settings.FROM_EMAIL = settings.FROM_EMAIL or "noreply@example.com"
+
+def run_with_outbox(test):
+    """Run test(db) in a fresh database and drop it afterwards"""
+    async def wrapper():
+        client = AsyncIOMotorClient(settings.MONGODB_URL)
+        name = f"test_outbox_{uuid.uuid4().hex[:8]}"
+        try:
+            await test(client[name])
+        finally:
+            await client.drop_database(name)
+            client.close()
+    asyncio.run(wrapper())
+
+def local_session(server: LocalSMTPServer, timeout: float = 5) -> SMTPSession:
+    return SMTPSession(host="127.0.0.1", port=server.port, username="", starttls=False, timeout=timeout)
+
+def test_deliver_batch_over_one_session():
+    async def test(db):
+        with LocalSMTPServer() as server:
+            session = local_session(server)
+            await mail_outbox.enqueue_emails(db, ((f"student{i}@example.com", "Shortage", "body") for i in range(25)))
+            assert await mail_outbox.deliver_batch(db, session, limit=10) == 10
+            assert await mail_outbox.deliver_batch(db, session, limit=100) == 15
+            assert await mail_outbox.deliver_batch(db, session) == 0
+            session.close()
+        assert len(server.messages) == 25
+        assert server.connections == 1, "Batches should reuse one SMTP session"
+        assert await db[EMAIL_OUTBOX_COLLECTION].count_documents({"status": mail_outbox.SENT, "attempts": 1}) == 25
+        assert await db[EMAIL_OUTBOX_COLLECTION].count_documents({"claim": {"$exists": True}}) == 0
+    run_with_outbox(test)
+
+def test_permanent_rejection_fails_without_retry():
+    async def test(db):
+        with LocalSMTPServer(reject={"gone@example.com"}) as server:
+            session = local_session(server)
+            await mail_outbox.enqueue_email(db, "gone@example.com", "Subject", "body")
+            await mail_outbox.enqueue_email(db, "here@example.com", "Subject", "body")
+            assert await mail_outbox.deliver_batch(db, session) == 2
+            session.close()
+        rejected = await db[EMAIL_OUTBOX_COLLECTION].find_one({"to": "gone@example.com"})
+        assert rejected["status"] == mail_outbox.FAILED
+        assert rejected["attempts"] == 1
+        assert "550" in rejected["last_error"]
+        delivered = await db[EMAIL_OUTBOX_COLLECTION].find_one({"to": "here@example.com"})
+        assert delivered["status"] == mail_outbox.SENT
+        assert [message["to"] for message in server.messages] == [["here@example.com"]]
+    run_with_outbox(test)
+
+def test_unreachable_server_backs_off():
+    async def test(db):
+        with LocalSMTPServer() as server:
+            port = server.port
+        # Nothing listens on the port any more, so the attempt fails transiently
+        session = SMTPSession(host="127.0.0.1", port=port, username="", starttls=False, timeout=2)
+        await mail_outbox.enqueue_email(db, "later@example.com", "Subject", "body")
+        started = datetime.now()
+        assert await mail_outbox.deliver_batch(db, session) == 1
+        message = await db[EMAIL_OUTBOX_COLLECTION].find_one({"to": "later@example.com"})
+        assert message["status"] == mail_outbox.PENDING
+        assert message["attempts"] == 1
+        # Jittered into [base / 2, base] after the first attempt
+        delay = (message["next_attempt_at"] - started).total_seconds()
+        assert settings.EMAIL_RETRY_BASE_SECONDS * 0.5 - 1 <= delay <= settings.EMAIL_RETRY_BASE_SECONDS + 1
+        # Not due yet, so it is not claimed again
+        assert await mail_outbox.deliver_batch(db, session) == 0
+    run_with_outbox(test)
+
+def test_retry_delay_doubles_up_to_the_cap():
+    for attempts in range(1, 12):
+        ceiling = min(settings.EMAIL_RETRY_MAX_SECONDS, settings.EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+        for _ in range(20):
+            assert ceiling * 0.5 <= mail_outbox.retry_delay(attempts) <= ceiling
+
+def test_claim_lock_is_extended_while_sending():
+    async def test(db):
+        lock_seconds = settings.EMAIL_OUTBOX_LOCK_SECONDS
+        settings.EMAIL_OUTBOX_LOCK_SECONDS = 0.3
+        try:
+            await mail_outbox.enqueue_email(db, "slow@example.com", "Subject", "body")
+            claim, messages = await mail_outbox.claim_batch(db, 10)
+            first_lock = messages[0]["locked_until"]
+            keeper = asyncio.create_task(mail_outbox.hold_claim(db, claim))
+            await asyncio.sleep(0.5)
+            keeper.cancel()
+            message = await db[EMAIL_OUTBOX_COLLECTION].find_one({"claim": claim})
+            assert message["locked_until"] > first_lock
+            assert message["locked_until"] > datetime.now()
+            # Still locked, so another worker cannot claim it
+            assert (await mail_outbox.claim_batch(db, 10))[1] == []
+        finally:
+            settings.EMAIL_OUTBOX_LOCK_SECONDS = lock_seconds
+    run_with_outbox(test)
+
+if __name__ == "__main__":
+    test_deliver_batch_over_one_session()
+    test_permanent_rejection_fails_without_retry()
+    test_unreachable_server_backs_off()
+    test_retry_delay_doubles_up_to_the_cap()
+    test_claim_lock_is_extended_while_sending()
+    print("All mail outbox tests passed!")
@@ -732,12 +732,14 @@ def show_faculty_attendance():
                     "date": str(attendance_date),
                     "period": period,
                     "subject": subject,
-                    "status": status
+                    "status": status,
+                    # Resubmitting the same form is then a no-op on the server
+                    "idempotency_key": f"{student_id}:{attendance_date}:{period}:{subject}:{status}"
                 }
                 
-                result, error = make_api_request("/attendance/enroll", "POST", attendance_data)
+                result, error = make_api_request("/attendance/enroll?mode=upsert", "POST", attendance_data)
                 if result:
-                    st.success("Attendance marked successfully!")
+                    st.success(f"Attendance marked successfully! ({result.get('write_result', 'created')})")
                 else:
                     st.error(f"Failed to mark attendance: {error}")
             else:
@@ -1,4 +1,17 @@
 import streamlit as st
+import os
+
+# Parquet snapshots written nightly by the backend's analytics export
+ANALYTICS_EXPORT_DIR = os.getenv("ANALYTICS_EXPORT_DIR", "../../backend/analytics_exports")
+
+@st.cache_data(ttl=3600)
+def load_attendance_by_subject(months):
+    import pyarrow.dataset as ds
+    dataset = ds.dataset(os.path.join(ANALYTICS_EXPORT_DIR, "attendance"), format="parquet", partitioning="hive")
+    table = dataset.to_table(columns=["subject", "status"], filter=ds.field("month").isin(months))
+    # Each month file has its own dictionaries; unify them before grouping
+    table = table.unify_dictionaries().combine_chunks()
+    return table.group_by(["subject", "status"]).aggregate([("status", "count")]).to_pandas()
 
 st.set_page_config(page_title="Reports & Analytics", layout="wide")
 
@@ -13,8 +26,16 @@ if not st.session_state.get('logged_in'):
 user_role = st.session_state.get('user', {}).get('role')
 
 if user_role == 'faculty':
-    st.info("Faculty reports and results management section is under construction.")
-    # Placeholder for faculty-specific reports
+    attendance_dir = os.path.join(ANALYTICS_EXPORT_DIR, "attendance")
+    if os.path.isdir(attendance_dir):
+        months = sorted(name.split("=", 1)[1] for name in os.listdir(attendance_dir) if name.startswith("month="))
+        selected = st.multiselect("Months", months, default=months[-1:])
+        if selected:
+            counts = load_attendance_by_subject(selected)
+            st.subheader("Attendance by subject")
+            st.bar_chart(counts.pivot(index="subject", columns="status", values="status_count").fillna(0))
+    else:
+        st.info("No analytics snapshot found yet. It is exported nightly by the backend.")
     st.page_link("pages/2_🧑‍🏫_Faculty_Dashboard.py", label="Back to Dashboard")
 elif user_role == 'student':
     st.info("Your detailed attendance and result reports will be displayed here.")